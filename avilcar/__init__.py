@@ -0,0 +1,12 @@
+"""
+Línea de comandos de AvilCar (sin interfaz gráfica)
+---------------------------------------------------
+Operaciones por lote sobre inventario.db para tareas programadas y scripts:
+importar/exportar CSV, reportes, migraciones, mantenimiento y benchmarks.
+Llama directamente a models/ y database/; nunca importa tkinter ni matplotlib.
+
+Uso:
+    python -m avilcar --help
+    python -m avilcar --db /ruta/inventario.db exportar ventas ventas_2025.csv.gz --desde 2025-01-01 --hasta 2025-12-31
+    python -m avilcar reporte kpis
+"""
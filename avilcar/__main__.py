@@ -0,0 +1,260 @@
+"""
+Punto de entrada de `python -m avilcar`.
+
+    python -m avilcar migrar
+    python -m avilcar importar productos catalogo.csv
+    python -m avilcar exportar productos productos.csv --categoria 3
+    python -m avilcar exportar ventas ventas.csv.gz --desde 2025-01-01 --hasta 2025-12-31
+    python -m avilcar exportar movimientos movimientos.csv --producto 42
+    python -m avilcar reporte ventas-dia --desde 2025-06-01 --hasta 2025-06-30
+    python -m avilcar reporte resumenes --reconstruir
+    python -m avilcar optimizar --analizar
+    python -m avilcar vacuum
+    python -m avilcar benchmark -- --escala pequena --repeticiones 10
+
+Los modelos se importan dentro de cada comando: `--help` y los comandos
+simples arrancan sin cargar lo que no usan. La base se toma de --db o de la
+variable AVILCAR_DB (por defecto, database/inventario.db). Antes de cada
+comando se aplican las migraciones pendientes (salvo --sin-migrar).
+
+Códigos de salida: 0 bien, 1 error o diferencias encontradas, 2 argumentos inválidos.
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger("avilcar")
+
+
+# ========================
+# SALIDA
+# ========================
+def _escribir_filas(encabezados, filas) -> None:
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(encabezados)
+    writer.writerows(filas)
+
+
+def _progreso_exportacion(escritas, total) -> None:
+    if total:
+        print(f"\r{escritas:,}/{total:,} filas ({escritas / total:.0%})", end="", file=sys.stderr, flush=True)
+    else:
+        print(f"\r{escritas:,} filas", end="", file=sys.stderr, flush=True)
+
+
+# ========================
+# COMANDOS
+# ========================
+def cmd_migrar(args) -> int:
+    from database.migrations import current_version, latest_version, migrate
+
+    version = migrate(progress=lambda v, desc, f: logger.info("Migración %s (%s): %.0f%%", v, desc, f * 100))
+    print(f"Esquema al día: versión {version} (última conocida {latest_version()}).")
+    return 0 if current_version() == latest_version() else 1
+
+
+def cmd_importar(args) -> int:
+    from models.importar import importar_productos
+
+    inicio = time.perf_counter()
+    resultado = importar_productos(
+        args.archivo, progreso=lambda n: print(f"\r{n:,} filas leídas", end="", file=sys.stderr, flush=True)
+    )
+    print(file=sys.stderr)
+    for linea, mensaje in resultado["errores"]:
+        print(f"línea {linea}: {mensaje}", file=sys.stderr)
+    print(
+        f"{resultado['insertados']} insertados, {resultado['actualizados']} actualizados, "
+        f"{resultado['omitidos']} omitidos en {time.perf_counter() - inicio:.1f} s."
+    )
+    return 1 if resultado["omitidos"] else 0
+
+
+def cmd_exportar(args) -> int:
+    from models import exportar
+
+    opciones = {"progreso": None if args.silencioso else _progreso_exportacion}
+    if args.gzip:
+        opciones["comprimir"] = True
+    inicio = time.perf_counter()
+    if args.que == "productos":
+        filas = exportar.exportar_productos(
+            args.archivo, texto=args.texto, categoria_id=args.categoria, seccion=args.seccion,
+            solo_con_stock=args.solo_con_stock, orden=args.orden, descendente=args.descendente, **opciones,
+        )
+    elif args.que == "ventas":
+        filas = exportar.exportar_ventas(args.archivo, desde=args.desde, hasta=args.hasta, **opciones)
+    else:
+        filas = exportar.exportar_movimientos(
+            args.archivo, desde=args.desde, hasta=args.hasta, producto_id=args.producto, **opciones,
+        )
+    if not args.silencioso:
+        print(file=sys.stderr)
+    print(f"{filas:,} filas exportadas a {args.archivo} en {time.perf_counter() - inicio:.1f} s.")
+    return 0
+
+
+def cmd_reporte(args) -> int:
+    from models import reportes
+
+    if args.cual == "kpis":
+        k = reportes.kpis_ventas()
+        variacion = "N/D" if k["variacion"] is None else f"{k['variacion']:+.1f}%"
+        print(f"Hoy: {k['hoy']:.2f}\nMes: {k['mes']:.2f}\nMes anterior: {k['mes_anterior']:.2f}\nVariación: {variacion}")
+        print(f"Total histórico: {reportes.ventas_totales():.2f}")
+    elif args.cual == "ventas-dia":
+        if not (args.desde and args.hasta):
+            raise ValueError("ventas-dia requiere --desde y --hasta.")
+        _escribir_filas(("dia", "unidades", "total", "n_ventas"), reportes.ventas_por_dia(args.desde, args.hasta))
+    elif args.cual == "ventas-mes":
+        _escribir_filas(
+            ("mes", "unidades", "total", "n_ventas"),
+            reportes.ventas_por_mes((args.desde or "0000-00")[:7], (args.hasta or "9999-12")[:7]),
+        )
+    elif args.cual == "productos":
+        filas = reportes.ventas_por_producto()
+        _escribir_filas(("id", "nombre", "unidades", "total"), filas[:args.limite] if args.limite else filas)
+    elif args.cual == "bajo-stock":
+        _escribir_filas(("id", "nombre", "stock"), reportes.productos_bajo_stock(args.umbral))
+    elif args.cual == "resumenes":
+        if args.reconstruir:
+            reportes.reconstruir_resumenes()
+            print("Resúmenes de ventas reconstruidos.")
+            return 0
+        diferencias = reportes.verificar_resumenes()
+        for d in diferencias:
+            print("DIFERENCIA", *d)
+        print("Resúmenes OK." if not diferencias else f"{len(diferencias)} diferencias.")
+        return 1 if diferencias else 0
+    return 0
+
+
+def cmd_optimizar(args) -> int:
+    from database.db import optimize_database
+
+    inicio = time.perf_counter()
+    optimize_database(analyze=args.analizar)
+    print(f"{'ANALYZE' if args.analizar else 'PRAGMA optimize'} terminado en {time.perf_counter() - inicio:.1f} s.")
+    return 0
+
+
+def cmd_vacuum(args) -> int:
+    from database.db import integrity_check, vacuum_database
+
+    if args.verificar:
+        problemas = integrity_check()
+        if problemas:
+            for p in problemas:
+                print(p, file=sys.stderr)
+            print("La base tiene errores de integridad; no se compacta.")
+            return 1
+    tamanos = vacuum_database()
+    print(f"Base compactada: {tamanos['antes'] / 1e6:.1f} MB -> {tamanos['despues'] / 1e6:.1f} MB.")
+    return 0
+
+
+def cmd_benchmark(args) -> int:
+    from benchmarks.__main__ import main as benchmarks_main
+
+    resto = args.resto[1:] if args.resto[:1] == ["--"] else args.resto
+    # Sin --base explícita, medir la base seleccionada (no una sintética)
+    if args.db_explicita and "--base" not in resto and "--escala" not in resto:
+        resto = ["--base", os.environ["AVILCAR_DB"], *resto]
+    return benchmarks_main(resto)
+
+
+# ========================
+# ARGUMENTOS
+# ========================
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m avilcar", description="AvilCar sin interfaz gráfica")
+    parser.add_argument("--db", help="ruta de la base (por defecto AVILCAR_DB o database/inventario.db)")
+    parser.add_argument("--sin-migrar", action="store_true", help="no aplicar migraciones pendientes")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostrar el log (INFO) en stderr")
+    sub = parser.add_subparsers(dest="comando", required=True, metavar="comando")
+
+    p = sub.add_parser("migrar", help="aplicar migraciones pendientes")
+    p.set_defaults(fn=cmd_migrar)
+
+    p = sub.add_parser("importar", help="importar productos desde CSV (upsert por SKU)")
+    p.add_argument("que", choices=["productos"])
+    p.add_argument("archivo", help="CSV (o .csv.gz) con al menos la columna Nombre")
+    p.set_defaults(fn=cmd_importar)
+
+    p = sub.add_parser("exportar", help="exportar a CSV en streaming (.gz = comprimido)")
+    p.add_argument("que", choices=["productos", "ventas", "movimientos"])
+    p.add_argument("archivo")
+    p.add_argument("--desde", help="día YYYY-MM-DD (ventas, movimientos)")
+    p.add_argument("--hasta", help="día YYYY-MM-DD, inclusive (ventas, movimientos)")
+    p.add_argument("--producto", type=int, help="id de producto (movimientos)")
+    p.add_argument("--texto", help="búsqueda en nombre/código (productos)")
+    p.add_argument("--categoria", type=int, help="id de categoría (productos)")
+    p.add_argument("--seccion", help="sección exacta; '' = sin sección (productos)")
+    p.add_argument("--solo-con-stock", action="store_true", help="productos con stock > 0")
+    p.add_argument("--orden", default="nombre", help="columna de orden (productos)")
+    p.add_argument("--descendente", action="store_true")
+    p.add_argument("--gzip", action="store_true", help="comprimir aunque el nombre no termine en .gz")
+    p.add_argument("--silencioso", action="store_true", help="sin progreso en stderr")
+    p.set_defaults(fn=cmd_exportar)
+
+    p = sub.add_parser("reporte", help="reportes de ventas y stock (CSV en stdout)")
+    p.add_argument("cual", choices=["kpis", "ventas-dia", "ventas-mes", "productos", "bajo-stock", "resumenes"])
+    p.add_argument("--desde", help="YYYY-MM-DD (ventas-dia) o YYYY-MM (ventas-mes)")
+    p.add_argument("--hasta")
+    p.add_argument("--umbral", type=int, default=5, help="bajo-stock: stock <= umbral")
+    p.add_argument("--limite", type=int, help="productos: solo los N más vendidos")
+    p.add_argument("--reconstruir", action="store_true", help="resumenes: recalcular en lugar de verificar")
+    p.set_defaults(fn=cmd_reporte)
+
+    p = sub.add_parser("optimizar", help="actualizar estadísticas del planificador")
+    p.add_argument("--analizar", action="store_true", help="ANALYZE completo en lugar de PRAGMA optimize")
+    p.set_defaults(fn=cmd_optimizar)
+
+    p = sub.add_parser("vacuum", help="compactar la base (requiere que la app esté cerrada)")
+    p.add_argument("--verificar", action="store_true", help="correr integrity_check antes")
+    p.set_defaults(fn=cmd_vacuum)
+
+    p = sub.add_parser("benchmark", help="correr benchmarks (argumentos de python -m benchmarks)")
+    p.add_argument("resto", nargs=argparse.REMAINDER)
+    p.set_defaults(fn=cmd_benchmark, sin_migrar=True)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = crear_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        stream=sys.stderr,
+    )
+    args.db_explicita = bool(args.db)
+    if args.db:
+        # Antes de abrir cualquier conexión: database.db lee la ruta de aquí
+        os.environ["AVILCAR_DB"] = os.path.abspath(args.db)
+
+    try:
+        if not args.sin_migrar and args.fn is not cmd_migrar:
+            from database.migrations import migrate
+            migrate()
+        return args.fn(args)
+    except KeyboardInterrupt:
+        print("\nInterrumpido.", file=sys.stderr)
+        return 1
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        logger.exception("Falló el comando %s", args.comando)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        from database.db import close_all_connections
+        close_all_connections()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""
+Benchmarks de los modelos
+-------------------------
+- datos.py: genera bases inventario.db sintéticas a distintas escalas.
+- casos.py: un caso de medición por cada función pública de models/.
+- __main__.py: corre los casos y guarda p50/p95 en JSON para comparar corridas.
+- arranque.py: mide el import de main.py y verifica que no cargue las vistas.
+
+Uso:
+    python -m benchmarks --escala pequena
+    python -m benchmarks --escala grande --salida resultados.json
+    python -m benchmarks --comparar antes.json despues.json
+    python -m benchmarks --arranque          # presupuesto de arranque (-X importtime)
+"""
@@ -0,0 +1,217 @@
+"""
+Corre los casos de benchmarks/casos.py contra una base sintética y escribe
+p50/p95 (ms) por caso en JSON.
+
+    python -m benchmarks --escala mediana --salida resultados.json
+    python -m benchmarks --base copia_de_produccion.db --repeticiones 50
+    python -m benchmarks --comparar antes.json despues.json
+    python -m benchmarks --arranque --presupuesto-ms 300
+
+Las funciones que escriben modifican la base, por eso se mide sobre una copia
+temporal y la base generada queda intacta para la próxima corrida.
+"""
+import argparse
+import importlib
+import inspect
+import json
+import logging
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.datos import ESCALAS, base_para_escala
+
+logger = logging.getLogger(__name__)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, int(round(p / 100.0 * len(valores) + 0.5)) - 1))
+    return valores[k]
+
+
+def funciones_publicas(modulo_nombre: str) -> List[str]:
+    """Funciones definidas (no importadas) y sin guion bajo del módulo."""
+    modulo = importlib.import_module(modulo_nombre)
+    return sorted(
+        f"{modulo_nombre}.{nombre}"
+        for nombre, obj in inspect.getmembers(modulo, inspect.isfunction)
+        if not nombre.startswith("_") and obj.__module__ == modulo_nombre
+    )
+
+
+def _resolver(funcion: str):
+    modulo, nombre = funcion.rsplit(".", 1)
+    return getattr(importlib.import_module(modulo), nombre)
+
+
+def medir(repeticiones: int, calentamiento: int = 1, filtro: Optional[str] = None, progreso=print) -> Dict:
+    """Mide todos los casos sobre la base apuntada por AVILCAR_DB."""
+    from benchmarks.casos import CASOS, MODULOS, Contexto
+
+    ctx = Contexto.desde_base()
+    resultados = {}
+    for c in CASOS:
+        if filtro and filtro not in c.nombre:
+            continue
+        fn = _resolver(c.funcion)
+        n = min(repeticiones, c.max_repeticiones or repeticiones)
+        tiempos = []
+        for i in range(calentamiento + n):
+            args, kwargs = c.preparar(ctx)
+            inicio = time.perf_counter()
+            fn(*args, **kwargs)
+            duracion = (time.perf_counter() - inicio) * 1000.0
+            if i >= calentamiento:
+                tiempos.append(duracion)
+        tiempos.sort()
+        resultados[c.nombre] = {
+            "n": len(tiempos),
+            "p50_ms": round(percentil(tiempos, 50), 3),
+            "p95_ms": round(percentil(tiempos, 95), 3),
+            "min_ms": round(tiempos[0], 3),
+            "max_ms": round(tiempos[-1], 3),
+            "media_ms": round(sum(tiempos) / len(tiempos), 3),
+        }
+        if progreso:
+            r = resultados[c.nombre]
+            progreso(f"{c.nombre:<60} p50 {r['p50_ms']:>10.3f} ms  p95 {r['p95_ms']:>10.3f} ms")
+
+    cubiertas = {c.funcion for c in CASOS}
+    sin_caso = [f for m in MODULOS for f in funciones_publicas(m) if f not in cubiertas]
+    return {"resultados": resultados, "sin_caso": sin_caso}
+
+
+def _conteos(ruta) -> Dict[str, int]:
+    conn = sqlite3.connect(str(ruta))
+    try:
+        return {
+            tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+            for tabla in ("productos", "ventas", "movimientos_stock", "categorias")
+        }
+    finally:
+        conn.close()
+
+
+def correr(base: Path, repeticiones: int, calentamiento: int = 1, filtro: Optional[str] = None,
+           etiqueta: str = "", progreso=print) -> Dict:
+    """Copia `base` a un temporal, mide y devuelve el informe completo."""
+    from database.db import close_all_connections
+
+    with tempfile.TemporaryDirectory(prefix="avilcar_bench_") as tmp:
+        copia = Path(tmp) / "inventario.db"
+        # Copia consistente aunque la base tenga WAL pendiente
+        origen = sqlite3.connect(str(base))
+        destino = sqlite3.connect(str(copia))
+        try:
+            origen.backup(destino)
+        finally:
+            destino.close()
+            origen.close()
+
+        anterior = os.environ.get("AVILCAR_DB")
+        os.environ["AVILCAR_DB"] = str(copia)
+        try:
+            from database.migrations import migrate
+            migrate()
+            filas = _conteos(copia)
+            medicion = medir(repeticiones, calentamiento, filtro, progreso)
+        finally:
+            close_all_connections()
+            if anterior is None:
+                os.environ.pop("AVILCAR_DB", None)
+            else:
+                os.environ["AVILCAR_DB"] = anterior
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "etiqueta": etiqueta,
+        "base": str(base),
+        "filas": filas,
+        "repeticiones": repeticiones,
+        "entorno": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "procesador": platform.processor() or platform.machine(),
+        },
+        **medicion,
+    }
+
+
+def comparar(antes: Dict, despues: Dict) -> List[tuple]:
+    """(caso, p50 antes, p50 después, razón) para los casos presentes en ambos."""
+    filas = []
+    for nombre, r in despues["resultados"].items():
+        previo = antes["resultados"].get(nombre)
+        if previo is None:
+            continue
+        razon = r["p50_ms"] / previo["p50_ms"] if previo["p50_ms"] else float("inf")
+        filas.append((nombre, previo["p50_ms"], r["p50_ms"], razon))
+    return filas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de models/")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    parser.add_argument("--base", help="usar esta base en lugar de generar una sintética")
+    parser.add_argument("--directorio", help="dónde guardar las bases generadas (por defecto, el temporal)")
+    parser.add_argument("--regenerar", action="store_true", help="volver a generar la base sintética")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--calentamiento", type=int, default=1)
+    parser.add_argument("--filtro", help="solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--etiqueta", default="", help="texto libre guardado en el JSON (commit, equipo...)")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"), help="comparar dos JSON de resultados")
+    parser.add_argument("--arranque", action="store_true", help="medir el import de main.py con -X importtime")
+    parser.add_argument("--presupuesto-ms", type=float, help="con --arranque: fallar (código 1) si se excede")
+    args = parser.parse_args(argv)
+
+    if args.arranque:
+        from benchmarks.arranque import PRESUPUESTO_MS, medir_arranque, verificar_presupuesto
+
+        informe = medir_arranque(max(1, min(args.repeticiones, 20)))
+        print(json.dumps(informe, ensure_ascii=False, indent=2))
+        problemas = verificar_presupuesto(informe, args.presupuesto_ms or PRESUPUESTO_MS)
+        for problema in problemas:
+            print(problema, file=sys.stderr)
+        return 1 if problemas else 0
+
+    if args.comparar:
+        antes, despues = (json.loads(Path(p).read_text(encoding="utf-8")) for p in args.comparar)
+        for nombre, a, d, razon in comparar(antes, despues):
+            print(f"{nombre:<60} {a:>10.3f} -> {d:>10.3f} ms  x{razon:.2f}")
+        return 0
+
+    if args.base:
+        base = Path(args.base)
+    else:
+        base = base_para_escala(args.escala, args.directorio, args.regenerar, args.semilla,
+                                progreso=lambda etapa: print(f"Generando: {etapa}", file=sys.stderr))
+
+    informe = correr(base, args.repeticiones, args.calentamiento, args.filtro, args.etiqueta,
+                     progreso=lambda linea: print(linea, file=sys.stderr))
+    informe["escala"] = None if args.base else args.escala
+
+    if informe["sin_caso"]:
+        print("Funciones sin caso de benchmark: " + ", ".join(informe["sin_caso"]), file=sys.stderr)
+
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+    if args.salida:
+        Path(args.salida).write_text(texto + "\n", encoding="utf-8")
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
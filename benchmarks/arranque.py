@@ -0,0 +1,88 @@
+"""
+Presupuesto de arranque
+-----------------------
+Mide con `python -X importtime` lo que cuesta importar main.py (todo lo que
+pasa antes de crear la ventana principal) y verifica que las vistas y sus
+dependencias pesadas no se carguen al iniciar.
+
+    python -m benchmarks --arranque
+    python -m benchmarks --arranque --presupuesto-ms 250
+
+Cada medición corre en un intérprete nuevo; se informa la mediana.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Importar main no debe cargar ninguno de estos (se cargan al abrir cada ventana)
+PROHIBIDOS = (
+    "matplotlib",
+    "views.productos_view",
+    "views.ventas_view",
+    "views.reportes_view",
+    "models.exportar",
+)
+
+PRESUPUESTO_MS = 300.0
+
+
+def _parsear_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """{módulo: (propio_us, acumulado_us)} a partir de la salida de -X importtime."""
+    modulos = {}
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        modulos[nombre.strip()] = (int(propio), int(acumulado))
+    return modulos
+
+
+def medir_una_vez(modulo: str = "main") -> Dict[str, Tuple[int, int]]:
+    entorno = dict(os.environ, PYTHONPATH=str(RAIZ), PYTHONDONTWRITEBYTECODE="")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proc.stderr[-2000:]}")
+    return _parsear_importtime(proc.stderr)
+
+
+def medir_arranque(repeticiones: int = 5, modulo: str = "main", top: int = 10) -> dict:
+    """
+    Devuelve {"total_ms" (mediana de la suma de tiempos propios), "corridas_ms",
+    "mas_lentos": {módulo: ms acumulados}, "prohibidos": [módulos cargados que no deberían]}.
+    """
+    medir_una_vez(modulo)  # calentamiento: compila los .pyc
+    corridas: List[float] = []
+    ultima: Dict[str, Tuple[int, int]] = {}
+    for _ in range(max(1, repeticiones)):
+        ultima = medir_una_vez(modulo)
+        corridas.append(sum(propio for propio, _ in ultima.values()) / 1000.0)
+    prohibidos = sorted(
+        m for m in ultima if any(m == p or m.startswith(p + ".") for p in PROHIBIDOS)
+    )
+    mas_lentos = sorted(((m, a / 1000.0) for m, (_, a) in ultima.items() if "." not in m),
+                        key=lambda x: x[1], reverse=True)[:top]
+    return {
+        "modulo": modulo,
+        "total_ms": round(median(corridas), 1),
+        "corridas_ms": [round(c, 1) for c in corridas],
+        "mas_lentos": {m: round(ms, 1) for m, ms in mas_lentos},
+        "prohibidos": prohibidos,
+    }
+
+
+def verificar_presupuesto(informe: dict, presupuesto_ms: float = PRESUPUESTO_MS) -> List[str]:
+    """Problemas encontrados (lista vacía = dentro del presupuesto)."""
+    problemas = []
+    if informe["prohibidos"]:
+        problemas.append("Se cargan al iniciar: " + ", ".join(informe["prohibidos"]))
+    if informe["total_ms"] > presupuesto_ms:
+        problemas.append(f"Arranque {informe['total_ms']:.1f} ms > presupuesto {presupuesto_ms:.0f} ms")
+    return problemas
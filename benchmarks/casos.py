@@ -0,0 +1,499 @@
+"""
+Casos de medición
+-----------------
+Cada caso se registra con @caso("modulo.funcion") y prepara los argumentos de
+una llamada a partir del Contexto (ids, SKUs y fechas que existen en la base).
+La preparación no se cronometra; solo la llamada a la función del modelo.
+
+Una función puede tener varios casos (p. ej. búsqueda con prefijo corto y con
+palabra completa) distinguidos por `etiqueta`.
+"""
+import os
+import random
+import tempfile
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Callable, List, Optional, Tuple
+
+from database.db import get_connection
+
+# modulos cubiertos: cada función pública de estos debe tener al menos un caso
+MODULOS = (
+    "models.producto",
+    "models.ventas",
+    "models.reportes",
+    "models.movimientos",
+    "models.categoria",
+    "models.exportar",
+)
+
+
+@dataclass
+class Caso:
+    funcion: str                      # "models.producto.buscar_productos"
+    preparar: Callable                # preparar(ctx) -> (args, kwargs)
+    etiqueta: str = ""
+    max_repeticiones: Optional[int] = None  # para funciones que recorren todo
+
+    @property
+    def nombre(self) -> str:
+        return f"{self.funcion}[{self.etiqueta}]" if self.etiqueta else self.funcion
+
+
+CASOS: List[Caso] = []
+
+
+def caso(funcion: str, etiqueta: str = "", max_repeticiones: Optional[int] = None):
+    """Registra la función decorada como preparador de un caso de `funcion`."""
+    def decorador(fn):
+        CASOS.append(Caso(funcion, fn, etiqueta, max_repeticiones))
+        return fn
+    return decorador
+
+
+@dataclass
+class Contexto:
+    """Datos de la base que usan los preparadores para armar llamadas realistas."""
+    rnd: random.Random
+    max_producto: int = 0
+    categorias: List[int] = field(default_factory=list)
+    dia_min: str = ""
+    dia_max: str = ""
+    cursor_historial: Optional[Tuple[int, int]] = None
+    _seq: count = field(default_factory=lambda: count(1))
+
+    @classmethod
+    def desde_base(cls, semilla: int = 7) -> "Contexto":
+        conn = get_connection()
+        ctx = cls(rnd=random.Random(semilla))
+        ctx.max_producto = conn.execute("SELECT COALESCE(MAX(id), 0) FROM productos").fetchone()[0]
+        ctx.categorias = [r[0] for r in conn.execute("SELECT id FROM categorias")]
+        dias = conn.execute("SELECT MIN(fecha_ts), MAX(fecha_ts) FROM ventas").fetchone()
+        if dias[0] is not None:
+            ctx.dia_min = conn.execute("SELECT date(?, 'unixepoch')", (dias[0],)).fetchone()[0]
+            ctx.dia_max = conn.execute("SELECT date(?, 'unixepoch')", (dias[1],)).fetchone()[0]
+        fila = conn.execute("""
+            SELECT fecha_ts, id FROM ventas ORDER BY fecha_ts DESC, id DESC LIMIT 1 OFFSET 50
+        """).fetchone()
+        ctx.cursor_historial = tuple(fila) if fila else None
+        return ctx
+
+    def unico(self, prefijo: str) -> str:
+        return f"{prefijo} bench {self.rnd.randrange(1 << 30)}-{next(self._seq)}"
+
+    def producto(self) -> int:
+        """Un id de producto existente."""
+        conn = get_connection()
+        while True:
+            pid = self.rnd.randint(1, max(1, self.max_producto))
+            fila = conn.execute("SELECT id FROM productos WHERE id = ?", (pid,)).fetchone()
+            if fila:
+                return fila[0]
+
+    def producto_con_stock(self, minimo: int = 1) -> int:
+        conn = get_connection()
+        fila = conn.execute(
+            "SELECT id FROM productos WHERE id >= ? AND stock >= ? ORDER BY id LIMIT 1",
+            (self.rnd.randint(1, max(1, self.max_producto)), minimo),
+        ).fetchone() or conn.execute(
+            "SELECT id FROM productos WHERE stock >= ? LIMIT 1", (minimo,)
+        ).fetchone()
+        if fila is None:
+            conn.execute("UPDATE productos SET stock = stock + 1000 WHERE id = ?", (self.producto(),))
+            conn.commit()
+            return self.producto_con_stock(minimo)
+        return fila[0]
+
+    def fila_producto(self, pid: int) -> tuple:
+        return tuple(get_connection().execute(
+            "SELECT nombre, sku, seccion FROM productos WHERE id = ?", (pid,)
+        ).fetchone())
+
+    def nuevo_producto(self) -> int:
+        conn = get_connection()
+        cur = conn.execute(
+            "INSERT INTO productos (nombre, precio_venta, stock, sku) VALUES (?, 10, 10, ?)",
+            (self.unico("Producto"), self.unico("SKU")),
+        )
+        conn.commit()
+        return cur.lastrowid
+
+    def nueva_categoria(self) -> int:
+        conn = get_connection()
+        cur = conn.execute("INSERT INTO categorias (nombre) VALUES (?)", (self.unico("Categoría"),))
+        conn.commit()
+        return cur.lastrowid
+
+    def rango_dias(self, dias: int) -> Tuple[str, str]:
+        conn = get_connection()
+        fin = self.dia_max or conn.execute("SELECT date('now')").fetchone()[0]
+        ini = conn.execute("SELECT date(?, ?)", (fin, f"-{dias - 1} days")).fetchone()[0]
+        return ini, fin
+
+
+# ========================
+# models.producto
+# ========================
+@caso("models.producto.agregar_producto")
+def _(ctx):
+    return (ctx.unico("Filtro"), 25.0, 10), {"sku": ctx.unico("SKU"), "categoria_id": ctx.rnd.choice(ctx.categorias or [None])}
+
+
+@caso("models.producto.obtener_productos", max_repeticiones=10)
+def _(ctx):
+    return (), {}
+
+
+@caso("models.producto.eliminar_producto")
+def _(ctx):
+    return (ctx.nuevo_producto(),), {}
+
+
+@caso("models.producto.editar_producto")
+def _(ctx):
+    pid = ctx.producto()
+    nombre, sku, _ = ctx.fila_producto(pid)
+    return (pid, nombre, 30.0, 15), {"sku": sku, "precio_costo": 20.0}
+
+
+@caso("models.producto.obtener_producto_por_id")
+def _(ctx):
+    return (ctx.producto(),), {}
+
+
+@caso("models.producto.obtener_producto_por_sku")
+def _(ctx):
+    return (ctx.fila_producto(ctx.producto())[1],), {}
+
+
+@caso("models.producto.obtener_producto_por_codigo")
+def _(ctx):
+    return (ctx.fila_producto(ctx.producto())[1],), {}
+
+
+@caso("models.producto.reducir_stock")
+def _(ctx):
+    return (ctx.producto_con_stock(),), {"cantidad": 1}
+
+
+@caso("models.producto.aumentar_stock")
+def _(ctx):
+    return (ctx.producto(), 1), {}
+
+
+@caso("models.producto.busqueda_fts_disponible")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.producto.expresion_busqueda")
+def _(ctx):
+    return ("pastilla freno bre",), {}
+
+
+@caso("models.producto.buscar_productos", etiqueta="prefijo corto")
+def _(ctx):
+    return (ctx.rnd.choice("abcdefmprst"),), {"limite": 500}
+
+
+@caso("models.producto.buscar_productos", etiqueta="dos palabras")
+def _(ctx):
+    nombre = ctx.fila_producto(ctx.producto())[0].split()
+    return (f"{nombre[0]} {nombre[-2][:3]}",), {"limite": 500}
+
+
+@caso("models.producto.buscar_productos", etiqueta="sku")
+def _(ctx):
+    return (ctx.fila_producto(ctx.producto())[1],), {"limite": 500}
+
+
+@caso("models.producto.filtrar_productos", etiqueta="categoría")
+def _(ctx):
+    return (), {"categoria_id": ctx.rnd.choice(ctx.categorias) if ctx.categorias else None}
+
+
+@caso("models.producto.filtrar_productos", etiqueta="sección con stock")
+def _(ctx):
+    seccion = ctx.fila_producto(ctx.producto())[2]
+    return (), {"seccion": (seccion or "").strip(), "solo_con_stock": True, "orden": "precio_venta"}
+
+
+@caso("models.producto.filtrar_productos", etiqueta="texto y categoría")
+def _(ctx):
+    nombre = ctx.fila_producto(ctx.producto())[0].split()
+    return (), {
+        "texto": nombre[0],
+        "categoria_id": ctx.rnd.choice(ctx.categorias) if ctx.categorias else None,
+        "limite": 500,
+    }
+
+
+@caso("models.producto.filtrar_productos", etiqueta="página ordenada")
+def _(ctx):
+    orden = ctx.rnd.choice(["nombre", "precio_venta", "stock"])
+    offset = ctx.rnd.randrange(max(1, ctx.max_producto - 200))
+    return (), {"orden": orden, "descendente": ctx.rnd.random() < 0.5, "limite": 200, "offset": offset}
+
+
+@caso("models.producto.contar_productos")
+def _(ctx):
+    return (), {"categoria_id": ctx.rnd.choice(ctx.categorias) if ctx.categorias else None}
+
+
+@caso("models.producto.secciones_disponibles")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.producto.productos_criticos")
+def _(ctx):
+    return (), {"umbral": 5}
+
+
+@caso("models.producto.existe_producto_por_codigo")
+def _(ctx):
+    return (ctx.fila_producto(ctx.producto())[1],), {}
+
+
+@caso("models.producto.existe_producto_por_nombre")
+def _(ctx):
+    return (ctx.fila_producto(ctx.producto())[0],), {}
+
+
+# ========================
+# models.ventas
+# ========================
+@caso("models.ventas.registrar_venta")
+def _(ctx):
+    return (ctx.producto_con_stock(), 1), {"cliente": "Consumidor Final"}
+
+
+@caso("models.ventas.registrar_venta_carrito", etiqueta="40 líneas")
+def _(ctx):
+    ids = {ctx.producto_con_stock() for _ in range(40)}
+    return ([{"id": pid, "cantidad": 1} for pid in ids],), {"cliente": "Consumidor Final"}
+
+
+@caso("models.ventas.obtener_ventas", etiqueta="todas", max_repeticiones=3)
+def _(ctx):
+    return (), {}
+
+
+@caso("models.ventas.obtener_ventas", etiqueta="limite 200")
+def _(ctx):
+    return (), {"limite": 200}
+
+
+@caso("models.ventas.obtener_ventas_pagina", etiqueta="primera")
+def _(ctx):
+    return (), {"limit": 50}
+
+
+@caso("models.ventas.obtener_ventas_pagina", etiqueta="siguiente")
+def _(ctx):
+    return (), {"after": ctx.cursor_historial, "limit": 50}
+
+
+@caso("models.ventas.obtener_ventas_pagina", etiqueta="más antiguas primero")
+def _(ctx):
+    return (), {"limit": 50, "ascendente": True}
+
+
+@caso("models.ventas.obtener_ventas_pagina", etiqueta="texto")
+def _(ctx):
+    return (), {"texto": ctx.fila_producto(ctx.producto())[0].split()[0], "limit": 50}
+
+
+@caso("models.ventas.obtener_ventas_pagina", etiqueta="cliente y rango")
+def _(ctx):
+    desde, hasta = ctx.rango_dias(30)
+    return (), {"cliente": "taller", "desde": desde, "hasta": hasta, "limit": 50}
+
+
+# ========================
+# models.reportes
+# ========================
+@caso("models.reportes.ventas_totales")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.ventas_por_producto", max_repeticiones=10)
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.ventas_por_dia", etiqueta="30 días")
+def _(ctx):
+    return ctx.rango_dias(30), {}
+
+
+@caso("models.reportes.ventas_por_mes")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.anios_con_ventas")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.ventas_mensuales", etiqueta="año y 2 anteriores")
+def _(ctx):
+    anio = int((ctx.dia_max or "2000")[:4])
+    return ([anio, anio - 1, anio - 2],), {}
+
+
+@caso("models.reportes.productos_bajo_stock")
+def _(ctx):
+    return (), {"umbral": 5}
+
+
+@caso("models.reportes.movimientos_recientes")
+def _(ctx):
+    return (), {"limite": 200}
+
+
+@caso("models.reportes.rango_timestamps")
+def _(ctx):
+    return ctx.rango_dias(30), {}
+
+
+@caso("models.reportes.ventas_por_periodo", etiqueta="30 días")
+def _(ctx):
+    return ctx.rango_dias(30), {}
+
+
+@caso("models.reportes.ventas_por_periodo", etiqueta="365 días", max_repeticiones=10)
+def _(ctx):
+    return ctx.rango_dias(365), {}
+
+
+@caso("models.reportes.kpis_ventas")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.marca_reportes")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.cambios_reportes", etiqueta="50 ventas nuevas")
+def _(ctx):
+    from models.reportes import marca_reportes
+
+    # Marca de "hace 50 ventas": el refresco incremental lee solo esas filas
+    marca = marca_reportes()
+    n, total, primer_id = get_connection().execute("""
+        SELECT COUNT(*), TOTAL(total), MIN(id)
+        FROM (SELECT id, total FROM ventas ORDER BY id DESC LIMIT 50)
+    """).fetchone()
+    marca.update(
+        data_version=-1,
+        ventas_id=(primer_id or 1) - 1,
+        n_ventas=marca["n_ventas"] - n,
+        total=round(marca["total"] - total, 2),
+        movimientos_id=max(0, marca["movimientos_id"] - 50),
+    )
+    return (marca,), {"umbral_stock": 5}
+
+
+@caso("models.reportes.reconstruir_resumenes", max_repeticiones=3)
+def _(ctx):
+    return (), {}
+
+
+@caso("models.reportes.verificar_resumenes", max_repeticiones=3)
+def _(ctx):
+    return (), {}
+
+
+# ========================
+# models.movimientos
+# ========================
+@caso("models.movimientos.registrar_movimiento")
+def _(ctx):
+    return (ctx.producto(), 5, "entrada"), {"motivo": "compra"}
+
+
+@caso("models.movimientos.obtener_movimientos", etiqueta="recientes")
+def _(ctx):
+    return (), {"limite": 100}
+
+
+@caso("models.movimientos.obtener_movimientos", etiqueta="por producto")
+def _(ctx):
+    return (), {"producto_id": ctx.producto(), "limite": 100}
+
+
+@caso("models.movimientos.obtener_movimientos_pagina", etiqueta="primera")
+def _(ctx):
+    return (), {"limit": 200}
+
+
+@caso("models.movimientos.obtener_movimientos_pagina", etiqueta="tipo y rango")
+def _(ctx):
+    desde, hasta = ctx.rango_dias(90)
+    return (), {"tipo": ctx.rnd.choice(["entrada", "salida"]), "desde": desde, "hasta": hasta, "limit": 50}
+
+
+@caso("models.movimientos.obtener_movimientos_pagina", etiqueta="producto")
+def _(ctx):
+    return (), {"producto_id": ctx.producto(), "limit": 50}
+
+
+@caso("models.movimientos.kardex_producto")
+def _(ctx):
+    return (ctx.producto(),), {"limit": 100}
+
+
+# ========================
+# models.categoria
+# ========================
+@caso("models.categoria.obtener_categorias")
+def _(ctx):
+    return (), {}
+
+
+@caso("models.categoria.agregar_categoria")
+def _(ctx):
+    return (ctx.unico("Categoría"),), {}
+
+
+@caso("models.categoria.eliminar_categoria")
+def _(ctx):
+    return (ctx.nueva_categoria(),), {}
+
+
+# ========================
+# models.exportar
+# ========================
+def _ruta_exportacion(nombre: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"avilcar_bench_{nombre}")
+
+
+@caso("models.exportar.exportar_consulta", etiqueta="categorías")
+def _(ctx):
+    return (_ruta_exportacion("categorias.csv"), "SELECT id, nombre FROM categorias"), {}
+
+
+@caso("models.exportar.exportar_productos", max_repeticiones=10)
+def _(ctx):
+    return (_ruta_exportacion("productos.csv"),), {}
+
+
+@caso("models.exportar.exportar_ventas", etiqueta="30 días")
+def _(ctx):
+    desde, hasta = ctx.rango_dias(30)
+    return (_ruta_exportacion("ventas.csv"),), {"desde": desde, "hasta": hasta}
+
+
+@caso("models.exportar.exportar_ventas", etiqueta="todas, gzip", max_repeticiones=3)
+def _(ctx):
+    return (_ruta_exportacion("ventas.csv.gz"),), {}
+
+
+@caso("models.exportar.exportar_movimientos", max_repeticiones=3)
+def _(ctx):
+    return (_ruta_exportacion("movimientos.csv"),), {}
@@ -0,0 +1,272 @@
+"""
+Generador de datos sintéticos
+-----------------------------
+Crea una inventario.db con el esquema real (las migraciones de la app) y la llena
+con productos, ventas y movimientos de stock con distribuciones parecidas a las de
+una tienda: pocos productos concentran la mayoría de las ventas, hay productos
+con stock bajo y las fechas cubren varios años.
+
+La carga masiva desactiva triggers e índices y los recrea al final; los índices
+FTS y las tablas ventas_resumen_* se reconstruyen de una vez.
+"""
+import logging
+import os
+import random
+import sqlite3
+import time
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+ESCALAS: Dict[str, Dict[str, int]] = {
+    "pequena": {"productos": 1_000, "ventas": 20_000, "movimientos": 40_000},
+    "mediana": {"productos": 10_000, "ventas": 500_000, "movimientos": 1_000_000},
+    "grande": {"productos": 100_000, "ventas": 5_000_000, "movimientos": 10_000_000},
+}
+
+LOTE = 50_000
+DIAS_HISTORIA = 3 * 365
+
+_TIPOS = [
+    "Filtro de aceite", "Filtro de aire", "Filtro de combustible", "Pastilla de freno",
+    "Disco de freno", "Bujía", "Amortiguador", "Correa de distribución", "Bomba de agua",
+    "Radiador", "Batería", "Aceite de motor", "Líquido de frenos", "Rodamiento",
+    "Embrague", "Alternador", "Termostato", "Sensor de oxígeno", "Faro", "Espejo",
+    "Plumilla", "Manguera", "Junta de culata", "Rótula", "Terminal de dirección",
+]
+_MARCAS = [
+    "Bosch", "NGK", "Mann", "Brembo", "Monroe", "Gates", "Valeo", "Denso", "SKF",
+    "Castrol", "Mobil", "Febi", "Sachs", "TRW", "Hella", "Mahle", "Champion",
+]
+_VEHICULOS = [
+    "Corolla", "Hilux", "Sail", "Aveo", "Spark", "Accent", "Tucson", "Sportage",
+    "Rio", "D-Max", "Vitara", "Swift", "Fiesta", "Ranger", "Mazda 3", "BT-50",
+    "Navara", "Sentra", "Versa", "Jetta", "Gol", "Logan", "Duster", "Picanto",
+]
+_SECCIONES = ["A", "B", "C", "D", "E", "F", "Bodega", "Vitrina", "Mostrador", "Patio"]
+_CATEGORIAS = [
+    "Filtros", "Frenos", "Suspensión", "Motor", "Eléctrico", "Lubricantes",
+    "Refrigeración", "Transmisión", "Dirección", "Iluminación", "Carrocería",
+    "Accesorios", "Encendido", "Escape", "Herramientas",
+]
+_CLIENTES = ["Consumidor Final"] * 20 + [
+    f"{n} {a}" for n in ("Juan", "María", "Carlos", "Ana", "Luis", "Rosa", "Pedro", "Lucía")
+    for a in ("Pérez", "González", "Rodríguez", "Torres", "Vera", "Mendoza")
+] + ["Taller El Rayo", "Mecánica Andina", "Transportes Sur", "Flota Municipal"]
+
+
+def _fecha(ts: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
+
+
+def _en_lotes(filas: Iterator[tuple], tamano: int = LOTE) -> Iterator[list]:
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _sin_triggers_ni_indices(conn, tablas):
+    """Quita triggers e índices de las tablas dadas; devuelve su SQL para recrearlos."""
+    marcas = ",".join("?" * len(tablas))
+    objetos = conn.execute(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('trigger', 'index') AND sql IS NOT NULL AND tbl_name IN ({marcas})
+    """, list(tablas)).fetchall()
+    for tipo, nombre, _ in objetos:
+        conn.execute(f"DROP {tipo.upper()} IF EXISTS {nombre}")
+    # Índices primero: los triggers no dependen de ellos
+    return [sql for tipo, _, sql in sorted(objetos, key=lambda o: o[0] != "index")]
+
+
+def _productos(rnd: random.Random, n: int, n_categorias: int) -> Iterator[tuple]:
+    for i in range(1, n + 1):
+        nombre = f"{rnd.choice(_TIPOS)} {rnd.choice(_MARCAS)} {rnd.choice(_VEHICULOS)} {i}"
+        costo = round(rnd.lognormvariate(2.5, 0.9), 2)
+        venta = round(costo * rnd.uniform(1.2, 1.8), 2)
+        minimo = rnd.choice((0, 2, 3, 5, 10))
+        # ~10 % con stock por debajo del mínimo
+        stock = rnd.randint(0, minimo) if rnd.random() < 0.10 else rnd.randint(minimo, 300)
+        yield (
+            nombre, costo, venta, stock, f"SKU-{i:07d}", minimo,
+            rnd.choice(_SECCIONES), rnd.randint(1, n_categorias),
+        )
+
+
+def _ventas(rnd, n, n_productos, precios, desde_ts, hasta_ts) -> Iterator[tuple]:
+    # Popularidad tipo Zipf: el producto k vende ~1/k de lo que vende el primero
+    pesos = list(accumulate(1.0 / (k + 1) for k in range(n_productos)))
+    orden = list(range(1, n_productos + 1))
+    rnd.shuffle(orden)
+    paso = (hasta_ts - desde_ts) / max(1, n)
+    for i in range(n):
+        ts = int(desde_ts + i * paso + rnd.uniform(0, paso))
+        pid = orden[rnd.choices(range(n_productos), cum_weights=pesos)[0]]
+        cantidad = 1 if rnd.random() < 0.7 else rnd.randint(2, 6)
+        yield (pid, cantidad, round(precios[pid] * cantidad, 2), _fecha(ts), ts, rnd.choice(_CLIENTES))
+
+
+def generar_base(
+    ruta,
+    productos: int,
+    ventas: int,
+    movimientos: int,
+    semilla: int = 42,
+    dias: int = DIAS_HISTORIA,
+    progreso=None,
+) -> Path:
+    """
+    Crea (o reemplaza) la base en `ruta` con las cantidades pedidas.
+    Cada venta genera su movimiento de salida; el resto de `movimientos`
+    son entradas por compra.
+    """
+    ruta = Path(ruta)
+    for sufijo in ("", "-wal", "-shm"):
+        Path(str(ruta) + sufijo).unlink(missing_ok=True)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    def avisar(etapa):
+        logger.info("%s", etapa)
+        if progreso:
+            progreso(etapa)
+
+    # Esquema real, con todas las migraciones
+    from database.db import close_all_connections
+    from database.migrations import migrate
+    anterior = os.environ.get("AVILCAR_DB")
+    os.environ["AVILCAR_DB"] = str(ruta)
+    try:
+        migrate()
+    finally:
+        close_all_connections()
+        if anterior is None:
+            os.environ.pop("AVILCAR_DB", None)
+        else:
+            os.environ["AVILCAR_DB"] = anterior
+
+    rnd = random.Random(semilla)
+    hasta_ts = int(time.time()) // 86400 * 86400
+    desde_ts = hasta_ts - dias * 86400
+
+    conn = sqlite3.connect(str(ruta), isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -200000")
+        conn.execute("BEGIN")
+
+        recrear = _sin_triggers_ni_indices(conn, ("productos", "ventas", "movimientos_stock", "categorias"))
+
+        avisar("categorías y proveedores")
+        conn.executemany("INSERT INTO categorias (nombre) VALUES (?)", [(c,) for c in _CATEGORIAS])
+        conn.executemany(
+            "INSERT INTO proveedores (nombre, contacto) VALUES (?, ?)",
+            [(f"Distribuidora {m}", f"ventas@{m.lower()}.example") for m in _MARCAS],
+        )
+
+        avisar(f"{productos} productos")
+        conn.executemany("""
+            INSERT INTO productos (nombre, precio_costo, precio_venta, stock, sku, minimo_stock, seccion, categoria_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, _productos(rnd, productos, len(_CATEGORIAS)))
+        precios = [0.0] + [r[0] for r in conn.execute("SELECT precio_venta FROM productos ORDER BY id")]
+
+        avisar(f"{ventas} ventas")
+        salidas = 0
+        for lote in _en_lotes(_ventas(rnd, ventas, productos, precios, desde_ts, hasta_ts)):
+            conn.executemany("""
+                INSERT INTO ventas (producto_id, cantidad, total, fecha, fecha_ts, cliente)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, lote)
+            if salidas < movimientos:
+                lote = lote[: movimientos - salidas]
+                conn.executemany("""
+                    INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha, fecha_ts)
+                    VALUES (?, ?, 'salida', 'venta', ?, ?)
+                """, [(v[0], v[1], v[3], v[4]) for v in lote])
+                salidas += len(lote)
+
+        entradas = movimientos - salidas
+        avisar(f"{entradas} movimientos de entrada")
+
+        def _entradas():
+            paso = (hasta_ts - desde_ts) / max(1, entradas)
+            for i in range(entradas):
+                ts = int(desde_ts + i * paso)
+                yield (rnd.randint(1, productos), rnd.randint(5, 50), "compra", _fecha(ts), ts)
+
+        for lote in _en_lotes(_entradas()):
+            conn.executemany("""
+                INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha, fecha_ts)
+                VALUES (?, ?, 'entrada', ?, ?, ?)
+            """, lote)
+
+        avisar("índices y triggers")
+        for sql in recrear:
+            conn.execute(sql)
+
+        avisar("índice de búsqueda y resúmenes")
+        tiene_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'productos_fts'"
+        ).fetchone()
+        if tiene_fts:
+            conn.execute("""
+                INSERT INTO productos_fts(rowid, nombre, sku, seccion, categoria)
+                SELECT p.id, p.nombre, COALESCE(p.sku, ''), COALESCE(p.seccion, ''), COALESCE(c.nombre, '')
+                FROM productos p LEFT JOIN categorias c ON c.id = p.categoria_id
+            """)
+            conn.execute("INSERT INTO productos_fts(productos_fts) VALUES ('optimize')")
+
+        from models.reportes import reconstruir_resumenes
+        reconstruir_resumenes(conn)
+
+        conn.execute("COMMIT")
+        avisar("ANALYZE")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA journal_mode = WAL")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return ruta
+
+
+def base_para_escala(escala: str, directorio=None, regenerar: bool = False, semilla: int = 42, progreso=None) -> Path:
+    """Devuelve la base de la escala pedida, generándola si no existe."""
+    import tempfile
+
+    cantidades = ESCALAS[escala]
+    directorio = Path(directorio or tempfile.gettempdir())
+    ruta = directorio / f"avilcar_bench_{escala}_{semilla}.db"
+    if regenerar or not ruta.exists():
+        generar_base(ruta, semilla=semilla, progreso=progreso, **cantidades)
+    return ruta
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera una inventario.db sintética")
+    parser.add_argument("ruta")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    parser.add_argument("--productos", type=int)
+    parser.add_argument("--ventas", type=int)
+    parser.add_argument("--movimientos", type=int)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    cantidades = dict(ESCALAS[args.escala])
+    for clave in cantidades:
+        if getattr(args, clave) is not None:
+            cantidades[clave] = getattr(args, clave)
+    inicio = time.perf_counter()
+    generar_base(args.ruta, semilla=args.semilla, progreso=print, **cantidades)
+    print(f"Base generada en {time.perf_counter() - inicio:.1f}s: {args.ruta}")
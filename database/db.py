@@ -1,20 +1,151 @@
+import atexit
+import calendar
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
 from pathlib import Path
 
+from database import query_stats
+
+# Segundos de inactividad tras los que se verifica la conexión antes de reutilizarla
+HEALTHCHECK_INTERVAL = 30.0
+
 # ========================
 # RUTAS Y CONEXIÓN
 # ========================
 def _db_path():
+    # Permite apuntar a otra base (pruebas, scripts) sin tocar el código
+    ruta = os.environ.get("AVILCAR_DB")
+    if ruta:
+        return ruta
     # Carpeta 'database' donde está este archivo
     base = Path(__file__).resolve().parent
     base.mkdir(parents=True, exist_ok=True)
     return str(base / "inventario.db")
 
-def get_connection():
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor que mide execute/executemany y los fetch* siguientes, y los acumula
+    en query_stats por forma de sentencia (iterar el cursor no se mide).
+    """
+    _measurement = None
+
+    def _timed(self, metodo, sql, parameters, guardar_params=True):
+        conn = self.connection
+        conn._trace_start = conn._trace_count
+        inicio = time.perf_counter()
+        try:
+            return metodo(self, sql, parameters)
+        finally:
+            self._measurement = query_stats.record(
+                conn, sql, parameters if guardar_params else None, time.perf_counter() - inicio
+            )
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Un iterador ya consumido no sirve para el plan; solo se guardan listas
+        return self._timed(
+            sqlite3.Cursor.executemany, sql, seq_of_parameters,
+            guardar_params=isinstance(seq_of_parameters, (list, tuple)),
+        )
+
+    def _fetch(self, metodo, *args):
+        inicio = time.perf_counter()
+        try:
+            return metodo(self, *args)
+        finally:
+            if self._measurement is not None:
+                query_stats.add_time(self._measurement, time.perf_counter() - inicio)
+
+    def fetchone(self):
+        return self._fetch(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(sqlite3.Cursor.fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(sqlite3.Cursor.fetchall)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión reutilizable (una por hilo).
+    - close() la devuelve al pool en vez de cerrar el archivo.
+    - Los bloques `with` anidados solo hacen commit/rollback en el más externo.
+    - Con query_stats.ENABLED cada sentencia se mide (ver TimedCursor).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._depth = 0
+        self._path = None
+        self._disposed = False
+        self._last_used = time.monotonic()
+        # Trace callback: sentencias que corrió SQLite (incluye las de triggers)
+        self._trace_count = 0
+        self._trace_start = 0
+        self._last_trace = None
+
+    def _trace(self, sql):
+        self._trace_count += 1
+        self._last_trace = sql
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = TimedCursor if query_stats.ENABLED else sqlite3.Cursor
+        return super().cursor(factory)
+
+    # Connection.execute* de C no pasa por los métodos de TimedCursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def __enter__(self):
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth = max(0, self._depth - 1)
+        if self._depth > 0:
+            return False
+        return super().__exit__(exc_type, exc, tb)
+
+    def close(self):
+        # Dentro de un bloque activo no se libera nada: la usa quien la abrió
+        if self._depth > 0 or self._disposed:
+            return
+        # Igual que al cerrar una conexión real: lo no confirmado se descarta
+        if self.in_transaction:
+            self.rollback()
+        self.row_factory = sqlite3.Row
+        self._last_used = time.monotonic()
+
+    def dispose(self):
+        """Cierra de verdad la conexión subyacente."""
+        if not self._disposed:
+            self._disposed = True
+            super().close()
+
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool: list[PooledConnection] = []
+
+
+def _open_connection(path):
     conn = sqlite3.connect(
-        _db_path(),
+        path,
         timeout=30,
-        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
+        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        factory=PooledConnection,
     )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
@@ -24,13 +155,138 @@ def get_connection():
         conn.execute("PRAGMA cache_size = 10000")
     except Exception:
         pass
+    if query_stats.ENABLED:
+        conn.set_trace_callback(conn._trace)
+    conn._path = path
+    with _pool_lock:
+        _pool.append(conn)
     return conn
 
+
+def _discard(conn):
+    with _pool_lock:
+        if conn in _pool:
+            _pool.remove(conn)
+    try:
+        conn.dispose()
+    except Exception:
+        pass
+
+
+def check_connection(conn) -> bool:
+    """Health check: True si la conexión responde a una consulta trivial."""
+    if getattr(conn, "_disposed", False):
+        return False
+    try:
+        conn.execute("SELECT 1").fetchone()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def get_connection():
+    """
+    Devuelve la conexión configurada del hilo actual, abriéndola si hace falta.
+    Las PRAGMAs se aplican una sola vez por conexión.
+    """
+    path = _db_path()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and conn._depth == 0:
+        idle = time.monotonic() - conn._last_used
+        if conn._path != path or conn._disposed or (idle > HEALTHCHECK_INTERVAL and not check_connection(conn)):
+            _discard(conn)
+            conn = None
+    if conn is None:
+        conn = _open_connection(path)
+        _local.conn = conn
+    conn._last_used = time.monotonic()
+    return conn
+
+
+@contextmanager
+def connection():
+    """
+    Context manager sobre la conexión del pool:
+    commit al salir, rollback si hay excepción (solo en el bloque más externo).
+    """
+    conn = get_connection()
+    with conn:
+        yield conn
+
+
+def close_all_connections():
+    """Cierra todas las conexiones del pool (todos los hilos)."""
+    with _pool_lock:
+        conns = list(_pool)
+        _pool.clear()
+    for conn in conns:
+        try:
+            conn.dispose()
+        except Exception:
+            pass
+    _local.conn = None
+
+
+atexit.register(close_all_connections)
+
+# ========================
+# FECHAS
+# ========================
+# Formato único para las columnas de texto `fecha`
+FECHA_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_FORMATOS_ENTRADA = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d",
+    "%d/%m/%Y", "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M",
+)
+
+
+def timestamp_from(value):
+    """
+    Epoch entero de una fecha (texto en cualquiera de los formatos históricos,
+    date o datetime). La hora local se guarda tal cual, tratada como UTC, igual
+    que strftime('%s', fecha) en SQLite. Devuelve None si no se puede interpretar.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        s = str(value).strip()
+        dt = None
+        for fmt in _FORMATOS_ENTRADA:
+            try:
+                dt = datetime.strptime(s, fmt)
+                break
+            except ValueError:
+                continue
+        if dt is None:
+            try:
+                dt = datetime.fromisoformat(s)
+            except ValueError:
+                return None
+    return calendar.timegm(dt.replace(tzinfo=None).timetuple())
+
+
+def now_with_timestamp():
+    """(fecha en FECHA_FORMAT, epoch) del instante actual, para escribir ventas/movimientos."""
+    ahora = datetime.now().replace(microsecond=0)
+    return ahora.strftime(FECHA_FORMAT), timestamp_from(ahora)
+
+
 # ========================
 # CREACIÓN BASE DE TABLAS
 # ========================
-def create_tables():
-    conn = get_connection()
+def create_tables(conn=None):
+    """
+    Crea las tablas base si no existen.
+    Con `conn` explícita no confirma: lo hace quien controla la transacción.
+    """
+    propia = conn is None
+    if propia:
+        conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("""
@@ -125,14 +381,21 @@ def create_tables():
     cur.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_producto_fecha ON movimientos_stock(producto_id, fecha)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_compraitems_producto ON compra_items(producto_id)")
 
-    conn.commit()
-    conn.close()
+    if propia:
+        conn.commit()
+        conn.close()
 
 # ========================
 # MIGRACIÓN: COLUMNAS Y TRIGGERS
 # ========================
-def migrate_schema():
-    conn = get_connection()
+def migrate_schema(conn=None):
+    """
+    Agrega columnas faltantes y recrea los triggers de updated_at.
+    Con `conn` explícita no confirma: lo hace quien controla la transacción.
+    """
+    propia = conn is None
+    if propia:
+        conn = get_connection()
     cur = conn.cursor()
 
     # 1) Eliminar triggers viejos
@@ -171,45 +434,75 @@ def migrate_schema():
                 cur.execute(f"ALTER TABLE {tabla} ADD COLUMN {col} {ddl}")
 
     # 3) Triggers seguros para updated_at (SQLite compatible)
-    cur.executescript("""
-    CREATE TRIGGER IF NOT EXISTS trg_productos_updated_at
-    AFTER UPDATE ON productos
-    FOR EACH ROW
-    WHEN NEW.updated_at = OLD.updated_at
-    BEGIN
-      UPDATE productos
-      SET updated_at = CURRENT_TIMESTAMP
-      WHERE id = NEW.id;
-    END;
-
-    CREATE TRIGGER IF NOT EXISTS trg_movimientos_updated_at
-    AFTER UPDATE ON movimientos_stock
-    FOR EACH ROW
-    WHEN NEW.updated_at = OLD.updated_at
-    BEGIN
-      UPDATE movimientos_stock
-      SET updated_at = CURRENT_TIMESTAMP
-      WHERE id = NEW.id;
-    END;
-
-    CREATE TRIGGER IF NOT EXISTS trg_ventas_updated_at
-    AFTER UPDATE ON ventas
-    FOR EACH ROW
-    WHEN NEW.updated_at = OLD.updated_at
-    BEGIN
-      UPDATE ventas
-      SET updated_at = CURRENT_TIMESTAMP
-      WHERE id = NEW.id;
-    END;
-    """)
+    # (sin executescript: haría COMMIT implícito en medio de la migración)
+    for tabla, prefijo in (
+        ("productos", "trg_productos"),
+        ("movimientos_stock", "trg_movimientos"),
+        ("ventas", "trg_ventas"),
+    ):
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {prefijo}_updated_at
+        AFTER UPDATE ON {tabla}
+        FOR EACH ROW
+        WHEN NEW.updated_at = OLD.updated_at
+        BEGIN
+          UPDATE {tabla}
+          SET updated_at = CURRENT_TIMESTAMP
+          WHERE id = NEW.id;
+        END
+        """)
+
+    if propia:
+        conn.commit()
+        conn.close()
+
+# ========================
+# MANTENIMIENTO
+# ========================
+def optimize_database(analyze=False, conn=None) -> None:
+    """
+    Actualiza las estadísticas del planificador. Sin `analyze` corre
+    PRAGMA optimize (solo analiza lo que lo necesita, rápido); con `analyze`,
+    ANALYZE completo.
+    """
+    if conn is None:
+        with connection() as conn:
+            return optimize_database(analyze, conn)
+    conn.execute("ANALYZE" if analyze else "PRAGMA optimize")
+
+
+def vacuum_database() -> dict:
+    """
+    Compacta la base (VACUUM) y vacía el WAL. Necesita acceso exclusivo: con la
+    aplicación abierta sobre la misma base puede fallar por bloqueo.
+    Devuelve el tamaño en bytes antes y después.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        raise RuntimeError("VACUUM no puede correr dentro de una transacción.")
+
+    def tamano():
+        paginas = conn.execute("PRAGMA page_count").fetchone()[0]
+        return paginas * conn.execute("PRAGMA page_size").fetchone()[0]
+
+    antes = tamano()
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {"antes": antes, "despues": tamano()}
+
 
-    conn.commit()
-    conn.close()
+def integrity_check(conn=None) -> list:
+    """PRAGMA integrity_check: lista vacía si la base está sana."""
+    if conn is None:
+        with connection() as conn:
+            return integrity_check(conn)
+    filas = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+    return [] if filas == ["ok"] else filas
 
 # ========================
 # INICIALIZACIÓN
 # ========================
 if __name__ == "__main__":
-    create_tables()
-    migrate_schema()
-    print("Esquema de base de datos creado y migrado correctamente con triggers seguros.")
+    from database.migrations import migrate
+    version = migrate(progress=lambda v, desc, f: print(f"[{v}] {desc}: {f:.0%}"))
+    print(f"Esquema de base de datos al día (versión {version}).")
@@ -0,0 +1,219 @@
+"""
+Ejecutor de consultas en segundo plano
+--------------------------------------
+Corre funciones de los modelos en hilos de trabajo (cada uno con su conexión
+del pool) y devuelve `concurrent.futures.Future`.
+
+Para Tk:
+- run_async(widget, fn, ..., on_done=..., on_error=...) entrega el resultado en
+  el hilo de la interfaz: los futures terminados pasan por una cola que se vacía
+  con root.after (Tk no es thread-safe).
+- Con `key`, una petición nueva reemplaza a la anterior con la misma clave
+  (p. ej. la búsqueda de la tecla previa): si no empezó se cancela, si está
+  corriendo se interrumpe con Connection.interrupt(), y su resultado se descarta.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from database.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+POLL_MS = 30
+
+
+class DBExecutor:
+    def __init__(self, workers: int = 1, name: str = "db-worker"):
+        self._workers = max(1, int(workers))
+        self._name = name
+        self._tasks: "queue.Queue" = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running: Dict[Future, Any] = {}     # future -> conexión que lo ejecuta
+        self._latest: Dict[Hashable, Future] = {}  # key -> última petición vigente
+        # Entregas pendientes para Tk: (widget, key, future, on_done, on_error)
+        self._ui_done: "queue.Queue" = queue.Queue()
+        self._ui_pending = 0
+        self._poll_job = None
+        self._poll_root = None
+
+    # ----------------------
+    # Hilos de trabajo
+    # ----------------------
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self._workers:
+                t = threading.Thread(
+                    target=self._worker,
+                    name=f"{self._name}-{len(self._threads) + 1}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self):
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                break
+            fut, fn, args, kwargs = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            conn = get_connection()
+            with self._lock:
+                self._running[fut] = conn
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                fut.set_exception(e)
+            else:
+                fut.set_result(result)
+            finally:
+                with self._lock:
+                    self._running.pop(fut, None)
+
+    def submit(self, fn: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> Future:
+        """Encola fn(*args, **kwargs). Con `key`, cancela la petición previa de esa clave."""
+        fut: Future = Future()
+        if key is not None:
+            with self._lock:
+                prev = self._latest.get(key)
+                self._latest[key] = fut
+            if prev is not None:
+                self.cancel(prev)
+        self._tasks.put((fut, fn, args, kwargs))
+        self._ensure_started()
+        return fut
+
+    def cancel(self, fut: Future) -> None:
+        """Cancela si aún no empezó; si está corriendo, interrumpe su consulta."""
+        if fut.cancel():
+            return
+        with self._lock:
+            conn = self._running.get(fut)
+            if conn is not None:
+                try:
+                    conn.interrupt()
+                except Exception:
+                    pass
+
+    def is_current(self, key: Optional[Hashable], fut: Future) -> bool:
+        if key is None:
+            return True
+        with self._lock:
+            return self._latest.get(key) is fut
+
+    def shutdown(self) -> None:
+        with self._lock:
+            running = list(self._running)
+            n = len(self._threads)
+        for fut in running:
+            self.cancel(fut)
+        for _ in range(n):
+            self._tasks.put(None)
+
+    # ----------------------
+    # Integración con Tk
+    # ----------------------
+    def run_async(
+        self,
+        widget,
+        fn: Callable,
+        *args,
+        key: Optional[Hashable] = None,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Ejecuta fn en segundo plano y llama on_done/on_error en el hilo de Tk.
+        Debe invocarse desde el hilo de la interfaz.
+        """
+        fut = self.submit(fn, *args, key=key, **kwargs)
+        self._ui_pending += 1
+        fut.add_done_callback(lambda f: self._ui_done.put((widget, key, f, on_done, on_error)))
+        self._schedule_poll(widget)
+        return fut
+
+    def _schedule_poll(self, widget):
+        if self._poll_job is not None:
+            return
+        try:
+            root = widget._root()
+            self._poll_root = root
+            self._poll_job = root.after(POLL_MS, self._poll)
+        except Exception:
+            self._poll_job = None
+
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                widget, key, fut, on_done, on_error = self._ui_done.get_nowait()
+            except queue.Empty:
+                break
+            self._ui_pending -= 1
+            self._deliver(widget, key, fut, on_done, on_error)
+        if self._ui_pending > 0 and self._poll_root is not None:
+            try:
+                self._poll_job = self._poll_root.after(POLL_MS, self._poll)
+            except Exception:
+                self._poll_job = None
+
+    def _deliver(self, widget, key, fut, on_done, on_error):
+        if fut.cancelled() or not self.is_current(key, fut):
+            return  # reemplazada por una petición más nueva
+        if key is not None:
+            with self._lock:
+                if self._latest.get(key) is fut:
+                    del self._latest[key]
+        try:
+            if not widget.winfo_exists():
+                return
+        except Exception:
+            return
+        try:
+            exc = fut.exception()
+            if exc is not None:
+                if on_error:
+                    on_error(exc)
+                else:
+                    logger.error("Error en consulta en segundo plano", exc_info=exc)
+            elif on_done:
+                on_done(fut.result())
+        except Exception:
+            logger.exception("Error entregando resultado a la interfaz")
+
+
+# ==========================
+# Instancias compartidas
+# ==========================
+_executor: Optional[DBExecutor] = None
+_export_executor: Optional[DBExecutor] = None
+
+
+def get_executor() -> DBExecutor:
+    global _executor
+    if _executor is None:
+        _executor = DBExecutor()
+    return _executor
+
+
+def get_export_executor() -> DBExecutor:
+    """
+    Hilo aparte para tareas largas (exportaciones): mientras corren, las
+    consultas de la interfaz siguen pasando por get_executor() sin esperar.
+    """
+    global _export_executor
+    if _export_executor is None:
+        _export_executor = DBExecutor(name="db-export")
+    return _export_executor
+
+
+def run_async(widget, fn: Callable, *args, **kwargs) -> Future:
+    """Atajo a get_executor().run_async(...)."""
+    return get_executor().run_async(widget, fn, *args, **kwargs)
@@ -0,0 +1,547 @@
+"""
+Migraciones versionadas del esquema
+-----------------------------------
+Cada paso tiene un número y se registra con @migration. El último paso
+aplicado queda en PRAGMA user_version, así que una base ya al día solo
+necesita leer ese valor al arrancar.
+
+Cada migración corre en su propia transacción (BEGIN IMMEDIATE) junto con
+el cambio de user_version: o se aplica completa o no se aplica.
+"""
+import logging
+import sqlite3
+from typing import Callable, Dict, Optional, Tuple
+
+from database.db import get_connection, create_tables, migrate_schema, timestamp_from
+
+logger = logging.getLogger(__name__)
+
+# progress(version, descripcion, fraccion 0..1)
+ProgressCallback = Callable[[int, str, float], None]
+
+# {version: (descripcion, funcion(conn, reportar))}
+MIGRATIONS: Dict[int, Tuple[str, Callable]] = {}
+
+
+def migration(version: int, descripcion: str):
+    """Registra una función como el paso `version` del esquema."""
+    def decorador(fn):
+        if version in MIGRATIONS:
+            raise ValueError(f"Migración {version} duplicada")
+        MIGRATIONS[version] = (descripcion, fn)
+        return fn
+    return decorador
+
+
+def current_version(conn=None) -> int:
+    if conn is None:
+        conn = get_connection()
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def latest_version() -> int:
+    return max(MIGRATIONS) if MIGRATIONS else 0
+
+
+def migrate(progress: Optional[ProgressCallback] = None) -> int:
+    """
+    Aplica las migraciones pendientes en orden y devuelve la versión final.
+    Si la base ya está al día no ejecuta nada más que la lectura de user_version.
+    """
+    conn = get_connection()
+    version = current_version(conn)
+    if version >= latest_version():
+        return version
+
+    for v in sorted(MIGRATIONS):
+        if v <= version:
+            continue
+        descripcion, fn = MIGRATIONS[v]
+        logger.info("Aplicando migración %s: %s", v, descripcion)
+
+        def reportar(fraccion: float, v=v, descripcion=descripcion):
+            if progress:
+                progress(v, descripcion, max(0.0, min(1.0, float(fraccion))))
+
+        reportar(0.0)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fn(conn, reportar)
+            conn.execute(f"PRAGMA user_version = {int(v)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("Falló la migración %s", v)
+            raise
+        reportar(1.0)
+        version = v
+
+    return version
+
+
+# ========================
+# PASOS
+# ========================
+@migration(1, "Tablas base, columnas y triggers de updated_at")
+def _m001_esquema_base(conn, reportar):
+    create_tables(conn)
+    reportar(0.5)
+    migrate_schema(conn)
+
+
+def _fts5_disponible(conn) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+_FTS_VALORES = """
+    NEW.id, NEW.nombre, COALESCE(NEW.sku, ''), COALESCE(NEW.seccion, ''),
+    COALESCE((SELECT nombre FROM categorias WHERE id = NEW.categoria_id), '')
+"""
+
+
+@migration(2, "Índice de búsqueda de texto completo (FTS5) de productos")
+def _m002_productos_fts(conn, reportar):
+    # Sin FTS5 en esta build de SQLite la búsqueda sigue usando LIKE
+    if not _fts5_disponible(conn):
+        logger.warning("SQLite sin FTS5: se omite el índice de búsqueda de productos")
+        return
+
+    conn.execute("DROP TABLE IF EXISTS productos_fts")
+    conn.execute("""
+        CREATE VIRTUAL TABLE productos_fts USING fts5(
+            nombre, sku, seccion, categoria,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '1 2 3'
+        )
+    """)
+
+    # Sincronización: rowid del índice = productos.id
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ai
+        AFTER INSERT ON productos
+        BEGIN
+          INSERT INTO productos_fts(rowid, nombre, sku, seccion, categoria)
+          VALUES ({_FTS_VALORES});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_productos_fts_au
+        AFTER UPDATE OF nombre, sku, seccion, categoria_id ON productos
+        BEGIN
+          DELETE FROM productos_fts WHERE rowid = OLD.id;
+          INSERT INTO productos_fts(rowid, nombre, sku, seccion, categoria)
+          VALUES ({_FTS_VALORES});
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ad
+        AFTER DELETE ON productos
+        BEGIN
+          DELETE FROM productos_fts WHERE rowid = OLD.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_categorias_fts_au
+        AFTER UPDATE OF nombre ON categorias
+        BEGIN
+          UPDATE productos_fts SET categoria = NEW.nombre
+          WHERE rowid IN (SELECT id FROM productos WHERE categoria_id = NEW.id);
+        END
+    """)
+    reportar(0.2)
+
+    conn.execute("""
+        INSERT INTO productos_fts(rowid, nombre, sku, seccion, categoria)
+        SELECT p.id, p.nombre, COALESCE(p.sku, ''), COALESCE(p.seccion, ''), COALESCE(c.nombre, '')
+        FROM productos p
+        LEFT JOIN categorias c ON c.id = p.categoria_id
+    """)
+    reportar(0.9)
+    conn.execute("INSERT INTO productos_fts(productos_fts) VALUES ('optimize')")
+
+
+def _resumen_ventas_sql(ref: str, signo: str, dia: Optional[str] = None) -> str:
+    """
+    Sentencias que suman (signo '+') o restan ('-') la fila `ref` (NEW/OLD) en los resúmenes.
+    `dia`: expresión YYYY-MM-DD de la fila (por defecto date(fecha), la de la migración 3).
+    """
+    dia = dia or f"date({ref}.fecha)"
+    n = "1" if signo == "+" else "-1"
+    u = f"{signo}{ref}.cantidad"
+    t = f"{signo}{ref}.total"
+    return f"""
+      INSERT INTO ventas_resumen_producto(producto_id, unidades, total, n_ventas)
+      VALUES ({ref}.producto_id, {u}, {t}, {n})
+      ON CONFLICT(producto_id) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        total = total + excluded.total,
+        n_ventas = n_ventas + excluded.n_ventas;
+      INSERT INTO ventas_resumen_dia(dia, unidades, total, n_ventas)
+      SELECT {dia}, {u}, {t}, {n} WHERE {dia} IS NOT NULL
+      ON CONFLICT(dia) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        total = total + excluded.total,
+        n_ventas = n_ventas + excluded.n_ventas;
+      INSERT INTO ventas_resumen_mes(mes, unidades, total, n_ventas)
+      SELECT substr({dia}, 1, 7), {u}, {t}, {n} WHERE {dia} IS NOT NULL
+      ON CONFLICT(mes) DO UPDATE SET
+        unidades = unidades + excluded.unidades,
+        total = total + excluded.total,
+        n_ventas = n_ventas + excluded.n_ventas;
+    """
+
+
+def _resumen_limpieza_sql(dia: str = "date(OLD.fecha)") -> str:
+    return f"""
+      DELETE FROM ventas_resumen_producto WHERE producto_id = OLD.producto_id AND n_ventas <= 0;
+      DELETE FROM ventas_resumen_dia WHERE dia = {dia} AND n_ventas <= 0;
+      DELETE FROM ventas_resumen_mes WHERE mes = substr({dia}, 1, 7) AND n_ventas <= 0;
+"""
+
+
+@migration(3, "Resúmenes materializados de ventas (producto, día, mes)")
+def _m003_resumenes_ventas(conn, reportar):
+    for tabla, clave in (
+        ("ventas_resumen_producto", "producto_id INTEGER PRIMARY KEY"),
+        ("ventas_resumen_dia", "dia TEXT PRIMARY KEY"),      # YYYY-MM-DD
+        ("ventas_resumen_mes", "mes TEXT PRIMARY KEY"),      # YYYY-MM
+    ):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabla} (
+                {clave},
+                unidades INTEGER NOT NULL DEFAULT 0,
+                total REAL NOT NULL DEFAULT 0,
+                n_ventas INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ventas_resumen_ai
+        AFTER INSERT ON ventas
+        BEGIN
+          {_resumen_ventas_sql("NEW", "+")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ventas_resumen_ad
+        AFTER DELETE ON ventas
+        BEGIN
+          {_resumen_ventas_sql("OLD", "-")}
+          {_resumen_limpieza_sql()}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ventas_resumen_au
+        AFTER UPDATE OF producto_id, cantidad, total, fecha ON ventas
+        BEGIN
+          {_resumen_ventas_sql("OLD", "-")}
+          {_resumen_limpieza_sql()}
+          {_resumen_ventas_sql("NEW", "+")}
+        END
+    """)
+    # Se llenan en la migración 11, ya con la clave por fecha_ts
+    reportar(0.1)
+
+
+def _actualizar_por_lotes(conn, tabla: str, set_sql: str, reportar, lote: int = 100_000, params=()) -> None:
+    """
+    UPDATE {tabla} SET {set_sql} recorriendo el rowid por lotes, reportando
+    avance (0..1) tras cada lote. Corre dentro de la transacción de la migración.
+    """
+    minimo, maximo = conn.execute(f"SELECT MIN(id), MAX(id) FROM {tabla}").fetchone()
+    if minimo is None:
+        reportar(1.0)
+        return
+    ini = minimo
+    while ini <= maximo:
+        fin = ini + lote - 1
+        conn.execute(f"UPDATE {tabla} SET {set_sql} WHERE id BETWEEN ? AND ?", (*params, ini, fin))
+        reportar((min(fin, maximo) - minimo + 1) / (maximo - minimo + 1))
+        ini = fin + 1
+
+
+@migration(4, "Columna fecha_ts (epoch) en ventas y movimientos_stock")
+def _m004_fecha_ts(conn, reportar):
+    tablas = ("ventas", "movimientos_stock")
+    for tabla in tablas:
+        existentes = {r["name"] for r in conn.execute(f"PRAGMA table_info({tabla})")}
+        if "fecha_ts" not in existentes:
+            conn.execute(f"ALTER TABLE {tabla} ADD COLUMN fecha_ts INTEGER")
+
+    # El backfill no es una edición: se suspenden los triggers de updated_at
+    # (además duplicarían las escrituras) y se recrean al final.
+    triggers = conn.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND name IN ('trg_ventas_updated_at', 'trg_movimientos_updated_at')
+    """).fetchall()
+    for nombre, _ in triggers:
+        conn.execute(f"DROP TRIGGER {nombre}")
+
+    for i, tabla in enumerate(tablas):
+        _actualizar_por_lotes(
+            conn, tabla, "fecha_ts = CAST(strftime('%s', fecha) AS INTEGER)",
+            lambda f, i=i: reportar(0.05 + 0.8 * (i + f) / len(tablas)),
+        )
+        # Formatos que SQLite no entiende (p. ej. dd/mm/aaaa): se interpretan en Python
+        pendientes = conn.execute(f"SELECT id, fecha FROM {tabla} WHERE fecha_ts IS NULL").fetchall()
+        conn.executemany(
+            f"UPDATE {tabla} SET fecha_ts = ? WHERE id = ?",
+            [(timestamp_from(fecha), id_) for id_, fecha in pendientes],
+        )
+
+    for _, sql in triggers:
+        conn.execute(sql)
+
+    # Índices sobre el epoch; reemplazan a los de la columna de texto
+    conn.execute("DROP INDEX IF EXISTS idx_ventas_producto_fecha")
+    conn.execute("DROP INDEX IF EXISTS idx_movimientos_producto_fecha")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha_ts ON ventas(fecha_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_producto_ts ON ventas(producto_id, fecha_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_fecha_ts ON movimientos_stock(fecha_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_producto_ts ON movimientos_stock(producto_id, fecha_ts)")
+    reportar(0.95)
+
+    # Red de seguridad para escritores que no envían fecha_ts
+    for tabla, prefijo in (("ventas", "trg_ventas"), ("movimientos_stock", "trg_movimientos")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {prefijo}_fecha_ts_ai
+            AFTER INSERT ON {tabla}
+            FOR EACH ROW
+            WHEN NEW.fecha_ts IS NULL
+            BEGIN
+              UPDATE {tabla} SET fecha_ts = CAST(strftime('%s', NEW.fecha) AS INTEGER) WHERE id = NEW.id;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {prefijo}_fecha_ts_au
+            AFTER UPDATE OF fecha ON {tabla}
+            FOR EACH ROW
+            BEGIN
+              UPDATE {tabla} SET fecha_ts = CAST(strftime('%s', NEW.fecha) AS INTEGER) WHERE id = NEW.id;
+            END
+        """)
+
+
+@migration(5, "Índice cubriente para el historial de ventas paginado")
+def _m005_indice_historial(conn, reportar):
+    # (fecha_ts, id) es la clave del cursor; el resto de columnas evita leer la tabla.
+    # Cubre también lo que hacía idx_ventas_fecha_ts, que deja de ser necesario.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ventas_historial
+        ON ventas(fecha_ts, id, producto_id, cantidad, total, cliente, fecha)
+    """)
+    reportar(0.9)
+    conn.execute("DROP INDEX IF EXISTS idx_ventas_fecha_ts")
+
+
+@migration(6, "Registro de cambios del catálogo para la caché en memoria")
+def _m006_catalogo_cambios(conn, reportar):
+    # Cada alta/edición/baja de un producto deja su id; producto_id NULL indica
+    # que cambiaron categorías o proveedores (nombres que la caché une a cada fila).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalogo_cambios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            producto_id INTEGER
+        )
+    """)
+    # Nombres trg_catalogo_*: migrate_schema recrea y borra los trg_productos_*
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_productos_ai
+        AFTER INSERT ON productos
+        BEGIN
+          INSERT INTO catalogo_cambios(producto_id) VALUES (NEW.id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_productos_au
+        AFTER UPDATE ON productos
+        BEGIN
+          INSERT INTO catalogo_cambios(producto_id) VALUES (NEW.id);
+          INSERT INTO catalogo_cambios(producto_id) SELECT OLD.id WHERE OLD.id <> NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_productos_ad
+        AFTER DELETE ON productos
+        BEGIN
+          INSERT INTO catalogo_cambios(producto_id) VALUES (OLD.id);
+        END
+    """)
+    for tabla in ("categorias", "proveedores"):
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_catalogo_{tabla}_{evento.lower()}
+                AFTER {evento} ON {tabla}
+                BEGIN
+                  INSERT INTO catalogo_cambios(producto_id) VALUES (NULL);
+                END
+            """)
+    # El registro se recorta solo; quien se atrase más que esto recarga completo
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_cambios_recorte
+        AFTER INSERT ON catalogo_cambios
+        WHEN NEW.id % 1000 = 0
+        BEGIN
+          DELETE FROM catalogo_cambios WHERE id <= NEW.id - 10000;
+        END
+    """)
+
+
+@migration(7, "Sección normalizada e índices de los filtros de productos")
+def _m007_filtros_productos(conn, reportar):
+    # Columna generada (virtual, sin backfill ni triggers): la sección sin
+    # espacios y '' si no tiene. Los filtros comparan contra ella en lugar de
+    # TRIM/COALESCE sobre `seccion`, que impedían usar un índice.
+    columnas = {r["name"] for r in conn.execute("PRAGMA table_xinfo(productos)")}
+    if "seccion_norm" not in columnas:
+        conn.execute("""
+            ALTER TABLE productos ADD COLUMN seccion_norm TEXT
+            GENERATED ALWAYS AS (TRIM(COALESCE(seccion, ''))) VIRTUAL
+        """)
+    reportar(0.2)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria_id)")
+    reportar(0.6)
+    # También sirve para listar las secciones sin leer la tabla (DISTINCT sobre el índice)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_seccion ON productos(seccion_norm)")
+
+
+@migration(8, "Índices para ordenar la tabla de productos")
+def _m008_orden_productos(conn, reportar):
+    # La tabla de productos pide páginas con ORDER BY <columna> LIMIT/OFFSET:
+    # con índice cada página recorre solo sus filas en vez de ordenar todo.
+    # id y sku ya lo tienen; seccion usa idx_productos_seccion.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_nombre_nocase ON productos(nombre COLLATE NOCASE)")
+    reportar(0.4)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_precio_venta ON productos(precio_venta)")
+    reportar(0.7)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_stock ON productos(stock)")
+
+
+@migration(9, "Índice de movimientos por tipo y fecha")
+def _m009_movimientos_tipo(conn, reportar):
+    # Los recorridos por fecha ya usan idx_movimientos_fecha_ts (el id va
+    # implícito en el índice como desempate) e idx_movimientos_producto_ts.
+    # Filtrar por tipo ('entrada'/'salida') además de ordenar por fecha
+    # recorría el índice de fecha descartando la mitad de las filas.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_tipo_ts ON movimientos_stock(tipo, fecha_ts)")
+
+
+def _fecha_ts_sql(fecha: str) -> str:
+    """
+    Expresión SQL con el epoch de `fecha`: formatos ISO (los que entiende
+    strftime) y dd/mm/aaaa [HH:MM], los mismos que timestamp_from en Python.
+    NULL si no se puede interpretar.
+    """
+    f = f"trim({fecha})"
+    return f"""COALESCE(
+        CAST(strftime('%s', {f}) AS INTEGER),
+        CASE WHEN {f} LIKE '__/__/____%' THEN CAST(strftime('%s',
+            substr({f}, 7, 4) || '-' || substr({f}, 4, 2) || '-' || substr({f}, 1, 2) || substr({f}, 11)
+        ) AS INTEGER) END
+    )"""
+
+
+_FECHA_INVALIDA = "RAISE(ABORT, 'Fecha no válida: use YYYY-MM-DD [HH:MM:SS] o dd/mm/aaaa [HH:MM]')"
+
+
+@migration(10, "fecha_ts siempre presente en ventas y movimientos_stock")
+def _m010_fecha_ts_obligatoria(conn, reportar):
+    # Las claves de los cursores (fecha_ts, id) y los rangos de fechas no
+    # admiten NULL: una fila sin fecha_ts rompía la página siguiente y
+    # desaparecía del historial y del kardex.
+    tablas = (("ventas", "trg_ventas"), ("movimientos_stock", "trg_movimientos"))
+    for i, (tabla, prefijo) in enumerate(tablas):
+        pendientes = conn.execute(f"SELECT id, fecha FROM {tabla} WHERE fecha_ts IS NULL").fetchall()
+        valores = [(timestamp_from(fecha), id_) for id_, fecha in pendientes]
+        sin_fecha = [id_ for ts, id_ in valores if ts is None]
+        if sin_fecha:
+            # Fechas que nadie puede leer: quedan al principio de la historia, no fuera de ella
+            logger.warning("%s: %d filas con fecha ilegible quedan con fecha_ts = 0 (ids %s...)",
+                           tabla, len(sin_fecha), sin_fecha[:20])
+        conn.executemany(f"UPDATE {tabla} SET fecha_ts = ? WHERE id = ?",
+                         [(ts if ts is not None else 0, id_) for ts, id_ in valores])
+        reportar(0.1 + 0.7 * (i + 1) / len(tablas))
+
+        # Red de seguridad para escritores que no envían fecha_ts: mismos
+        # formatos que el backfill en Python; lo que no se entiende se rechaza.
+        conn.execute(f"DROP TRIGGER IF EXISTS {prefijo}_fecha_ts_ai")
+        conn.execute(f"DROP TRIGGER IF EXISTS {prefijo}_fecha_ts_au")
+        conn.execute(f"""
+            CREATE TRIGGER {prefijo}_fecha_ts_ai
+            AFTER INSERT ON {tabla}
+            FOR EACH ROW
+            WHEN NEW.fecha_ts IS NULL
+            BEGIN
+              SELECT {_FECHA_INVALIDA} WHERE {_fecha_ts_sql("NEW.fecha")} IS NULL;
+              UPDATE {tabla} SET fecha_ts = {_fecha_ts_sql("NEW.fecha")} WHERE id = NEW.id;
+            END
+        """)
+        # Cambió la fecha: se recalcula; si SQLite no la entiende vale el
+        # fecha_ts que haya enviado quien escribe, y si no envió ninguno se rechaza
+        conn.execute(f"""
+            CREATE TRIGGER {prefijo}_fecha_ts_au
+            AFTER UPDATE OF fecha ON {tabla}
+            FOR EACH ROW
+            BEGIN
+              SELECT {_FECHA_INVALIDA}
+              WHERE {_fecha_ts_sql("NEW.fecha")} IS NULL AND NEW.fecha_ts IS OLD.fecha_ts;
+              UPDATE {tabla} SET fecha_ts = COALESCE({_fecha_ts_sql("NEW.fecha")}, NEW.fecha_ts) WHERE id = NEW.id;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {prefijo}_fecha_ts_nn
+            BEFORE UPDATE OF fecha_ts ON {tabla}
+            FOR EACH ROW
+            WHEN NEW.fecha_ts IS NULL
+            BEGIN
+              SELECT RAISE(ABORT, 'fecha_ts no puede ser NULL');
+            END
+        """)
+
+
+def _dia_venta_sql(ref: str) -> str:
+    # fecha_ts puede estar aún NULL cuando corre el trigger del resumen (el
+    # trigger de fecha_ts la completa después): se calcula igual desde `fecha`
+    return f"date(COALESCE({ref}.fecha_ts, {_fecha_ts_sql(ref + '.fecha')}), 'unixepoch')"
+
+
+@migration(11, "Resúmenes de ventas por día/mes según fecha_ts")
+def _m011_resumenes_fecha_ts(conn, reportar):
+    # Los rangos, los KPIs y las exportaciones filtran por fecha_ts; con la clave
+    # date(fecha) las ventas en dd/mm/aaaa quedaban fuera de los resúmenes.
+    from models.reportes import reconstruir_resumenes
+
+    nuevo, viejo = _dia_venta_sql("NEW"), _dia_venta_sql("OLD")
+    for nombre in ("trg_ventas_resumen_ai", "trg_ventas_resumen_ad", "trg_ventas_resumen_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    conn.execute(f"""
+        CREATE TRIGGER trg_ventas_resumen_ai
+        AFTER INSERT ON ventas
+        BEGIN
+          {_resumen_ventas_sql("NEW", "+", nuevo)}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_ventas_resumen_ad
+        AFTER DELETE ON ventas
+        BEGIN
+          {_resumen_ventas_sql("OLD", "-", viejo)}
+          {_resumen_limpieza_sql(viejo)}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_ventas_resumen_au
+        AFTER UPDATE OF producto_id, cantidad, total, fecha, fecha_ts ON ventas
+        BEGIN
+          {_resumen_ventas_sql("OLD", "-", viejo)}
+          {_resumen_limpieza_sql(viejo)}
+          {_resumen_ventas_sql("NEW", "+", nuevo)}
+        END
+    """)
+    reportar(0.1)
+    reconstruir_resumenes(conn)
@@ -0,0 +1,197 @@
+"""
+Instrumentación de consultas
+----------------------------
+Las conexiones del pool (database/db.py) miden cada execute/executemany y los
+fetch* posteriores, y acumulan contadores por *forma* de sentencia: el SQL sin
+literales (números, textos, listas IN/VALUES), así `WHERE id = 7` y
+`WHERE id = ?` cuentan como la misma consulta.
+
+Las que superan SLOW_QUERY_MS se registran en el logger "database.queries"
+(logs/app.log en la app) con su forma y su EXPLAIN QUERY PLAN. Los valores
+(clientes, textos buscados) no se escriben salvo que se pida explícitamente.
+
+Configuración por entorno:
+- AVILCAR_SLOW_QUERY_MS: umbral de consulta lenta en ms (por defecto 200).
+- AVILCAR_QUERY_STATS=0: desactiva la medición.
+- AVILCAR_SLOW_QUERY_VALUES=1: (depuración) registra la sentencia lenta con
+  sus valores, tal como la ejecutó SQLite.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("database.queries")
+
+ENABLED = os.environ.get("AVILCAR_QUERY_STATS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("AVILCAR_SLOW_QUERY_MS", "200"))
+LOG_VALUES = os.environ.get("AVILCAR_SLOW_QUERY_VALUES", "0") == "1"
+
+# Tope de formas distintas; el resto se acumula en una sola entrada
+MAX_SHAPES = 2000
+OTRAS = "(otras sentencias)"
+
+# ========================
+# NORMALIZACIÓN
+# ========================
+_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_BLOB = re.compile(r"\b[xX]'[0-9a-fA-F]*'")
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r"(?<![\w.?])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_FILAS = re.compile(r"\(\?(?:, \?)*\)(?:\s*,\s*\(\?(?:, \?)*\))+")
+_ESPACIOS = re.compile(r"\s+")
+_PLAN_EXPLICABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql: str) -> str:
+    """SQL sin comentarios ni literales, con espacios colapsados."""
+    s = _COMENTARIOS.sub(" ", sql)
+    s = _BLOB.sub("?", s)
+    s = _TEXTO.sub("?", s)
+    s = _NUMERO.sub("?", s)
+    s = _ESPACIOS.sub(" ", s).strip()
+    s = _LISTA.sub("(?, ...)", s)
+    s = _FILAS.sub("(...)", s)
+    return s
+
+
+# ========================
+# CONTADORES
+# ========================
+_lock = threading.Lock()
+# forma -> [llamadas, total_ms, max_ms, lentas]
+_stats: Dict[str, list] = {}
+
+
+class Measurement:
+    """Una sentencia en curso: su tiempo crece con los fetch* del cursor."""
+    __slots__ = ("shape", "sql", "params", "conn", "elapsed_ms", "logged", "statements", "expanded")
+
+    def __init__(self, shape, sql, params, conn):
+        self.shape = shape
+        self.sql = sql
+        self.params = params
+        self.conn = conn
+        self.elapsed_ms = 0.0
+        self.logged = False
+        # Lo que vio el trace callback durante el execute: cuántas sentencias
+        # corrió SQLite (triggers incluidos) y, solo con LOG_VALUES, la última
+        # con sus valores
+        inicio = getattr(conn, "_trace_start", 0)
+        self.statements = getattr(conn, "_trace_count", inicio) - inicio
+        self.expanded = getattr(conn, "_last_trace", None) if self.statements and LOG_VALUES else None
+
+
+def _entrada(shape: str) -> list:
+    entrada = _stats.get(shape)
+    if entrada is None:
+        if len(_stats) >= MAX_SHAPES:
+            shape = OTRAS
+        entrada = _stats.setdefault(shape, [0, 0.0, 0.0, 0])
+    return entrada
+
+
+def record(conn, sql: str, params, seconds: float) -> Measurement:
+    """Registra una ejecución nueva y devuelve su medición (para sumar los fetch)."""
+    m = Measurement(normalize_sql(sql), sql, params, conn)
+    with _lock:
+        _entrada(m.shape)[0] += 1
+    add_time(m, seconds)
+    return m
+
+
+def add_time(m: Measurement, seconds: float) -> None:
+    ms = seconds * 1000.0
+    m.elapsed_ms += ms
+    lenta = not m.logged and m.elapsed_ms >= SLOW_QUERY_MS
+    with _lock:
+        entrada = _entrada(m.shape)
+        entrada[1] += ms
+        if m.elapsed_ms > entrada[2]:
+            entrada[2] = m.elapsed_ms
+        if lenta:
+            entrada[3] += 1
+    if lenta:
+        m.logged = True
+        _log_slow(m)
+
+
+def snapshot(top: Optional[int] = None) -> List[Dict]:
+    """Formas de sentencia ordenadas por tiempo total (mayor primero)."""
+    with _lock:
+        filas = [
+            {
+                "sql": shape,
+                "count": e[0],
+                "total_ms": round(e[1], 3),
+                "avg_ms": round(e[1] / e[0], 3) if e[0] else 0.0,
+                "max_ms": round(e[2], 3),
+                "slow": e[3],
+            }
+            for shape, e in _stats.items()
+        ]
+    filas.sort(key=lambda f: f["total_ms"], reverse=True)
+    return filas[:top] if top else filas
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def set_slow_query_threshold(ms: float) -> None:
+    global SLOW_QUERY_MS
+    SLOW_QUERY_MS = float(ms)
+
+
+def log_summary(top: int = 15) -> None:
+    """Escribe en el log las formas más costosas (p. ej. al cerrar la app)."""
+    filas = snapshot(top)
+    if not filas:
+        return
+    lineas = [
+        f"{f['total_ms']:>10.1f} ms total | {f['count']:>7} x | prom {f['avg_ms']:.2f} | max {f['max_ms']:.1f} | lentas {f['slow']} | {f['sql'][:200]}"
+        for f in filas
+    ]
+    logger.info("Consultas más costosas de la sesión:\n%s", "\n".join(lineas))
+
+
+# ========================
+# CONSULTAS LENTAS
+# ========================
+def _plan(m: Measurement) -> str:
+    if not m.sql.lstrip().upper().startswith(_PLAN_EXPLICABLE):
+        return "(sin plan)"
+    params = m.params
+    # executemany: basta el plan con la primera fila
+    if isinstance(params, (list, tuple)) and params and isinstance(params[0], (list, tuple, dict)):
+        params = params[0]
+    try:
+        # Sin pasar por la conexión medida: EXPLAIN no cuenta como consulta
+        filas = sqlite3.Connection.execute(m.conn, "EXPLAIN QUERY PLAN " + m.sql, params or ()).fetchall()
+    except Exception as e:
+        return f"(no disponible: {e})"
+    nivel = {0: -1}
+    lineas = []
+    for fila in filas:
+        id_, padre, detalle = fila[0], fila[1], fila[3]
+        nivel[id_] = nivel.get(padre, -1) + 1
+        lineas.append("  " * (nivel[id_] + 1) + str(detalle))
+    return "\n".join(lineas)
+
+
+def _log_slow(m: Measurement) -> None:
+    # Forma sin literales: el log no guarda nombres de clientes ni búsquedas
+    sql = _ESPACIOS.sub(" ", m.expanded).strip() if m.expanded else m.shape
+    try:
+        logger.warning(
+            "Consulta lenta (%.1f ms, %d sentencias SQLite): %s\nplan:\n%s",
+            m.elapsed_ms, m.statements, sql[:2000], _plan(m),
+        )
+    except Exception:
+        logger.exception("No se pudo registrar la consulta lenta")
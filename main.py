@@ -7,10 +7,13 @@ import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-from database.db import create_tables, migrate_schema
-from views.productos_view import ventana_productos
-from views.ventas_view import ventana_ventas
-from views.reportes_view import ventana_reportes
+from database import query_stats
+from database.migrations import migrate
+from views.window_manager import WindowManager
+
+# Las vistas (y matplotlib, que arrastra reportes_view) se importan la primera
+# vez que se abre cada ventana: la ventana principal se pinta sin esperarlas.
+# Ver abrir_productos / abrir_ventas / abrir_reportes.
 
 # ======================== CONSTANTES ========================
 APP_NAME = "AvilCar - Gestión de Inventario"
@@ -182,15 +185,118 @@ def add_hover_effect(button: ttk.Button):
 
 # ======================== ACCIONES ========================
 def safe_open(func, root, nombre):
+    # Atajos de teclado incluidos: nada se abre hasta que el esquema esté al día
+    if not getattr(root, "modulos_habilitados", True):
+        return
+    # La primera apertura incluye importar la vista: cursor de espera mientras tanto
+    try:
+        root.config(cursor="watch")
+        root.update_idletasks()
+    except tk.TclError:
+        pass
     try:
         func(root)
     except Exception as e:
         logging.exception(f"Error abriendo {nombre}")
         messagebox.showerror("Error", f"No se pudo abrir {nombre}:\n{e}")
+    finally:
+        try:
+            root.config(cursor="")
+        except tk.TclError:
+            pass
+
+# Importaciones dentro de la función (no importlib): PyInstaller las sigue detectando
+def _ventana_productos(root):
+    from views.productos_view import ventana_productos
+    return ventana_productos(root)
 
-def abrir_productos(root): safe_open(ventana_productos, root, "Productos")
-def abrir_ventas(root): safe_open(ventana_ventas, root, "Ventas")
-def abrir_reportes(root): safe_open(ventana_reportes, root, "Reportes")
+def _ventana_ventas(root):
+    from views.ventas_view import ventana_ventas
+    return ventana_ventas(root)
+
+def _ventana_reportes(root):
+    from views.reportes_view import ventana_reportes
+    return ventana_reportes(root)
+
+# Cada ventana se construye una vez; cerrarla la oculta y reabrirla la refresca
+def _gestor(root):
+    if getattr(root, "ventanas", None) is None:
+        root.ventanas = WindowManager(root)
+    return root.ventanas
+
+def abrir_productos(root): safe_open(lambda r: _gestor(r).open("Productos", _ventana_productos), root, "Productos")
+def abrir_ventas(root): safe_open(lambda r: _gestor(r).open("Ventas", _ventana_ventas), root, "Ventas")
+def abrir_reportes(root): safe_open(lambda r: _gestor(r).open("Reportes", _ventana_reportes), root, "Reportes")
+
+# ======================== PRECARGA ========================
+def programar_precarga(root: tk.Tk):
+    """
+    Cuando la ventana ya está pintada y ociosa, lee catálogo, categorías y
+    secciones en el hilo de BD: Productos y Ventas abren con esos datos.
+    """
+    def lanzar():
+        from database.executor import run_async
+        from models.precarga import precargar
+        run_async(
+            root, precargar, key="precarga",
+            on_error=lambda e: logging.warning("No se pudo precargar el catálogo: %s", e),
+        )
+    root.after_idle(lanzar)
+
+# ======================== ESQUEMA ========================
+def habilitar_modulos(root: tk.Tk, activo: bool):
+    """Botones, menú Archivo y atajos de Productos/Ventas/Reportes."""
+    root.modulos_habilitados = activo
+    for btn in getattr(root, "botones_modulos", ()):
+        btn.state(["!disabled"] if activo else ["disabled"])
+    menu = getattr(root, "menu_archivo", None)
+    if menu is not None:
+        for i in range(3):
+            menu.entryconfigure(i, state=("normal" if activo else "disabled"))
+
+def iniciar_base(root: tk.Tk):
+    """
+    Aplica las migraciones pendientes en el hilo de BD. Con el esquema al día
+    solo lee user_version; una migración larga (p. ej. rellenar fecha_ts en
+    muchas ventas) no congela la ventana: el avance se ve en la barra de
+    estado y los módulos se habilitan al terminar.
+    """
+    from database.executor import run_async
+
+    lbl = root.lbl_estado
+    texto_listo = lbl.cget("text")
+    avance = {"texto": None, "activo": True}
+
+    def progreso(v, desc, fraccion):
+        # Hilo de BD: solo datos; la barra de estado se actualiza desde Tk
+        avance["texto"] = f"Actualizando base de datos — migración {v} ({desc}): {fraccion * 100:.0f}%"
+        logging.info("Migración %s (%s): %.0f%%", v, desc, fraccion * 100)
+
+    def mostrar_avance():
+        if not avance["activo"]:
+            return
+        if avance["texto"]:
+            lbl.config(text=avance["texto"])
+        root.after(200, mostrar_avance)
+
+    def listo(version):
+        avance["activo"] = False
+        logging.info("Esquema de base de datos al día (versión %s).", version)
+        lbl.config(text=texto_listo)
+        root.config(cursor="")
+        habilitar_modulos(root, True)
+        programar_precarga(root)
+
+    def fallo(e):
+        avance["activo"] = False
+        logging.error("Error al crear/migrar esquema", exc_info=e)
+        messagebox.showerror("Base de datos", f"No se pudo inicializar la base de datos:\n{e}", parent=root)
+        root.destroy()
+
+    habilitar_modulos(root, False)
+    root.config(cursor="watch")
+    run_async(root, migrate, progreso, key="migraciones", on_done=listo, on_error=fallo)
+    mostrar_avance()
 
 def confirmar_salida(root: tk.Tk):
     if messagebox.askyesno("Salir", "¿Estás seguro que deseas salir de la aplicación?"):
@@ -207,6 +313,7 @@ def build_menubar(root: tk.Tk):
     m_archivo.add_separator()
     m_archivo.add_command(label="Salir\tCtrl+Q", command=lambda: confirmar_salida(root))
     menubar.add_cascade(label="Archivo", menu=m_archivo)
+    root.menu_archivo = m_archivo
 
     m_ver = tk.Menu(menubar, tearoff=0)
     m_ver.add_command(label="Maximizar", command=lambda: root.state("zoomed"))
@@ -258,6 +365,7 @@ def init_ui(root: tk.Tk):
         add_hover_effect(btn)
         ToolTip(btn, tip, delay_ms=350)
         botones_widgets.append(btn)
+    root.botones_modulos = botones_widgets[:3]  # Productos, Ventas, Reportes
 
     def do_layout(cols: int):
         for child in botones_widgets:
@@ -296,21 +404,13 @@ def init_ui(root: tk.Tk):
         style="Footer.TLabel"
     )
     lbl_left.pack(side="left")
+    root.lbl_estado = lbl_left
     lbl_right = ttk.Label(status, text="© 2025 AvilCar Systems", style="Footer.TLabel")
     lbl_right.pack(side="right")
 
 # ======================== MAIN ========================
 def main():
     setup_logging()
-    try:
-        create_tables()
-        migrate_schema()
-        logging.info("Esquema de base de datos creado/migrado correctamente.")
-    except Exception as e:
-        logging.exception("Error al crear/migrar esquema")
-        messagebox.showerror("Base de datos", f"No se pudo inicializar la base de datos:\n{e}")
-        return
-
     enable_high_dpi_pre_root()
     root = tk.Tk()
     root.title(APP_NAME)
@@ -348,7 +448,13 @@ def main():
             pass
     root.report_callback_exception = report_callback_exception
 
+    # Pintar la ventana antes de tocar la base; el esquema se pone al día en
+    # el hilo de BD y los módulos se habilitan cuando termina
+    root.update()
+    iniciar_base(root)
+
     root.mainloop()
+    query_stats.log_summary()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,283 @@
+"""
+Caché del catálogo de productos
+-------------------------------
+Una sola caché por proceso con búsqueda O(1) por id, SKU y nombre normalizado.
+
+- Antes de responder consulta PRAGMA data_version en su propia conexión: el
+  valor cambia solo si otra conexión (cualquier hilo del pool u otro proceso)
+  confirmó cambios. Si no cambió, la respuesta sale de memoria sin leer disco.
+- Si cambió, lee catalogo_cambios (migración 6) y recarga solo los productos
+  tocados; un cambio en categorías o proveedores recarga sus nombres.
+- Guarda como máximo MAX_PRODUCTOS filas. Si el catálogo no cabe, funciona como
+  LRU: los productos que no están en memoria se leen de la base al pedirlos.
+
+Las filas tienen el mismo formato que obtener_producto_por_id:
+(id, sku, nombre, precio_venta, precio_costo, stock, minimo_stock,
+ categoria_id, categoria_nombre, proveedor_id, proveedor_nombre, seccion_norm)
+"""
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from database.db import _db_path
+
+MAX_PRODUCTOS = 150_000
+
+# Hasta cuántos ids por consulta IN al recargar filas cambiadas
+_LOTE_IDS = 500
+
+_COLUMNAS = "id, sku, nombre, precio_venta, precio_costo, stock, minimo_stock, categoria_id, proveedor_id, seccion_norm"
+
+
+def normalizar_nombre(nombre) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados: 'Bujía  NGK' -> 'bujia ngk'."""
+    s = unicodedata.normalize("NFKD", str(nombre or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(s.casefold().split())
+
+
+class CatalogoCache:
+    def __init__(self, capacidad: int = MAX_PRODUCTOS):
+        self.capacidad = max(1, int(capacidad))
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ruta = None
+        self._vaciar()
+
+    def _vaciar(self):
+        self._filas: "OrderedDict[int, tuple]" = OrderedDict()  # id -> fila base, en orden LRU
+        self._por_sku: Dict[str, int] = {}
+        self._por_nombre: Dict[str, Set[int]] = {}
+        self._categorias: Dict[int, str] = {}
+        self._proveedores: Dict[int, str] = {}
+        self._cargado = False
+        self._completo = False      # True: todo el catálogo está en memoria
+        self._version = None        # último PRAGMA data_version visto
+        self._ultimo_cambio = 0     # último id leído de catalogo_cambios
+        self._con_registro = False  # existe catalogo_cambios
+
+    # ----------------------
+    # Conexión propia
+    # ----------------------
+    def _conexion(self) -> sqlite3.Connection:
+        # Conexión aparte del pool y de solo lectura: así toda escritura de la app
+        # viene de "otra conexión" y se refleja en data_version.
+        ruta = _db_path()
+        if self._conn is None or ruta != self._ruta:
+            self.cerrar()
+            self._conn = sqlite3.connect(ruta, timeout=30, check_same_thread=False, isolation_level=None)
+            self._ruta = ruta
+        return self._conn
+
+    def cerrar(self) -> None:
+        """Cierra la conexión y descarta todo lo cacheado."""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+            self._conn = None
+            self._ruta = None
+            self._vaciar()
+
+    # ----------------------
+    # Sincronización
+    # ----------------------
+    def _sincronizar(self) -> sqlite3.Connection:
+        conn = self._conexion()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._cargado and version == self._version:
+            return conn
+        # Una sola transacción de lectura: cambios y filas del mismo instante
+        conn.execute("BEGIN")
+        try:
+            if self._cargado and self._con_registro:
+                self._carga_incremental(conn)
+            else:
+                self._carga_completa(conn)
+        finally:
+            conn.execute("COMMIT")
+        self._version = version
+        return conn
+
+    def _carga_completa(self, conn):
+        self._vaciar()
+        self._con_registro = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalogo_cambios'"
+        ).fetchone() is not None
+        if self._con_registro:
+            self._ultimo_cambio = conn.execute("SELECT COALESCE(MAX(id), 0) FROM catalogo_cambios").fetchone()[0]
+        self._cargar_nombres(conn)
+        total = conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+        self._completo = total <= self.capacidad
+        for fila in conn.execute(f"SELECT {_COLUMNAS} FROM productos ORDER BY id LIMIT ?", (self.capacidad,)):
+            self._guardar(fila)
+        self._cargado = True
+
+    def _carga_incremental(self, conn):
+        minimo, maximo = conn.execute("SELECT MIN(id), MAX(id) FROM catalogo_cambios").fetchone()
+        if maximo is None or maximo == self._ultimo_cambio:
+            return  # cambió otra tabla (ventas, movimientos...): el catálogo sigue igual
+        if minimo > self._ultimo_cambio + 1 or maximo < self._ultimo_cambio:
+            # El registro se recortó más allá de lo leído (o la base se reemplazó)
+            self._carga_completa(conn)
+            return
+
+        ids = {r[0] for r in conn.execute(
+            "SELECT DISTINCT producto_id FROM catalogo_cambios WHERE id > ?", (self._ultimo_cambio,)
+        )}
+        if None in ids:
+            ids.discard(None)
+            self._cargar_nombres(conn)
+        if len(ids) > self.capacidad // 2:
+            self._carga_completa(conn)
+            return
+        self._recargar_filas(conn, ids)
+        self._ultimo_cambio = maximo
+
+    def _cargar_nombres(self, conn):
+        self._categorias = dict(conn.execute("SELECT id, nombre FROM categorias").fetchall())
+        self._proveedores = dict(conn.execute("SELECT id, nombre FROM proveedores").fetchall())
+
+    def _recargar_filas(self, conn, ids: Iterable[int]):
+        ids = list(ids)
+        for i in range(0, len(ids), _LOTE_IDS):
+            lote = ids[i:i + _LOTE_IDS]
+            marcas = ",".join("?" * len(lote))
+            filas = {f[0]: f for f in conn.execute(
+                f"SELECT {_COLUMNAS} FROM productos WHERE id IN ({marcas})", lote
+            )}
+            for pid in lote:
+                fila = filas.get(pid)
+                if fila is None:
+                    self._quitar(pid)
+                elif self._completo or pid in self._filas:
+                    # En modo LRU no se agregan productos que nadie pidió
+                    self._guardar(fila)
+
+    # ----------------------
+    # Índices en memoria
+    # ----------------------
+    def _guardar(self, fila: tuple):
+        pid = fila[0]
+        self._quitar(pid)
+        self._filas[pid] = fila
+        if fila[1]:
+            self._por_sku[fila[1]] = pid
+        self._por_nombre.setdefault(normalizar_nombre(fila[2]), set()).add(pid)
+        while len(self._filas) > self.capacidad:
+            viejo, fila_vieja = self._filas.popitem(last=False)
+            self._desindexar(viejo, fila_vieja)
+            self._completo = False
+
+    def _quitar(self, pid: int):
+        fila = self._filas.pop(pid, None)
+        if fila is not None:
+            self._desindexar(pid, fila)
+
+    def _desindexar(self, pid: int, fila: tuple):
+        if fila[1] and self._por_sku.get(fila[1]) == pid:
+            del self._por_sku[fila[1]]
+        clave = normalizar_nombre(fila[2])
+        ids = self._por_nombre.get(clave)
+        if ids is not None:
+            ids.discard(pid)
+            if not ids:
+                del self._por_nombre[clave]
+
+    def _componer(self, fila: tuple) -> tuple:
+        pid, sku, nombre, venta, costo, stock, minimo, cat_id, prov_id, seccion = fila
+        return (
+            pid, sku, nombre, venta, costo, stock, minimo,
+            cat_id, self._categorias.get(cat_id), prov_id, self._proveedores.get(prov_id),
+            seccion,
+        )
+
+    def _usar(self, pid: int) -> tuple:
+        self._filas.move_to_end(pid)
+        return self._componer(self._filas[pid])
+
+    # ----------------------
+    # Consultas
+    # ----------------------
+    def por_id(self, producto_id) -> Optional[tuple]:
+        with self._lock:
+            conn = self._sincronizar()
+            try:
+                pid = int(producto_id)
+            except (TypeError, ValueError):
+                return None
+            if pid in self._filas:
+                return self._usar(pid)
+            if self._completo:
+                return None
+            fila = conn.execute(f"SELECT {_COLUMNAS} FROM productos WHERE id = ?", (pid,)).fetchone()
+            if fila is None:
+                return None
+            self._guardar(fila)
+            return self._componer(fila)
+
+    def por_sku(self, sku) -> Optional[tuple]:
+        if not sku:
+            return None
+        with self._lock:
+            conn = self._sincronizar()
+            pid = self._por_sku.get(sku)
+            if pid is not None:
+                return self._usar(pid)
+            if self._completo:
+                return None
+            fila = conn.execute(f"SELECT {_COLUMNAS} FROM productos WHERE sku = ?", (sku,)).fetchone()
+            if fila is None:
+                return None
+            self._guardar(fila)
+            return self._componer(fila)
+
+    def por_nombre(self, nombre) -> List[tuple]:
+        """Productos cuyo nombre normalizado coincide (mayúsculas, tildes y espacios no cuentan)."""
+        clave = normalizar_nombre(nombre)
+        if not clave:
+            return []
+        with self._lock:
+            conn = self._sincronizar()
+            ids = set(self._por_nombre.get(clave, ()))
+            if not self._completo:
+                # Fuera de memoria solo se puede buscar el nombre exacto
+                for fila in conn.execute(f"SELECT {_COLUMNAS} FROM productos WHERE nombre = ?", (nombre,)):
+                    self._guardar(fila)
+                    ids.add(fila[0])
+            return [self._usar(pid) for pid in sorted(ids) if pid in self._filas]
+
+    def tamano(self) -> int:
+        with self._lock:
+            return len(self._filas)
+
+
+# ==========================
+# Instancia compartida
+# ==========================
+_catalogo: Optional[CatalogoCache] = None
+_catalogo_lock = threading.Lock()
+
+
+def obtener_catalogo() -> CatalogoCache:
+    global _catalogo
+    with _catalogo_lock:
+        if _catalogo is None:
+            _catalogo = CatalogoCache()
+        return _catalogo
+
+
+def producto_por_id(producto_id) -> Optional[tuple]:
+    return obtener_catalogo().por_id(producto_id)
+
+
+def producto_por_sku(sku) -> Optional[tuple]:
+    return obtener_catalogo().por_sku(sku)
+
+
+def productos_por_nombre(nombre) -> List[tuple]:
+    return obtener_catalogo().por_nombre(nombre)
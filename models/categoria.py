@@ -1,4 +1,4 @@
-from database.db import get_connection
+from database.db import connection
 
 # ====== UTILIDAD DE VALIDACIÓN ======
 def _normalizar_nombre(nombre):
@@ -15,7 +15,7 @@ def obtener_categorias():
     Retorna todas las categorías como lista de tuplas (id, nombre),
     ordenadas alfabéticamente por nombre.
     """
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, nombre
@@ -34,7 +34,7 @@ def agregar_categoria(nombre):
     """
     nombre = _normalizar_nombre(nombre)
 
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         # Verificar duplicado
         cursor.execute("SELECT 1 FROM categorias WHERE LOWER(nombre) = LOWER(?)", (nombre,))
@@ -52,7 +52,7 @@ def eliminar_categoria(id_categoria):
     Elimina la categoría indicada si no está asignada a ningún producto.
     Lanza ValueError si existen productos asociados o la categoría no existe.
     """
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
 
         # Verificar que exista
@@ -0,0 +1,183 @@
+"""
+Exportación a CSV en streaming
+------------------------------
+Las filas salen de un cursor de a `lote` (fetchmany) y se escriben al archivo
+a medida que llegan: la memoria no depende de cuántas filas se exporten.
+
+- Si la ruta termina en ".gz" el CSV se escribe comprimido con gzip.
+- Se escribe a un archivo temporal junto al destino y se renombra al terminar:
+  una exportación cancelada o fallida no deja un CSV a medias.
+- progreso(escritas, total) se llama tras cada lote; `total` puede ser None si
+  no se conoce de antemano.
+- cancelar: un threading.Event (o algo con is_set()); se revisa entre lotes y
+  la exportación termina con ExportacionCancelada.
+
+Las funciones no tocan widgets: se corren en un hilo aparte (ver
+views/exportar_dialogo.py).
+"""
+import csv
+import gzip
+import os
+from typing import Callable, Iterable, Optional, Sequence
+
+from database.db import connection
+from models.producto import ORDEN_PRODUCTOS, _filtros_sql
+from models.reportes import rango_timestamps
+from models.ventas import _filtros_historial
+
+# Filas por fetchmany: el costo por lote (progreso, cancelar) queda amortizado
+TAM_LOTE = 2000
+
+
+class ExportacionCancelada(Exception):
+    """El usuario canceló la exportación (no quedó archivo)."""
+
+
+def _abrir(ruta: str, comprimir: bool):
+    if comprimir:
+        return gzip.open(ruta, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(ruta, "w", newline="", encoding="utf-8")
+
+
+def exportar_consulta(
+    ruta: str,
+    sql: str,
+    params: Sequence = (),
+    encabezados: Optional[Iterable[str]] = None,
+    total: Optional[int] = None,
+    progreso: Optional[Callable[[int, Optional[int]], None]] = None,
+    cancelar=None,
+    comprimir: Optional[bool] = None,
+    lote: int = TAM_LOTE,
+) -> int:
+    """
+    Escribe en `ruta` el resultado de `sql` como CSV. Devuelve las filas escritas.
+    comprimir=None: según la extensión (".gz").
+    """
+    if comprimir is None:
+        comprimir = str(ruta).lower().endswith(".gz")
+    lote = max(1, int(lote))
+    temporal = f"{ruta}.parcial"
+    escritas = 0
+    try:
+        with _abrir(temporal, comprimir) as f, connection() as conn:
+            writer = csv.writer(f)
+            if encabezados:
+                writer.writerow(encabezados)
+            cursor = conn.cursor()
+            cursor.row_factory = None  # tuplas: csv no necesita sqlite3.Row
+            cursor.execute(sql, tuple(params))
+            while True:
+                if cancelar is not None and cancelar.is_set():
+                    raise ExportacionCancelada()
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                writer.writerows(filas)
+                escritas += len(filas)
+                if progreso:
+                    progreso(escritas, total)
+            cursor.close()
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    return escritas
+
+
+# ====== PRODUCTOS ======
+ENCABEZADOS_PRODUCTOS = (
+    "ID", "Codigo", "Nombre", "Precio Venta", "Precio Costo", "Stock",
+    "Minimo Stock", "Seccion", "Categoria", "Proveedor",
+)
+
+def exportar_productos(ruta, texto=None, categoria_id=None, seccion=None, solo_con_stock=False,
+                       orden="nombre", descendente=False, **opciones) -> int:
+    """Productos con los filtros y el orden de filtrar_productos."""
+    if orden not in ORDEN_PRODUCTOS:
+        raise ValueError(f"Orden no válido: {orden!r}")
+    where, params = _filtros_sql(texto, categoria_id, seccion, solo_con_stock)
+    sentido = "DESC" if descendente else "ASC"
+    with connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM productos p {where}", params).fetchone()[0]
+    sql = f"""
+        SELECT p.id, p.sku, p.nombre, p.precio_venta, p.precio_costo, p.stock,
+               p.minimo_stock, p.seccion_norm, c.nombre, pr.nombre
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+        {where}
+        ORDER BY {ORDEN_PRODUCTOS[orden]} {sentido}, p.id {sentido}
+    """
+    return exportar_consulta(ruta, sql, params, ENCABEZADOS_PRODUCTOS, total=total, **opciones)
+
+
+# ====== VENTAS ======
+ENCABEZADOS_VENTAS = ("ID", "Producto ID", "Producto", "Cantidad", "Total", "Fecha", "Cliente")
+
+def exportar_ventas(ruta, desde=None, hasta=None, cliente=None, texto=None, **opciones) -> int:
+    """
+    Ventas entre dos días YYYY-MM-DD (inclusive; sin fechas, todas), de la más
+    antigua a la más reciente, con los filtros de cliente y producto de
+    obtener_ventas_pagina (mismo WHERE: el archivo coincide con el historial).
+    """
+    filtros = _filtros_historial(cliente=cliente, texto=texto, desde=desde, hasta=hasta)
+    if filtros is None:
+        condiciones, params, indice = ["0"], [], ""  # el texto no coincide con ningún producto
+    else:
+        condiciones, params, indice = filtros
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    total = None
+    if not (cliente or texto):
+        with connection() as conn:
+            # El total sale de los resúmenes diarios: no recorre las ventas
+            total = conn.execute(
+                "SELECT COALESCE(SUM(n_ventas), 0) FROM ventas_resumen_dia WHERE dia BETWEEN date(?) AND date(?)",
+                ((desde or "0001-01-01")[:10], (hasta or "9999-12-31")[:10]),
+            ).fetchone()[0]
+    sql = f"""
+        SELECT v.id, v.producto_id, COALESCE(p.nombre, 'Desconocido'),
+               v.cantidad, ROUND(v.total, 2), v.fecha, COALESCE(v.cliente, '')
+        FROM ventas v {indice}
+        LEFT JOIN productos p ON v.producto_id = p.id
+        {where}
+        ORDER BY v.fecha_ts, v.id
+    """
+    return exportar_consulta(ruta, sql, params, ENCABEZADOS_VENTAS, total=total, **opciones)
+
+
+# ====== MOVIMIENTOS ======
+ENCABEZADOS_MOVIMIENTOS = ("ID", "Producto ID", "Producto", "Cantidad", "Tipo", "Motivo", "Fecha")
+
+def exportar_movimientos(ruta, desde=None, hasta=None, producto_id=None, limite=None, **opciones) -> int:
+    """
+    Movimientos de stock (opcionalmente de un producto y/o entre dos días), por fecha.
+    Con `limite`, solo los más recientes y del más nuevo al más viejo, como
+    movimientos_recientes.
+    """
+    condiciones, params = [], []
+    if desde or hasta:
+        condiciones.append("m.fecha_ts >= ? AND m.fecha_ts < ?")
+        params.extend(rango_timestamps(desde or "0001-01-01", hasta or "9999-12-30"))
+    if producto_id is not None:
+        condiciones.append("m.producto_id = ?")
+        params.append(int(producto_id))
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    with connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM movimientos_stock m {where}", params).fetchone()[0]
+    orden = "m.fecha_ts, m.id"
+    if limite is not None:
+        orden = "m.fecha_ts DESC, m.id DESC LIMIT ?"
+        params.append(max(0, int(limite)))
+        total = min(total, params[-1])
+    sql = f"""
+        SELECT m.id, m.producto_id, p.nombre, m.cantidad, m.tipo, m.motivo, m.fecha
+        FROM movimientos_stock m
+        LEFT JOIN productos p ON m.producto_id = p.id
+        {where}
+        ORDER BY {orden}
+    """
+    return exportar_consulta(ruta, sql, params, ENCABEZADOS_MOVIMIENTOS, total=total, **opciones)
@@ -0,0 +1,175 @@
+"""
+Importación de productos desde CSV
+----------------------------------
+Lee el archivo por lotes (no lo carga entero) y hace upsert por SKU en una sola
+transacción: si el SKU existe se actualiza el producto, si no se inserta.
+
+- Acepta el formato de exportar_productos (encabezados "Codigo", "Precio Venta",
+  ...) y también los nombres de columna de la tabla (sku, precio_venta, ...).
+  Solo "Nombre" es obligatoria; las columnas que falten no se tocan al
+  actualizar. "ID" y "Proveedor" se ignoran.
+- Las categorías se buscan por nombre y se crean si no existen.
+- Las filas con datos inválidos se omiten y se informan con su número de línea.
+- Archivos .gz se leen descomprimiendo al vuelo.
+
+El stock importado reemplaza al actual sin registrar movimientos (igual que
+editar_producto); el kardex lo refleja en su saldo inicial.
+"""
+import csv
+import gzip
+import unicodedata
+from typing import Callable, Dict, Optional
+
+from database.db import connection
+
+TAM_LOTE = 1000
+
+# Cuántos errores de fila se guardan en el resultado (el resto solo se cuenta)
+MAX_ERRORES = 50
+
+# Encabezado normalizado -> columna de productos
+_COLUMNAS = {
+    "nombre": "nombre",
+    "codigo": "sku",
+    "sku": "sku",
+    "precio venta": "precio_venta",
+    "precio_venta": "precio_venta",
+    "precio costo": "precio_costo",
+    "precio_costo": "precio_costo",
+    "stock": "stock",
+    "minimo stock": "minimo_stock",
+    "minimo_stock": "minimo_stock",
+    "seccion": "seccion",
+    "categoria": "categoria",
+}
+
+_NUMERICAS = {"precio_venta": float, "precio_costo": float, "stock": int, "minimo_stock": int}
+
+
+def _normalizar_encabezado(texto) -> str:
+    s = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode()
+    return " ".join(s.strip().lower().split())
+
+
+def _abrir(ruta: str):
+    if str(ruta).lower().endswith(".gz"):
+        return gzip.open(ruta, "rt", newline="", encoding="utf-8-sig")
+    return open(ruta, newline="", encoding="utf-8-sig")
+
+
+def _numero(tipo, valor):
+    valor = (valor or "").strip().replace("$", "").replace(",", "")
+    if not valor:
+        return None
+    return tipo(float(valor)) if tipo is int else tipo(valor)
+
+
+def importar_productos(ruta: str, progreso: Optional[Callable[[int], None]] = None,
+                       lote: int = TAM_LOTE) -> Dict:
+    """
+    Importa productos desde un CSV. Devuelve
+    {"insertados", "actualizados", "omitidos", "errores": [(línea, mensaje), ...]}.
+    Si algo falla a mitad de camino no queda nada importado (una transacción).
+    """
+    resultado = {"insertados": 0, "actualizados": 0, "omitidos": 0, "errores": []}
+    lote = max(1, int(lote))
+
+    def omitir(linea, mensaje):
+        resultado["omitidos"] += 1
+        if len(resultado["errores"]) < MAX_ERRORES:
+            resultado["errores"].append((linea, mensaje))
+
+    with _abrir(ruta) as f, connection() as conn:
+        lector = csv.reader(f)
+        encabezados = next(lector, None)
+        if not encabezados:
+            raise ValueError("El archivo está vacío.")
+        indices = {}
+        for i, h in enumerate(encabezados):
+            columna = _COLUMNAS.get(_normalizar_encabezado(h))
+            if columna and columna not in indices:
+                indices[columna] = i
+        if "nombre" not in indices:
+            raise ValueError("Falta la columna 'Nombre'.")
+        columnas = [c for c in indices if c != "categoria"] + (["categoria_id"] if "categoria" in indices else [])
+        actualizables = [c for c in columnas if c not in ("sku", "nombre")] + ["nombre"]
+
+        categorias = {n.casefold(): i for i, n in conn.execute("SELECT id, nombre FROM categorias")}
+
+        def categoria_id(nombre):
+            nombre = (nombre or "").strip()
+            if not nombre:
+                return None
+            cid = categorias.get(nombre.casefold())
+            if cid is None:
+                cid = conn.execute("INSERT INTO categorias (nombre) VALUES (?)", (nombre,)).lastrowid
+                categorias[nombre.casefold()] = cid
+            return cid
+
+        marcas = ", ".join("?" * len(columnas))
+        insertar = f"INSERT INTO productos ({', '.join(columnas)}) VALUES ({marcas})"
+        upsert = insertar + " ON CONFLICT(sku) DO UPDATE SET " + ", ".join(
+            f"{c} = excluded.{c}" for c in actualizables
+        )
+
+        i_sku = columnas.index("sku") if "sku" in columnas else None
+
+        def escribir(filas):
+            con_sku = [f for f in filas if i_sku is not None and f[i_sku]]
+            sin_sku = [f for f in filas if i_sku is None or not f[i_sku]]
+            existentes = set()
+            skus = list({f[i_sku] for f in con_sku})
+            for i in range(0, len(skus), 500):
+                parte = skus[i:i + 500]
+                existentes.update(r[0] for r in conn.execute(
+                    f"SELECT sku FROM productos WHERE sku IN ({','.join('?' * len(parte))})", parte
+                ))
+            for f in con_sku:
+                # Un SKU repetido en el archivo actualiza lo que insertó su primera aparición
+                if f[i_sku] in existentes:
+                    resultado["actualizados"] += 1
+                else:
+                    resultado["insertados"] += 1
+                    existentes.add(f[i_sku])
+            resultado["insertados"] += len(sin_sku)
+            if con_sku:
+                conn.executemany(upsert, con_sku)
+            if sin_sku:
+                conn.executemany(insertar, sin_sku)
+
+        pendientes, leidas = [], 0
+        for linea, fila in enumerate(lector, start=2):
+            if not any(c.strip() for c in fila):
+                continue
+            valores = {}
+            try:
+                for columna, i in indices.items():
+                    valor = fila[i] if i < len(fila) else ""
+                    if columna in _NUMERICAS:
+                        valores[columna] = _numero(_NUMERICAS[columna], valor)
+                    elif columna == "categoria":
+                        valores["categoria_id"] = categoria_id(valor)
+                    else:
+                        valores[columna] = valor.strip() or None
+            except ValueError as e:
+                omitir(linea, f"valor numérico inválido ({e})")
+                continue
+            if not valores.get("nombre"):
+                omitir(linea, "sin nombre")
+                continue
+            # Vacío = 0 (como los DEFAULT de la tabla)
+            for columna in ("precio_venta", "precio_costo", "stock", "minimo_stock"):
+                if columna in valores and valores[columna] is None:
+                    valores[columna] = 0
+            pendientes.append(tuple(valores[c] for c in columnas))
+            leidas += 1
+            if len(pendientes) >= lote:
+                escribir(pendientes)
+                pendientes = []
+                if progreso:
+                    progreso(leidas)
+        if pendientes:
+            escribir(pendientes)
+            if progreso:
+                progreso(leidas)
+    return resultado
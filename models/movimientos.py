@@ -1,5 +1,5 @@
-import datetime
-from database.db import get_connection
+from database.db import connection, get_connection, now_with_timestamp
+from models.reportes import rango_timestamps
 
 TIPOS_VALIDOS = ("entrada", "salida")
 
@@ -37,25 +37,21 @@ def registrar_movimiento(producto_id, cantidad, tipo, motivo=None, conn=None):
     """
     tipo = _validar_movimiento(producto_id, cantidad, tipo)
 
-    cerrar_conexion = False
+    # Sin conexión explícita se usa la del pool; dentro de una transacción
+    # ajena el `with` anidado no confirma nada (lo hace quien la abrió).
     if conn is None:
         conn = get_connection()
-        cerrar_conexion = True
 
-    fecha = datetime.datetime.now().isoformat(timespec="seconds")
+    fecha, fecha_ts = now_with_timestamp()
 
     with conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha)
-            VALUES (?, ?, ?, ?, ?)
-        """, (producto_id, cantidad, tipo, motivo, fecha))
+            INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha, fecha_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (producto_id, cantidad, tipo, motivo, fecha, fecha_ts))
         movimiento_id = cursor.lastrowid
 
-    if cerrar_conexion:
-        conn.commit()
-        conn.close()
-
     return movimiento_id
 
 
@@ -71,23 +67,151 @@ def obtener_movimientos(producto_id=None, limite=100):
     Returns:
         list[tuple]: Lista de movimientos como tuplas.
     """
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         if producto_id is not None:
             cursor.execute("""
                 SELECT id, producto_id, cantidad, tipo, motivo, fecha, created_at, updated_at
                 FROM movimientos_stock
                 WHERE producto_id = ?
-                ORDER BY fecha DESC, id DESC
+                ORDER BY fecha_ts DESC, id DESC
                 LIMIT ?
             """, (producto_id, limite))
         else:
             cursor.execute("""
                 SELECT id, producto_id, cantidad, tipo, motivo, fecha, created_at, updated_at
                 FROM movimientos_stock
-                ORDER BY fecha DESC, id DESC
+                ORDER BY fecha_ts DESC, id DESC
                 LIMIT ?
             """, (limite,))
         filas = cursor.fetchall()
 
     return [tuple(r) for r in filas] if filas else []
+
+
+# ====== PÁGINAS DE MOVIMIENTOS ======
+def obtener_movimientos_pagina(after=None, limit=50, producto_id=None, tipo=None, desde=None, hasta=None):
+    """
+    Una página de movimientos, del más reciente al más antiguo.
+
+    Args:
+        after (tuple, opcional): cursor (fecha_ts, id) de la última fila de la página anterior.
+        limit (int): filas por página.
+        producto_id (int, opcional): solo los de ese producto.
+        tipo (str, opcional): 'entrada' o 'salida'.
+        desde / hasta (str, opcional): días YYYY-MM-DD, inclusive.
+
+    Returns:
+        dict: "filas" (id, producto_id, nombre, cantidad, tipo, motivo, fecha)
+        y "siguiente" (cursor de la próxima página o None).
+
+    Cada filtro tiene su índice (producto, tipo o fecha, todos con fecha_ts):
+    la página se lee en orden desde el cursor, sin ordenar la tabla.
+    """
+    limit = max(1, int(limit))
+    condiciones, params = [], []
+    if desde or hasta:
+        condiciones.append("m.fecha_ts >= ? AND m.fecha_ts < ?")
+        params.extend(rango_timestamps(desde or "0001-01-01", hasta or "9999-12-30"))
+    if producto_id is not None:
+        condiciones.append("m.producto_id = ?")
+        params.append(int(producto_id))
+    if tipo:
+        tipo = tipo.strip().lower()
+        if tipo not in TIPOS_VALIDOS:
+            raise ValueError(f"Tipo inválido: '{tipo}'. Debe ser 'entrada' o 'salida'.")
+        condiciones.append("m.tipo = ?")
+        params.append(tipo)
+    if after is not None:
+        condiciones.append("(m.fecha_ts, m.id) < (?, ?)")
+        params.extend([int(after[0] or 0), int(after[1])])
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        filas = cursor.execute(f"""
+            SELECT m.id, m.producto_id, p.nombre, m.cantidad, m.tipo, m.motivo, m.fecha, COALESCE(m.fecha_ts, 0)
+            FROM movimientos_stock m
+            LEFT JOIN productos p ON m.producto_id = p.id
+            {where}
+            ORDER BY m.fecha_ts DESC, m.id DESC
+            LIMIT ?
+        """, (*params, limit + 1)).fetchall()
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    return {
+        "filas": [f[:7] for f in filas],
+        "siguiente": (filas[-1][7], filas[-1][0]) if hay_mas and filas else None,
+    }
+
+
+# ====== KARDEX ======
+def kardex_producto(producto_id, desde=None, hasta=None, after=None, limit=100):
+    """
+    Kardex de un producto: sus movimientos en orden cronológico con el saldo
+    después de cada uno (suma acumulada con una función de ventana).
+
+    El saldo parte de "saldo_inicial": el stock que los movimientos no explican
+    (carga inicial, ediciones manuales del stock), así el saldo del último
+    movimiento coincide con el stock actual. Con desde/hasta el saldo sigue
+    contando todo lo anterior al rango.
+
+    Returns:
+        dict: "filas" (id, fecha, tipo, motivo, entrada, salida, saldo),
+        "siguiente" (cursor (fecha_ts, id) o None) y "saldo_inicial".
+        None si el producto no existe.
+    """
+    producto_id = int(producto_id)
+    limit = max(1, int(limit))
+    condiciones, params = [], []
+    if desde or hasta:
+        condiciones.append("fecha_ts >= ? AND fecha_ts < ?")
+        params.extend(rango_timestamps(desde or "0001-01-01", hasta or "9999-12-30"))
+    if after is not None:
+        condiciones.append("(fecha_ts, id) > (?, ?)")
+        params.extend([int(after[0] or 0), int(after[1])])
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+    with connection() as conn:
+        fila = conn.execute("""
+            SELECT p.stock - COALESCE((
+                SELECT SUM(CASE WHEN m.tipo = 'entrada' THEN m.cantidad ELSE -m.cantidad END)
+                FROM movimientos_stock m WHERE m.producto_id = p.id
+            ), 0)
+            FROM productos p WHERE p.id = ?
+        """, (producto_id,)).fetchone()
+        if fila is None:
+            return None
+        saldo_inicial = fila[0]
+
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        filas = cursor.execute(f"""
+            WITH k AS (
+                -- Misma clave en el saldo, el filtro y el cursor, aun con fecha_ts NULL
+                SELECT id, fecha, COALESCE(fecha_ts, 0) AS fecha_ts, tipo, motivo, cantidad,
+                       SUM(CASE WHEN tipo = 'entrada' THEN cantidad ELSE -cantidad END)
+                           OVER (ORDER BY COALESCE(fecha_ts, 0), id ROWS UNBOUNDED PRECEDING) AS neto
+                FROM movimientos_stock
+                WHERE producto_id = ?
+            )
+            SELECT id, fecha, tipo, motivo,
+                   CASE WHEN tipo = 'entrada' THEN cantidad ELSE 0 END,
+                   CASE WHEN tipo = 'salida' THEN cantidad ELSE 0 END,
+                   ? + neto,
+                   fecha_ts
+            FROM k
+            {where}
+            ORDER BY fecha_ts, id
+            LIMIT ?
+        """, (producto_id, saldo_inicial, *params, limit + 1)).fetchall()
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    return {
+        "filas": [f[:7] for f in filas],
+        "siguiente": (filas[-1][7], filas[-1][0]) if hay_mas and filas else None,
+        "saldo_inicial": saldo_inicial,
+    }
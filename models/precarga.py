@@ -0,0 +1,85 @@
+"""
+Datos precargados del catálogo
+------------------------------
+La ventana principal llama a precargar() en el hilo de BD apenas se pinta
+(after_idle). Las ventanas de Productos y Ventas que se abran después se
+dibujan con estos datos sin esperar a la base y luego piden los datos frescos
+como siempre: lo que cambió entre tanto se corrige al llegar la respuesta.
+
+Lo precargado:
+- productos: las primeras MAX_PRODUCTOS filas de filtrar_productos ordenadas
+  por nombre (sin filtros), y el total del catálogo.
+- categorias: obtener_categorias().
+- secciones: secciones_disponibles().
+
+Las vistas que vuelven a leer alguno de estos datos sin filtros lo guardan con
+guardar(), así la próxima apertura parte de lo último visto. Mientras falte
+alguna de las tres partes datos() devuelve None y las ventanas cargan como antes.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from models.categoria import obtener_categorias
+from models.producto import contar_productos, filtrar_productos, secciones_disponibles
+
+logger = logging.getLogger(__name__)
+
+# Tope de filas en memoria: Ventas muestra el catálogo completo, Productos solo
+# usa las primeras páginas
+MAX_PRODUCTOS = 20_000
+
+_PARTES = {"productos", "categorias", "secciones"}
+
+_lock = threading.Lock()
+_datos: Optional[dict] = None
+
+
+def precargar(max_productos: int = MAX_PRODUCTOS) -> dict:
+    """Lee catálogo, categorías y secciones (hilo de BD) y los deja en memoria."""
+    inicio = time.perf_counter()
+    productos = filtrar_productos(orden="nombre", limite=max_productos)
+    total = len(productos) if len(productos) < max_productos else contar_productos()
+    guardar(
+        productos=productos,
+        total=total,
+        categorias=obtener_categorias(),
+        secciones=secciones_disponibles(),
+    )
+    logger.info("Catálogo precargado: %d de %d productos en %.0f ms.",
+                len(productos), total, (time.perf_counter() - inicio) * 1000)
+    return datos()
+
+
+def datos() -> Optional[dict]:
+    """
+    {"productos", "total", "completo", "categorias", "secciones"} o None.
+    completo: `productos` es el catálogo entero. No modificar lo devuelto.
+    """
+    with _lock:
+        if _datos is None or not _PARTES <= _datos.keys():
+            return None
+        return _datos
+
+
+def guardar(**partes) -> None:
+    """
+    Reemplaza partes de lo precargado (productos junto con total; categorias;
+    secciones). datos() empieza a devolverlas cuando están las tres.
+    """
+    global _datos
+    with _lock:
+        nuevos = dict(_datos or {})
+        nuevos.update(partes)
+        if "productos" in partes:
+            total = partes.get("total", len(partes["productos"]))
+            nuevos["total"] = total
+            nuevos["completo"] = len(partes["productos"]) >= total
+        _datos = nuevos  # dict nuevo: quien leyó el anterior no lo ve cambiar
+
+
+def invalidar() -> None:
+    global _datos
+    with _lock:
+        _datos = None
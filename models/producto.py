@@ -1,27 +1,28 @@
-from database.db import get_connection
+from database.db import _db_path, connection
+from models.catalogo import producto_por_id, producto_por_sku, productos_por_nombre
 from models.movimientos import registrar_movimiento
 
 # ====== AGREGAR PRODUCTO ======
-def agregar_producto(nombre, precio_venta, stock, sku=None, precio_costo=0, minimo_stock=0, categoria_id=None, proveedor_id=None):
+def agregar_producto(nombre, precio_venta, stock, sku=None, precio_costo=0, minimo_stock=0, categoria_id=None, proveedor_id=None, seccion=None):
     """Agrega un nuevo producto a la base de datos."""
     if sku and existe_producto_por_codigo(sku):
         raise ValueError(f"Código '{sku}' ya existe")
     if nombre and existe_producto_por_nombre(nombre):
         raise ValueError(f"Producto con nombre '{nombre}' ya existe")
     
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO productos (nombre, precio_venta, stock, sku, precio_costo, minimo_stock, categoria_id, proveedor_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (nombre, precio_venta, stock, sku, precio_costo, minimo_stock, categoria_id, proveedor_id))
+            INSERT INTO productos (nombre, precio_venta, stock, sku, precio_costo, minimo_stock, categoria_id, proveedor_id, seccion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (nombre, precio_venta, stock, sku, precio_costo, minimo_stock, categoria_id, proveedor_id, seccion))
         conn.commit()
 
 
 # ====== OBTENER PRODUCTOS ======
 def obtener_productos():
     """Devuelve todos los productos como tuplas con info de categoría y proveedor."""
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT p.id, p.sku, p.nombre, p.precio_venta, p.precio_costo,
@@ -38,16 +39,16 @@ def obtener_productos():
 
 # ====== ELIMINAR PRODUCTO ======
 def eliminar_producto(id_producto):
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM productos WHERE id = ?", (id_producto,))
         conn.commit()
 
 
 # ====== EDITAR PRODUCTO ======
-def editar_producto(id_producto, nombre, precio_venta, stock, sku=None, precio_costo=0, minimo_stock=0, categoria_id=None, proveedor_id=None):
-    """Edita un producto existente validando duplicados."""
-    with get_connection() as conn:
+def editar_producto(id_producto, nombre, precio_venta, stock, sku=None, precio_costo=0, minimo_stock=0, categoria_id=None, proveedor_id=None, seccion=None):
+    """Edita un producto existente validando duplicados (seccion=None la deja como está)."""
+    with connection() as conn:
         cursor = conn.cursor()
         if sku:
             cursor.execute("SELECT id FROM productos WHERE sku = ? AND id != ?", (sku, id_producto))
@@ -60,45 +61,21 @@ def editar_producto(id_producto, nombre, precio_venta, stock, sku=None, precio_c
         cursor.execute("""
             UPDATE productos
             SET nombre = ?, precio_venta = ?, stock = ?, sku = ?, 
-                precio_costo = ?, minimo_stock = ?, categoria_id = ?, proveedor_id = ?
+                precio_costo = ?, minimo_stock = ?, categoria_id = ?, proveedor_id = ?,
+                seccion = COALESCE(?, seccion)
             WHERE id = ?
-        """, (nombre, precio_venta, stock, sku, precio_costo, minimo_stock, categoria_id, proveedor_id, id_producto))
+        """, (nombre, precio_venta, stock, sku, precio_costo, minimo_stock, categoria_id, proveedor_id, seccion, id_producto))
         conn.commit()
 
 
-# ====== OBTENER POR ID ======
+# ====== OBTENER POR ID / SKU ======
+# Salen de la caché del catálogo: sin cambios en la base no se lee disco.
 def obtener_producto_por_id(id_producto):
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.id, p.sku, p.nombre, p.precio_venta, p.precio_costo,
-                   p.stock, p.minimo_stock,
-                   p.categoria_id, c.nombre as categoria_nombre,
-                   p.proveedor_id, pr.nombre as proveedor_nombre
-            FROM productos p
-            LEFT JOIN categorias c ON p.categoria_id = c.id
-            LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
-            WHERE p.id = ?
-        """, (id_producto,))
-        row = cursor.fetchone()
-    return tuple(row) if row else None
+    return producto_por_id(id_producto)
 
 
 def obtener_producto_por_sku(sku):
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.id, p.sku, p.nombre, p.precio_venta, p.precio_costo,
-                   p.stock, p.minimo_stock,
-                   p.categoria_id, c.nombre as categoria_nombre,
-                   p.proveedor_id, pr.nombre as proveedor_nombre
-            FROM productos p
-            LEFT JOIN categorias c ON p.categoria_id = c.id
-            LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
-            WHERE p.sku = ?
-        """, (sku,))
-        row = cursor.fetchone()
-    return tuple(row) if row else None
+    return producto_por_sku(sku)
 
 def obtener_producto_por_codigo(codigo):
     return obtener_producto_por_sku(codigo)
@@ -109,7 +86,7 @@ def reducir_stock(id_producto, cantidad, motivo="venta"):
     if cantidad <= 0:
         raise ValueError("La cantidad debe ser mayor que cero")
     
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT stock FROM productos WHERE id = ?", (id_producto,))
         fila = cursor.fetchone()
@@ -128,7 +105,7 @@ def aumentar_stock(id_producto, cantidad, motivo="compra"):
     if cantidad <= 0:
         raise ValueError("La cantidad debe ser mayor que cero")
     
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT stock FROM productos WHERE id = ?", (id_producto,))
         fila = cursor.fetchone()
@@ -142,25 +119,182 @@ def aumentar_stock(id_producto, cantidad, motivo="compra"):
 
 
 # ====== BÚSQUEDAS Y REPORTES ======
-def buscar_productos(termino):
-    termino_like = f"%{termino}%"
-    with get_connection() as conn:
+# Rutas de base que ya tienen el índice. Por ruta: la CLI y los benchmarks
+# cambian AVILCAR_DB en el mismo proceso. Solo se recuerda el "sí": una base
+# sin migrar puede recibir el índice más tarde.
+_fts_disponible = set()
+
+def busqueda_fts_disponible():
+    """True si existe el índice FTS5 de productos (migración 2) en la base activa."""
+    ruta = _db_path()
+    if ruta in _fts_disponible:
+        return True
+    with connection() as conn:
+        fila = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_fts'"
+        ).fetchone()
+    if fila is not None:
+        _fts_disponible.add(ruta)
+    return fila is not None
+
+def expresion_busqueda(termino):
+    """
+    Convierte el texto del usuario en una consulta FTS5 (todas las palabras deben
+    aparecer). Solo la última palabra, la que se está escribiendo, va con prefijo:
+    'pastilla fre' -> '"pastilla" "fre"*'. Un prefijo sobre palabras comunes obliga
+    a FTS5 a fusionar listas enormes; una palabra completa se resuelve por índice.
+    Devuelve None si no queda nada que buscar.
+    """
+    palabras = ['"' + p.replace('"', '""') + '"' for p in (termino or "").split()]
+    if not palabras:
+        return None
+    palabras[-1] += "*"
+    return " ".join(palabras)
+
+# Hasta cuántas coincidencias se ordenan por relevancia; con más (prefijos muy
+# cortos) calcular bm25 para todas cuesta más que lo que aporta el orden.
+MAX_RESULTADOS_RANKEADOS = 2000
+
+_SELECT_PRODUCTO = """
+    SELECT p.id, p.sku, p.nombre, p.precio_venta, p.precio_costo,
+           p.stock, p.minimo_stock,
+           p.categoria_id, c.nombre as categoria_nombre,
+           p.proveedor_id, pr.nombre as proveedor_nombre,
+           p.seccion_norm
+"""
+
+def buscar_productos(termino, limite=None):
+    """
+    Busca por nombre, código, sección o categoría con coincidencia por prefijo.
+    Los resultados vienen ordenados por relevancia (bm25) y, si se indica, limitados.
+    Filas con el mismo formato que filtrar_productos (sección al final).
+    Sin índice FTS5 usa LIKE '%termino%' como antes.
+    """
+    limite = int(limite) if limite and limite > 0 else -1
+    expresion = expresion_busqueda(termino)
+    if expresion is None:
+        return []
+    with connection() as conn:
         cursor = conn.cursor()
+        if not busqueda_fts_disponible():
+            termino_like = f"%{termino.strip()}%"
+            cursor.execute(_SELECT_PRODUCTO + """
+                FROM productos p
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+                WHERE p.nombre LIKE ? OR p.sku LIKE ?
+                ORDER BY p.nombre
+                LIMIT ?
+            """, (termino_like, termino_like, limite))
+            return [tuple(r) for r in cursor.fetchall()]
+
         cursor.execute("""
-            SELECT p.id, p.sku, p.nombre, p.precio_venta, p.precio_costo,
-                   p.stock, p.minimo_stock,
-                   p.categoria_id, c.nombre as categoria_nombre,
-                   p.proveedor_id, pr.nombre as proveedor_nombre
+            SELECT COUNT(*) FROM (
+                SELECT rowid FROM productos_fts WHERE productos_fts MATCH ? LIMIT ?
+            )
+        """, (expresion, MAX_RESULTADOS_RANKEADOS + 1))
+        if cursor.fetchone()[0] <= MAX_RESULTADOS_RANKEADOS:
+            cursor.execute(_SELECT_PRODUCTO + """
+                FROM (
+                    SELECT rowid AS id, bm25(productos_fts, 4.0, 8.0, 1.0, 2.0) AS score
+                    FROM productos_fts
+                    WHERE productos_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                ) h
+                JOIN productos p ON p.id = h.id
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+                ORDER BY h.score, p.nombre
+            """, (expresion, limite))
+        else:
+            cursor.execute(_SELECT_PRODUCTO + """
+                FROM (
+                    SELECT rowid AS id FROM productos_fts WHERE productos_fts MATCH ? LIMIT ?
+                ) h
+                JOIN productos p ON p.id = h.id
+                LEFT JOIN categorias c ON p.categoria_id = c.id
+                LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+            """, (expresion, limite))
+        return [tuple(r) for r in cursor.fetchall()]
+
+# ====== FILTROS ======
+# Columnas por las que se puede ordenar: clave pública -> expresión SQL
+ORDEN_PRODUCTOS = {
+    "id": "p.id",
+    "sku": "p.sku",
+    "nombre": "p.nombre COLLATE NOCASE",
+    "precio_venta": "p.precio_venta",
+    "precio_costo": "p.precio_costo",
+    "stock": "p.stock",
+    "seccion": "p.seccion_norm",
+    "categoria": "c.nombre COLLATE NOCASE",
+}
+
+def _filtros_sql(texto=None, categoria_id=None, seccion=None, solo_con_stock=False):
+    """WHERE (o '') y parámetros para los filtros de filtrar_productos."""
+    condiciones, params = [], []
+    expresion = expresion_busqueda(texto)
+    if expresion and busqueda_fts_disponible():
+        condiciones.append("p.id IN (SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?)")
+        params.append(expresion)
+    elif expresion:
+        condiciones.append("(p.nombre LIKE ? OR p.sku LIKE ?)")
+        like = f"%{texto.strip()}%"
+        params.extend([like, like])
+    if categoria_id is not None:
+        condiciones.append("p.categoria_id = ?")
+        params.append(int(categoria_id))
+    if seccion is not None:
+        # Contra la columna normalizada (indexada), no TRIM(p.seccion)
+        condiciones.append("p.seccion_norm = ?")
+        params.append(str(seccion).strip())
+    if solo_con_stock:
+        condiciones.append("p.stock > 0")
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    return where, params
+
+def filtrar_productos(texto=None, categoria_id=None, seccion=None, solo_con_stock=False,
+                      orden="nombre", descendente=False, limite=None, offset=0):
+    """
+    Productos que cumplen todos los filtros indicados, filtrados y ordenados en SQL.
+    - texto: como buscar_productos (FTS5 por prefijo; LIKE si no hay índice).
+    - seccion: valor exacto sin espacios; '' = productos sin sección.
+    - orden: una clave de ORDEN_PRODUCTOS (desempate por id).
+    Filas con el formato de obtener_productos más la sección al final.
+    """
+    if orden not in ORDEN_PRODUCTOS:
+        raise ValueError(f"Orden no válido: {orden!r}")
+    where, params = _filtros_sql(texto, categoria_id, seccion, solo_con_stock)
+    sentido = "DESC" if descendente else "ASC"
+    limite = int(limite) if limite and limite > 0 else -1
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SELECT_PRODUCTO + f"""
             FROM productos p
             LEFT JOIN categorias c ON p.categoria_id = c.id
             LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
-            WHERE p.nombre LIKE ? OR p.sku LIKE ?
-            ORDER BY p.nombre
-        """, (termino_like, termino_like))
+            {where}
+            ORDER BY {ORDEN_PRODUCTOS[orden]} {sentido}, p.id {sentido}
+            LIMIT ? OFFSET ?
+        """, (*params, limite, max(0, int(offset or 0))))
         return [tuple(r) for r in cursor.fetchall()]
 
+def contar_productos(texto=None, categoria_id=None, seccion=None, solo_con_stock=False):
+    """Cantidad de filas que devolvería filtrar_productos con los mismos filtros (sin límite)."""
+    where, params = _filtros_sql(texto, categoria_id, seccion, solo_con_stock)
+    with connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM productos p {where}", params).fetchone()[0]
+
+def secciones_disponibles():
+    """Secciones en uso ('' = sin sección), ordenadas; DISTINCT sobre idx_productos_seccion."""
+    with connection() as conn:
+        filas = conn.execute("SELECT DISTINCT seccion_norm FROM productos ORDER BY seccion_norm").fetchall()
+    return [r[0] for r in filas]
+
+
 def productos_criticos(umbral=5):
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, nombre, stock, minimo_stock
@@ -175,15 +309,10 @@ def productos_criticos(umbral=5):
 def existe_producto_por_codigo(codigo):
     if not codigo:
         return False
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM productos WHERE sku = ?", (codigo,))
-        return cursor.fetchone() is not None
+    return producto_por_sku(codigo) is not None
 
 def existe_producto_por_nombre(nombre):
     if not nombre:
         return False
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM productos WHERE nombre = ?", (nombre,))
-        return cursor.fetchone() is not None
+    # La caché agrupa por nombre normalizado; aquí se exige el nombre exacto
+    return any(p[2] == nombre for p in productos_por_nombre(nombre))
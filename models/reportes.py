@@ -1,43 +1,162 @@
-from database.db import get_connection
+import sqlite3
+from datetime import date, timedelta
+
+from database.db import connection, timestamp_from
 
 # ====== REPORTES DE VENTAS ======
+# Leen de los resúmenes ventas_resumen_* (migración 3), que los triggers sobre
+# `ventas` mantienen al día; así no se re-agrega todo el historial en cada refresco.
 def ventas_totales() -> float:
     """Devuelve la suma total de todas las ventas."""
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT COALESCE(SUM(total), 0) FROM ventas")
+        cursor.execute("SELECT COALESCE(SUM(total), 0) FROM ventas_resumen_producto")
         total = cursor.fetchone()[0]
-    return float(total or 0)
+    return round(float(total or 0), 2)
 
 
-def ventas_por_producto() -> list[tuple]:
+def ventas_por_producto(ids=None) -> list[tuple]:
     """
     Devuelve lista de productos con:
     (id, nombre, unidades_vendidas, total_vendido)
     Ordenado por total vendido descendente y nombre.
+    Con `ids` solo devuelve esos productos (refresco incremental).
     """
-    with get_connection() as conn:
+    filtro, params = "", []
+    if ids is not None:
+        params = sorted({int(i) for i in ids})
+        if not params:
+            return []
+        filtro = f"WHERE p.id IN ({','.join('?' * len(params))})"
+    with connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT p.id,
                    p.nombre,
-                   COALESCE(SUM(v.cantidad), 0) AS unidades_vendidas,
-                   COALESCE(SUM(v.total), 0)    AS total_vendido
+                   COALESCE(r.unidades, 0)       AS unidades_vendidas,
+                   ROUND(COALESCE(r.total, 0), 2) AS total_vendido
             FROM productos p
-            LEFT JOIN ventas v ON p.id = v.producto_id
-            GROUP BY p.id, p.nombre
+            LEFT JOIN ventas_resumen_producto r ON r.producto_id = p.id
+            {filtro}
             ORDER BY total_vendido DESC, p.nombre ASC
-        """)
+        """, params)
+        filas = cursor.fetchall()
+    return [tuple(r) for r in filas] if filas else []
+
+
+def ventas_por_dia(fecha_inicio: str, fecha_fin: str) -> list[tuple]:
+    """
+    Totales diarios entre dos fechas (YYYY-MM-DD, inclusive).
+    (dia, unidades, total, n_ventas)
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT dia, unidades, ROUND(total, 2), n_ventas
+            FROM ventas_resumen_dia
+            WHERE dia BETWEEN date(?) AND date(?)
+            ORDER BY dia
+        """, (fecha_inicio, fecha_fin))
+        filas = cursor.fetchall()
+    return [tuple(r) for r in filas] if filas else []
+
+
+def ventas_por_mes(mes_inicio: str = "0000-00", mes_fin: str = "9999-12") -> list[tuple]:
+    """
+    Totales mensuales entre dos meses (YYYY-MM, inclusive).
+    (mes, unidades, total, n_ventas)
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT mes, unidades, ROUND(total, 2), n_ventas
+            FROM ventas_resumen_mes
+            WHERE mes BETWEEN ? AND ?
+            ORDER BY mes
+        """, (mes_inicio, mes_fin))
         filas = cursor.fetchall()
     return [tuple(r) for r in filas] if filas else []
 
 
+def anios_con_ventas() -> list[int]:
+    """Años con ventas, ascendente (recorre el índice de ventas_resumen_mes)."""
+    with connection() as conn:
+        filas = conn.execute("""
+            SELECT DISTINCT CAST(substr(mes, 1, 4) AS INTEGER)
+            FROM ventas_resumen_mes
+            ORDER BY 1
+        """).fetchall()
+    return [r[0] for r in filas]
+
+
+def ventas_mensuales(anios) -> dict[int, list[float]]:
+    """
+    Totales por mes de cada año pedido, desde ventas_resumen_mes:
+    {año: [ene, feb, ..., dic]}; los meses sin ventas valen 0.
+    """
+    anios = sorted({int(a) for a in anios})
+    resultado = {a: [0.0] * 12 for a in anios}
+    if not anios:
+        return resultado
+    with connection() as conn:
+        filas = conn.execute("""
+            SELECT mes, total
+            FROM ventas_resumen_mes
+            WHERE mes BETWEEN ? AND ?
+        """, (f"{anios[0]:04d}-01", f"{anios[-1]:04d}-12")).fetchall()
+    for mes, total in filas:
+        anio, num = int(mes[:4]), int(mes[5:7])
+        if anio in resultado and 1 <= num <= 12:
+            resultado[anio][num - 1] = round(float(total or 0), 2)
+    return resultado
+
+
+# ====== KPIs ======
+def kpis_ventas(hoy: date = None) -> dict:
+    """
+    Ventas de hoy, del mes en curso y del mes anterior, y la variación mes a mes (%).
+    {"hoy", "mes", "mes_anterior", "variacion"}; variacion es None sin ventas el mes anterior.
+
+    Sin caché: los meses salen de ventas_resumen_mes (dos filas por clave) y hoy
+    de ventas_resumen_dia, así que editar o borrar ventas pasadas se ve enseguida.
+    """
+    hoy = hoy or date.today()
+    inicio_mes = hoy.replace(day=1)
+    mes_siguiente = (inicio_mes + timedelta(days=32)).replace(day=1)
+    mes = inicio_mes.strftime("%Y-%m")
+    mes_ant = (inicio_mes - timedelta(days=1)).strftime("%Y-%m")
+
+    with connection() as conn:
+        total_mes, anterior = conn.execute("""
+            SELECT TOTAL(CASE WHEN mes = ? THEN total END),
+                   TOTAL(CASE WHEN mes = ? THEN total END)
+            FROM ventas_resumen_mes
+            WHERE mes IN (?, ?)
+        """, (mes, mes_ant, mes, mes_ant)).fetchone()
+        # De hoy a fin de mes (casi siempre solo hoy): ventas con fecha futura no cuentan
+        ventas_hoy, futuras = conn.execute("""
+            SELECT TOTAL(CASE WHEN dia = ? THEN total END),
+                   TOTAL(CASE WHEN dia > ? THEN total END)
+            FROM ventas_resumen_dia
+            WHERE dia >= ? AND dia < ?
+        """, (hoy.isoformat(), hoy.isoformat(), hoy.isoformat(), mes_siguiente.isoformat())).fetchone()
+
+    ventas_mes = float(total_mes) - float(futuras)
+    anterior = float(anterior)
+    return {
+        "hoy": round(float(ventas_hoy), 2),
+        "mes": round(ventas_mes, 2),
+        "mes_anterior": round(anterior, 2),
+        "variacion": (ventas_mes - anterior) / anterior * 100.0 if anterior > 0 else None,
+    }
+
+
 def productos_bajo_stock(umbral: int = 5) -> list[tuple]:
     """Devuelve productos con stock igual o menor al umbral."""
     if umbral < 0:
         raise ValueError("El umbral debe ser mayor o igual a cero.")
 
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, nombre, stock
@@ -58,7 +177,7 @@ def movimientos_recientes(limite: int = 100) -> list[tuple]:
     if limite <= 0:
         raise ValueError("El límite debe ser mayor que cero.")
 
-    with get_connection() as conn:
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT m.id,
@@ -70,7 +189,7 @@ def movimientos_recientes(limite: int = 100) -> list[tuple]:
                    m.fecha
             FROM movimientos_stock m
             LEFT JOIN productos p ON m.producto_id = p.id
-            ORDER BY m.fecha DESC, m.id DESC
+            ORDER BY m.fecha_ts DESC, m.id DESC
             LIMIT ?
         """, (limite,))
         filas = cursor.fetchall()
@@ -78,12 +197,25 @@ def movimientos_recientes(limite: int = 100) -> list[tuple]:
 
 
 # ====== VENTAS POR PERIODO ======
+def rango_timestamps(fecha_inicio, fecha_fin) -> tuple[int, int]:
+    """
+    Convierte un rango de días inclusivo en [desde, hasta) sobre fecha_ts,
+    para que las consultas hagan un range scan en el índice.
+    """
+    ini = timestamp_from(str(fecha_inicio)[:10])
+    fin = timestamp_from(str(fecha_fin)[:10])
+    if ini is None or fin is None:
+        raise ValueError("Fechas inválidas; use YYYY-MM-DD.")
+    return ini, fin + 86400
+
+
 def ventas_por_periodo(fecha_inicio: str, fecha_fin: str) -> list[tuple]:
     """
     Devuelve todas las ventas entre dos fechas.
     (id_venta, producto_id, nombre_producto, cantidad, total, fecha)
     """
-    with get_connection() as conn:
+    desde, hasta = rango_timestamps(fecha_inicio, fecha_fin)
+    with connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT v.id,
@@ -94,8 +226,214 @@ def ventas_por_periodo(fecha_inicio: str, fecha_fin: str) -> list[tuple]:
                    v.fecha
             FROM ventas v
             LEFT JOIN productos p ON v.producto_id = p.id
-            WHERE date(v.fecha) BETWEEN date(?) AND date(?)
-            ORDER BY v.fecha DESC, v.id DESC
-        """, (fecha_inicio, fecha_fin))
+            WHERE v.fecha_ts >= ? AND v.fecha_ts < ?
+            ORDER BY v.fecha_ts DESC, v.id DESC
+        """, (desde, hasta))
         filas = cursor.fetchall()
     return [tuple(r) for r in filas] if filas else []
+
+
+# ====== REFRESCO INCREMENTAL ======
+# La ventana de reportes guarda una "marca de agua" y en cada refresco automático
+# pide solo lo posterior. PRAGMA data_version (por conexión) evita leer tablas si
+# nadie confirmó cambios; los ids máximos indican qué filas son nuevas y los
+# totales del resumen detectan ediciones o borrados de ventas (=> recarga completa).
+def _marca(conn, version) -> dict:
+    ventas_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ventas").fetchone()[0]
+    movimientos_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM movimientos_stock").fetchone()[0]
+    try:
+        catalogo_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM catalogo_cambios").fetchone()[0]
+    except sqlite3.OperationalError:
+        catalogo_id = None  # base sin migración 6
+    n_ventas, total = conn.execute(
+        "SELECT COALESCE(SUM(n_ventas), 0), COALESCE(SUM(total), 0) FROM ventas_resumen_producto"
+    ).fetchone()
+    return {
+        "data_version": version,
+        "ventas_id": ventas_id,
+        "movimientos_id": movimientos_id,
+        "catalogo_id": catalogo_id,
+        "n_ventas": n_ventas,
+        "total": round(float(total or 0), 2),
+    }
+
+
+def marca_reportes(conn=None) -> dict:
+    """Marca de agua actual. Llamar en la misma transacción que la carga completa."""
+    if conn is None:
+        with connection() as conn:
+            return marca_reportes(conn)
+    return _marca(conn, conn.execute("PRAGMA data_version").fetchone()[0])
+
+
+def cambios_reportes(marca: dict, umbral_stock: int = 5, limite_movimientos: int = 200):
+    """
+    Lo ocurrido desde `marca`:
+    - None si no hubo cambios.
+    - {"completo": True, "marca": ...} si hace falta recargar todo.
+    - Si no, {"completo": False, "marca", "total", "ventas" (nuevas, formato
+      historial), "movimientos" (nuevos, formato movimientos_recientes),
+      "resumen" (filas de ventas_por_producto de los productos tocados),
+      "resumen_borrados" (ids tocados que ya no están en el catálogo),
+      "bajo_stock" (None si el catálogo no cambió)}.
+    """
+    with connection() as conn:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == marca.get("data_version"):
+            return None
+
+        # Lectura consistente: marca y filas del mismo instante
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        nueva = _marca(conn, version)
+        if (
+            nueva["ventas_id"] < marca["ventas_id"]
+            or nueva["movimientos_id"] < marca["movimientos_id"]
+            or (nueva["catalogo_id"] or 0) < (marca["catalogo_id"] or 0)
+        ):
+            return {"completo": True, "marca": nueva}
+
+        ventas = [tuple(r) for r in conn.execute("""
+            SELECT v.id, v.producto_id, COALESCE(p.nombre, 'Desconocido'),
+                   v.cantidad, v.total, v.fecha, v.cliente
+            FROM ventas v
+            LEFT JOIN productos p ON p.id = v.producto_id
+            WHERE v.id > ?
+            ORDER BY v.id
+        """, (marca["ventas_id"],))]
+
+        # Ventas editadas o borradas: lo nuevo no explica el cambio de totales
+        esperado_n = marca["n_ventas"] + len(ventas)
+        esperado_total = marca["total"] + sum(float(v[4] or 0) for v in ventas)
+        if nueva["n_ventas"] != esperado_n or abs(nueva["total"] - esperado_total) > 0.01 * (len(ventas) + 1):
+            return {"completo": True, "marca": nueva}
+
+        movimientos = [tuple(r) for r in conn.execute("""
+            SELECT m.id, m.producto_id, p.nombre, m.cantidad, m.tipo, m.motivo, m.fecha
+            FROM movimientos_stock m
+            LEFT JOIN productos p ON m.producto_id = p.id
+            WHERE m.id > ?
+            ORDER BY m.fecha_ts DESC, m.id DESC
+            LIMIT ?
+        """, (marca["movimientos_id"], limite_movimientos))]
+
+        tocados = {v[1] for v in ventas}
+        catalogo_cambio = nueva["catalogo_id"] != marca["catalogo_id"]
+        if catalogo_cambio and nueva["catalogo_id"] is not None:
+            minimo = conn.execute("SELECT MIN(id) FROM catalogo_cambios").fetchone()[0]
+            if minimo is not None and minimo > (marca["catalogo_id"] or 0) + 1:
+                return {"completo": True, "marca": nueva}  # registro recortado
+            tocados |= {r[0] for r in conn.execute(
+                "SELECT DISTINCT producto_id FROM catalogo_cambios WHERE id > ? AND producto_id IS NOT NULL",
+                (marca["catalogo_id"] or 0,),
+            )}
+
+        resumen = ventas_por_producto(tocados) if tocados else []
+        return {
+            "completo": False,
+            "marca": nueva,
+            "total": nueva["total"],
+            "ventas": ventas,
+            "movimientos": movimientos,
+            "resumen": resumen,
+            "resumen_borrados": sorted(tocados - {r[0] for r in resumen}),
+            # Sin registro de cambios no se sabe si cambió el stock: se relee
+            "bajo_stock": productos_bajo_stock(umbral_stock) if catalogo_cambio or nueva["catalogo_id"] is None else None,
+        }
+
+
+# ====== RESÚMENES MATERIALIZADOS ======
+_TABLAS_RESUMEN = ("ventas_resumen_producto", "ventas_resumen_dia", "ventas_resumen_mes")
+
+# Agregado fresco por (producto, día): una sola pasada sobre `ventas`. El día
+# sale de fecha_ts, como los rangos de fechas de los reportes y exportaciones.
+_SQL_VENTAS_PRODUCTO_DIA = """
+    CREATE TEMP TABLE _ventas_producto_dia AS
+    SELECT producto_id, date(fecha_ts, 'unixepoch') AS dia,
+           SUM(cantidad) AS unidades, SUM(total) AS total, COUNT(*) AS n_ventas
+    FROM ventas
+    GROUP BY producto_id, date(fecha_ts, 'unixepoch')
+"""
+
+_SQL_RESUMENES_FRESCOS = {
+    "ventas_resumen_producto": """
+        SELECT producto_id AS clave, SUM(unidades), SUM(total), SUM(n_ventas)
+        FROM _ventas_producto_dia GROUP BY producto_id
+    """,
+    "ventas_resumen_dia": """
+        SELECT dia AS clave, SUM(unidades), SUM(total), SUM(n_ventas)
+        FROM _ventas_producto_dia WHERE dia IS NOT NULL GROUP BY dia
+    """,
+    "ventas_resumen_mes": """
+        SELECT substr(dia, 1, 7) AS clave, SUM(unidades), SUM(total), SUM(n_ventas)
+        FROM _ventas_producto_dia WHERE dia IS NOT NULL GROUP BY substr(dia, 1, 7)
+    """,
+}
+
+
+def _con_agregado_fresco(conn, fn):
+    conn.execute("DROP TABLE IF EXISTS temp._ventas_producto_dia")
+    conn.execute(_SQL_VENTAS_PRODUCTO_DIA)
+    try:
+        return fn()
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp._ventas_producto_dia")
+
+
+def reconstruir_resumenes(conn=None) -> None:
+    """
+    Recalcula desde cero las tablas ventas_resumen_*.
+    Con `conn` explícita corre dentro de la transacción de quien llama.
+    """
+    if conn is None:
+        with connection() as conn:
+            return reconstruir_resumenes(conn)
+
+    def rellenar():
+        for tabla in _TABLAS_RESUMEN:
+            conn.execute(f"DELETE FROM {tabla}")
+            conn.execute(f"INSERT INTO {tabla} {_SQL_RESUMENES_FRESCOS[tabla]}")
+
+    _con_agregado_fresco(conn, rellenar)
+
+
+def verificar_resumenes(conn=None, tolerancia: float = 0.005) -> list[tuple]:
+    """
+    Compara los resúmenes con un agregado fresco de `ventas`.
+    Devuelve las diferencias como (tabla, clave, esperado, actual); lista vacía = OK.
+    """
+    if conn is None:
+        with connection() as conn:
+            return verificar_resumenes(conn, tolerancia)
+
+    def comparar():
+        diferencias = []
+        for tabla in _TABLAS_RESUMEN:
+            clave = {"ventas_resumen_producto": "producto_id", "ventas_resumen_dia": "dia", "ventas_resumen_mes": "mes"}[tabla]
+            esperado = {r[0]: tuple(r[1:]) for r in conn.execute(_SQL_RESUMENES_FRESCOS[tabla])}
+            actual = {r[0]: tuple(r[1:]) for r in conn.execute(
+                f"SELECT {clave}, unidades, total, n_ventas FROM {tabla}"
+            )}
+            for k in esperado.keys() | actual.keys():
+                e = esperado.get(k, (0, 0.0, 0))
+                a = actual.get(k, (0, 0.0, 0))
+                if e[0] != a[0] or e[2] != a[2] or abs(float(e[1]) - float(a[1])) > tolerancia:
+                    diferencias.append((tabla, k, e, a))
+        return diferencias
+
+    return _con_agregado_fresco(conn, comparar)
+
+
+if __name__ == "__main__":
+    import sys
+
+    accion = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    if accion == "reconstruir":
+        reconstruir_resumenes()
+        print("Resúmenes de ventas reconstruidos.")
+    else:
+        diferencias = verificar_resumenes()
+        for d in diferencias:
+            print("DIFERENCIA", *d)
+        print("Resúmenes OK." if not diferencias else f"{len(diferencias)} diferencias.")
+        sys.exit(1 if diferencias else 0)
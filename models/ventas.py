@@ -1,7 +1,8 @@
-import datetime
-from typing import Optional, List, Dict, Union
-from database.db import get_connection
+from typing import Optional, List, Dict, Tuple, Union
+from database.db import connection, now_with_timestamp
 from models.movimientos import registrar_movimiento
+from models.producto import busqueda_fts_disponible, expresion_busqueda
+from models.reportes import rango_timestamps
 
 # ====== REGISTRAR VENTA ======
 def registrar_venta(producto_id: int, cantidad: Union[int, float], cliente: Optional[str] = None) -> Dict:
@@ -15,7 +16,7 @@ def registrar_venta(producto_id: int, cantidad: Union[int, float], cliente: Opti
     # Valor por defecto para cliente si no se envía
     cliente_val = cliente if cliente else "Desconocido"
 
-    with get_connection() as conn:
+    with connection() as conn:
         try:
             cursor = conn.cursor()
 
@@ -35,7 +36,7 @@ def registrar_venta(producto_id: int, cantidad: Union[int, float], cliente: Opti
                 raise ValueError("Stock insuficiente.")
 
             total = round(precio_unitario * cantidad, 2)
-            fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            fecha, fecha_ts = now_with_timestamp()
 
             # Actualizar stock solo si hay suficiente (previene condiciones de carrera)
             cursor.execute("""
@@ -49,9 +50,9 @@ def registrar_venta(producto_id: int, cantidad: Union[int, float], cliente: Opti
 
             # Registrar la venta
             cursor.execute("""
-                INSERT INTO ventas (producto_id, cantidad, total, fecha, cliente)
-                VALUES (?, ?, ?, ?, ?)
-            """, (producto_id, cantidad, total, fecha, cliente_val))
+                INSERT INTO ventas (producto_id, cantidad, total, fecha, fecha_ts, cliente)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (producto_id, cantidad, total, fecha, fecha_ts, cliente_val))
             id_venta = cursor.lastrowid
 
             # Registrar movimiento
@@ -79,14 +80,125 @@ def registrar_venta(producto_id: int, cantidad: Union[int, float], cliente: Opti
             conn.rollback()
             raise
 
+# ====== REGISTRAR VENTA DE UN CARRITO ======
+def _lineas_carrito(cart) -> List[Dict]:
+    """
+    Normaliza el carrito: acepta un dict {producto_id: item} o una lista de items
+    con 'id'/'producto_id', 'cantidad' y opcionalmente 'precio'. Agrupa productos repetidos.
+    """
+    items = cart.values() if isinstance(cart, dict) else cart
+    lineas: Dict[int, Dict] = {}
+    for item in items:
+        pid = int(item.get("producto_id", item.get("id")))
+        # Unidades enteras: 1.9 no se trunca a 1 en silencio
+        try:
+            valor = float(item["cantidad"])
+        except (TypeError, ValueError):
+            raise ValueError(f"Cantidad no válida: {item['cantidad']!r}.") from None
+        if not valor.is_integer() or valor <= 0:
+            raise ValueError("La cantidad debe ser un número entero mayor que cero.")
+        cantidad = int(valor)
+        linea = lineas.setdefault(pid, {"producto_id": pid, "cantidad": 0, "precio": item.get("precio")})
+        linea["cantidad"] += cantidad
+    return list(lineas.values())
+
+
+def registrar_venta_carrito(cart, cliente: Optional[str] = None) -> Dict:
+    """
+    Registra todas las líneas de un carrito en una sola transacción.
+    Toma el bloqueo de escritura (BEGIN IMMEDIATE) antes de validar stock, así otra
+    terminal no puede vender las mismas unidades entre la validación y el descuento.
+    Por eso no puede llamarse con una transacción ya abierta en la conexión del hilo.
+    Si falta stock en cualquier línea no se guarda nada.
+    Retorna un diccionario con las líneas registradas y el total.
+    """
+    lineas = _lineas_carrito(cart)
+    if not lineas:
+        raise ValueError("El carrito está vacío.")
+
+    cliente_val = cliente if cliente else "Desconocido"
+    ids = [l["producto_id"] for l in lineas]
+
+    with connection() as conn:
+        if conn.in_transaction:
+            # Una transacción diferida abierta no tiene el bloqueo de escritura:
+            # validar y descontar dentro de ella reabre la carrera entre terminales
+            raise RuntimeError("registrar_venta_carrito requiere que no haya una transacción abierta.")
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            # Validar todo el carrito con una sola consulta
+            marcas = ",".join("?" * len(ids))
+            cursor.execute(f"""
+                SELECT id, nombre, stock, precio_venta
+                FROM productos
+                WHERE id IN ({marcas})
+            """, ids)
+            productos = {fila[0]: fila for fila in cursor.fetchall()}
+
+            faltantes = [pid for pid in ids if pid not in productos]
+            if faltantes:
+                raise ValueError(f"Producto no encontrado: id={', '.join(map(str, faltantes))}.")
+
+            sin_stock = [
+                f"'{productos[l['producto_id']][1]}' (disponible: {productos[l['producto_id']][2] or 0})"
+                for l in lineas
+                if (productos[l["producto_id"]][2] or 0) < l["cantidad"]
+            ]
+            if sin_stock:
+                raise ValueError("Stock insuficiente para " + ", ".join(sin_stock) + ".")
+
+            fecha, fecha_ts = now_with_timestamp()
+            for l in lineas:
+                _, nombre, stock_actual, precio_venta = productos[l["producto_id"]]
+                precio = l["precio"] if l["precio"] is not None else (precio_venta or 0)
+                l["nombre_producto"] = nombre
+                l["total"] = round(float(precio) * l["cantidad"], 2)
+                l["nuevo_stock"] = (stock_actual or 0) - l["cantidad"]
+
+            # Descontar stock solo si alcanza; rowcount de executemany suma todas las filas
+            cursor.executemany("""
+                UPDATE productos
+                SET stock = stock - ?
+                WHERE id = ? AND stock >= ?
+            """, [(l["cantidad"], l["producto_id"], l["cantidad"]) for l in lineas])
+            if cursor.rowcount != len(lineas):
+                raise ValueError("Stock insuficiente o producto no encontrado.")
+
+            cursor.executemany("""
+                INSERT INTO ventas (producto_id, cantidad, total, fecha, fecha_ts, cliente)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(l["producto_id"], l["cantidad"], l["total"], fecha, fecha_ts, cliente_val) for l in lineas])
+
+            cursor.executemany("""
+                INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha, fecha_ts)
+                VALUES (?, ?, 'salida', 'venta', ?, ?)
+            """, [(l["producto_id"], l["cantidad"], fecha, fecha_ts) for l in lineas])
+
+            conn.commit()
+
+            for l in lineas:
+                l.pop("precio", None)
+            return {
+                "lineas": lineas,
+                "total": round(sum(l["total"] for l in lineas), 2),
+                "fecha": fecha,
+                "cliente": cliente_val,
+            }
+
+        except Exception:
+            conn.rollback()
+            raise
+
 # ====== OBTENER VENTAS ======
 def obtener_ventas(limite: Optional[int] = None) -> List[Dict]:
     """
     Devuelve todas las ventas realizadas.
     """
-    with get_connection() as conn:
-        conn.row_factory = None  # si quieres usar tu conversión manual
+    with connection() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = None  # tuplas simples; no altera la conexión compartida
 
         sql = """
             SELECT v.id,
@@ -98,7 +210,7 @@ def obtener_ventas(limite: Optional[int] = None) -> List[Dict]:
                    v.cliente
             FROM ventas v
             LEFT JOIN productos p ON v.producto_id = p.id
-            ORDER BY v.fecha DESC, v.id DESC
+            ORDER BY v.fecha_ts DESC, v.id DESC
         """
         params = ()
         if limite and limite > 0:
@@ -122,3 +234,145 @@ def obtener_ventas(limite: Optional[int] = None) -> List[Dict]:
         for r in filas
     ]
     return ventas
+
+
+# ====== HISTORIAL PAGINADO (KEYSET) ======
+# Con hasta esta cantidad de productos coincidentes se filtra por producto_id
+# (índice por producto) en lugar de recorrer todo el historial en orden.
+MAX_PRODUCTOS_POR_INDICE = 20
+
+def _filtros_historial(
+    cliente: Optional[str] = None,
+    texto: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+) -> Optional[Tuple[List[str], List, str]]:
+    """
+    Condiciones WHERE (sobre `ventas v` y `productos p`), parámetros y pista de
+    índice para los filtros del historial. Las comparten obtener_ventas_pagina y
+    la exportación, así el CSV tiene las mismas filas que la pantalla.
+    None si el texto no coincide con ningún producto (no hay filas).
+    """
+    where: List[str] = []
+    params: List = []
+    if desde or hasta:
+        where.append("v.fecha_ts >= ? AND v.fecha_ts < ?")
+        params.extend(rango_timestamps(desde or "0001-01-01", hasta or "9999-12-30"))
+    if cliente:
+        where.append("v.cliente LIKE ?")
+        params.append(f"%{cliente.strip()}%")
+    # Por defecto se recorre el índice del historial en orden; si el texto
+    # acota a pocos productos conviene más buscar por producto y ordenar.
+    indice = "INDEXED BY idx_ventas_historial"
+    expresion = expresion_busqueda(texto) if texto else None
+    if expresion and busqueda_fts_disponible():
+        with connection() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT rowid FROM productos_fts WHERE productos_fts MATCH ? LIMIT ?",
+                (expresion, MAX_PRODUCTOS_POR_INDICE + 1),
+            )]
+        if not ids:
+            return None
+        if len(ids) <= MAX_PRODUCTOS_POR_INDICE:
+            where.append(f"v.producto_id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+            indice = ""
+        else:
+            where.append("v.producto_id IN (SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?)")
+            params.append(expresion)
+    elif texto:
+        where.append("p.nombre LIKE ?")
+        params.append(f"%{texto.strip()}%")
+    return where, params, indice
+
+def obtener_ventas_pagina(
+    after: Optional[Tuple[int, int]] = None,
+    limit: int = 50,
+    cliente: Optional[str] = None,
+    texto: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    ascendente: bool = False,
+) -> Dict:
+    """
+    Una página del historial, de la venta más reciente a la más antigua
+    (o al revés con ascendente=True).
+
+    Args:
+        after: cursor (fecha_ts, id) de la última fila de la página anterior.
+        limit: filas por página.
+        cliente: texto contenido en el cliente (sin distinguir mayúsculas).
+        texto: búsqueda en el nombre del producto.
+        desde / hasta: días YYYY-MM-DD, inclusive.
+        ascendente: de la más antigua a la más reciente (mismo índice, recorrido inverso).
+
+    Returns:
+        dict con "filas" (mismo formato que obtener_ventas), "siguiente" (cursor
+        para la próxima página o None), "total" (estimación barata del total de
+        filas) y "total_exacto".
+
+    Recorre idx_ventas_historial desde el cursor y se detiene al completar la
+    página: el costo no depende de cuántas páginas haya antes.
+    """
+    limit = max(1, int(limit))
+    filtros = _filtros_historial(cliente=cliente, texto=texto, desde=desde, hasta=hasta)
+    if filtros is None:
+        return {"filas": [], "siguiente": None, "total": 0, "total_exacto": True}
+    where, params, indice = filtros
+    if after is not None:
+        where.append("(v.fecha_ts, v.id) > (?, ?)" if ascendente else "(v.fecha_ts, v.id) < (?, ?)")
+        params.extend([int(after[0] or 0), int(after[1])])
+
+    sql = """
+        SELECT v.id,
+               v.producto_id,
+               COALESCE(p.nombre, 'Desconocido') AS nombre_producto,
+               v.cantidad,
+               v.total,
+               v.fecha,
+               v.cliente,
+               COALESCE(v.fecha_ts, 0)
+        FROM ventas v {indice}
+        LEFT JOIN productos p ON v.producto_id = p.id
+    """.format(indice=indice)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sentido = "ASC" if ascendente else "DESC"
+    sql += f" ORDER BY v.fecha_ts {sentido}, v.id {sentido} LIMIT ?"
+    params.append(limit + 1)
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        filas = cursor.execute(sql, params).fetchall()
+
+        # Conteo barato desde los resúmenes: exacto sin filtros de texto,
+        # cota superior si además se filtra por cliente o producto.
+        if desde or hasta:
+            d_ini, d_fin = (desde or "0001-01-01")[:10], (hasta or "9999-12-31")[:10]
+            total = conn.execute(
+                "SELECT COALESCE(SUM(n_ventas), 0) FROM ventas_resumen_dia WHERE dia BETWEEN date(?) AND date(?)",
+                (d_ini, d_fin),
+            ).fetchone()[0]
+        else:
+            total = conn.execute("SELECT COALESCE(SUM(n_ventas), 0) FROM ventas_resumen_producto").fetchone()[0]
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    return {
+        "filas": [
+            {
+                "id": r[0],
+                "producto_id": r[1],
+                "nombre_producto": r[2],
+                "cantidad": r[3],
+                "total": round(r[4], 2),
+                "fecha": r[5],
+                "cliente": r[6] or "",
+            }
+            for r in filas
+        ],
+        "siguiente": (filas[-1][7], filas[-1][0]) if hay_mas and filas else None,
+        "total": int(total or 0),
+        "total_exacto": not (cliente or texto),
+    }
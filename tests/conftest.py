@@ -0,0 +1,16 @@
+import pytest
+
+from database.db import close_all_connections, connection
+from database.migrations import migrate
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """Base nueva y migrada en un directorio temporal."""
+    monkeypatch.setenv("AVILCAR_DB", str(tmp_path / "inventario.db"))
+    close_all_connections()
+    migrate()
+    with connection() as conn:
+        conn.execute("INSERT INTO productos (nombre, precio_venta, stock) VALUES ('Bujía NGK', 10, 100)")
+    yield
+    close_all_connections()
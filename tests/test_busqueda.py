@@ -0,0 +1,27 @@
+from database.db import close_all_connections, connection
+from database.migrations import migrate
+from models.producto import buscar_productos, busqueda_fts_disponible
+
+
+def test_fts_segun_base_activa(base, tmp_path, monkeypatch):
+    assert busqueda_fts_disponible()
+    assert [r[2] for r in buscar_productos("buj")] == ["Bujía NGK"]
+
+    # Otra base en el mismo proceso, todavía sin migrar: LIKE en lugar de FTS
+    monkeypatch.setenv("AVILCAR_DB", str(tmp_path / "sin_migrar.db"))
+    close_all_connections()
+    with connection() as conn:
+        conn.execute("CREATE TABLE productos (id INTEGER PRIMARY KEY, sku TEXT, nombre TEXT, precio_venta REAL,"
+                     " precio_costo REAL, stock INTEGER, minimo_stock INTEGER, categoria_id INTEGER,"
+                     " proveedor_id INTEGER, seccion_norm TEXT)")
+        conn.execute("CREATE TABLE categorias (id INTEGER PRIMARY KEY, nombre TEXT)")
+        conn.execute("CREATE TABLE proveedores (id INTEGER PRIMARY KEY, nombre TEXT)")
+        conn.execute("INSERT INTO productos (nombre, sku) VALUES ('Bujía Bosch', 'B2')")
+    assert not busqueda_fts_disponible()
+    assert [r[2] for r in buscar_productos("Bosch")] == ["Bujía Bosch"]
+
+    # Al migrarla aparece el índice
+    close_all_connections()
+    monkeypatch.setenv("AVILCAR_DB", str(tmp_path / "nueva.db"))
+    migrate()
+    assert busqueda_fts_disponible()
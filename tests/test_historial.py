@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+from database.db import connection
+from models.ventas import obtener_ventas_pagina
+
+
+def _insertar_ventas(fechas):
+    with connection() as conn:
+        conn.executemany(
+            "INSERT INTO ventas (producto_id, cantidad, total, fecha, cliente) VALUES (1, 1, 10, ?, 'Ana')",
+            [(f,) for f in fechas],
+        )
+
+
+def _todas_las_paginas(**filtros):
+    filas, cursor = [], None
+    while True:
+        pagina = obtener_ventas_pagina(after=cursor, limit=2, **filtros)
+        filas.extend(pagina["filas"])
+        cursor = pagina["siguiente"]
+        if cursor is None:
+            return filas
+
+
+def test_fecha_dd_mm_aaaa_recibe_fecha_ts(base):
+    _insertar_ventas(["15/03/2024", "16/03/2024 10:30", "2024-03-17 08:00:00"])
+    with connection() as conn:
+        nulos = conn.execute("SELECT COUNT(*) FROM ventas WHERE fecha_ts IS NULL").fetchone()[0]
+    assert nulos == 0
+
+
+def test_paginas_con_fechas_dd_mm_aaaa(base):
+    _insertar_ventas(["15/03/2024", "16/03/2024", "17/03/2024"])
+    filas = _todas_las_paginas()
+    assert [f["fecha"] for f in filas] == ["17/03/2024", "16/03/2024", "15/03/2024"]
+    filas = _todas_las_paginas(ascendente=True)
+    assert [f["fecha"] for f in filas] == ["15/03/2024", "16/03/2024", "17/03/2024"]
+
+
+def test_rango_incluye_fechas_dd_mm_aaaa(base):
+    _insertar_ventas(["15/03/2024", "20/04/2024"])
+    filas = _todas_las_paginas(desde="2024-03-01", hasta="2024-03-31")
+    assert [f["fecha"] for f in filas] == ["15/03/2024"]
+
+
+def test_fecha_ilegible_se_rechaza(base):
+    with pytest.raises(sqlite3.DatabaseError):
+        _insertar_ventas(["el martes"])
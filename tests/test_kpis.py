@@ -0,0 +1,28 @@
+from datetime import date
+
+from database.db import connection
+from models.reportes import kpis_ventas
+
+HOY = date(2024, 3, 15)
+
+
+def _insertar_ventas(filas):
+    with connection() as conn:
+        conn.executemany(
+            "INSERT INTO ventas (producto_id, cantidad, total, fecha, cliente) VALUES (1, 1, ?, ?, 'Ana')",
+            filas,
+        )
+
+
+def test_kpis_por_mes(base):
+    _insertar_ventas([(40.0, "2024-02-10"), (10.0, "2024-03-01"), (5.0, "15/03/2024"), (99.0, "2024-03-20")])
+    assert kpis_ventas(HOY) == {"hoy": 5.0, "mes": 15.0, "mes_anterior": 40.0, "variacion": -62.5}
+
+
+def test_kpis_ven_cambios_en_dias_cerrados(base):
+    _insertar_ventas([(40.0, "2024-02-10"), (10.0, "2024-03-01")])
+    assert kpis_ventas(HOY)["mes"] == 10.0
+    with connection() as conn:
+        conn.execute("UPDATE ventas SET total = 25 WHERE id = 2")
+        conn.execute("DELETE FROM ventas WHERE id = 1")
+    assert kpis_ventas(HOY) == {"hoy": 0.0, "mes": 25.0, "mes_anterior": 0.0, "variacion": None}
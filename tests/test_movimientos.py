@@ -0,0 +1,47 @@
+from database.db import connection
+from models.movimientos import kardex_producto, obtener_movimientos_pagina
+
+
+def _insertar_movimientos(movimientos):
+    with connection() as conn:
+        conn.executemany(
+            "INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha) VALUES (1, ?, ?, 'prueba', ?)",
+            movimientos,
+        )
+
+
+def _fecha_ts_nula(ids):
+    # Filas de antes de la migración 10: se quita la protección para simularlas
+    with connection() as conn:
+        conn.execute("DROP TRIGGER trg_movimientos_fecha_ts_nn")
+        conn.executemany("UPDATE movimientos_stock SET fecha_ts = NULL WHERE id = ?", [(i,) for i in ids])
+
+
+def test_paginas_con_fechas_dd_mm_aaaa(base):
+    _insertar_movimientos([(5, "entrada", "15/03/2024"), (2, "salida", "16/03/2024"), (1, "salida", "17/03/2024")])
+    ids, cursor = [], None
+    while True:
+        pagina = obtener_movimientos_pagina(after=cursor, limit=2)
+        ids.extend(f[0] for f in pagina["filas"])
+        cursor = pagina["siguiente"]
+        if cursor is None:
+            break
+    assert ids == [3, 2, 1]
+
+
+def test_cursor_sin_fecha_ts(base):
+    # Cursores viejos con fecha_ts None no rompen la página siguiente
+    _insertar_movimientos([(5, "entrada", "2024-03-15"), (2, "salida", "2024-03-16")])
+    assert obtener_movimientos_pagina(after=(None, 10))["filas"] == []
+
+
+def test_kardex_saldo_con_fecha_ts_nula(base):
+    _insertar_movimientos([(5, "entrada", "2024-03-15"), (2, "salida", "2024-03-16"), (1, "salida", "2024-03-17")])
+    _fecha_ts_nula([2])
+    primera = kardex_producto(1, limit=2)
+    segunda = kardex_producto(1, after=primera["siguiente"], limit=2)
+    filas = primera["filas"] + segunda["filas"]
+    # La fila sin fecha_ts va primero (clave 0), y el saldo sigue ese mismo orden
+    assert [f[0] for f in filas] == [2, 1, 3]
+    inicial = primera["saldo_inicial"]
+    assert [f[6] for f in filas] == [inicial - 2, inicial + 3, inicial + 2]
@@ -0,0 +1,39 @@
+import views.virtual_tree as vt
+from views.virtual_tree import PagedSource
+
+
+def test_pagina_corta_recorta_el_total(monkeypatch):
+    """Si se borraron filas después del COUNT, no quedan huecos en blanco."""
+    filas = list(range(25))  # el COUNT dijo 30
+
+    def fetch(offset, limit, order):
+        return filas[offset:offset + limit]
+
+    def run_async(widget, fn, *args, key=None, on_done=None, on_error=None):
+        on_done(fn(*args))
+
+    monkeypatch.setattr(vt, "run_async", run_async)
+    avisos = []
+    fuente = PagedSource(fetch, 30, page_size=10)
+    fuente.attach(object(), lambda: avisos.append(len(fuente)))
+
+    fuente.rows(0, 30)
+    assert len(fuente) == 25
+    assert avisos == [25]
+    assert fuente.rows(0, 30) == filas
+
+
+def test_pagina_corta_intermedia_se_vuelve_a_pedir(monkeypatch):
+    pedidos = []
+
+    def fetch(offset, limit, order):
+        pedidos.append((offset, limit))
+        return list(range(offset, min(offset + limit, 30)))
+
+    monkeypatch.setattr(vt, "run_async", lambda w, fn, *a, on_done=None, **k: on_done(fn(*a)))
+    fuente = PagedSource(fetch, 30, page_size=10)
+    fuente.attach(object(), lambda: None)
+    fuente._pages[1] = list(range(10, 15))  # página con huecos
+
+    assert fuente.rows(10, 20) == list(range(10, 20))
+    assert pedidos == [(10, 10)]
@@ -0,0 +1,28 @@
+from database.db import connection
+from models.reportes import ventas_por_dia, ventas_por_mes, ventas_por_periodo, verificar_resumenes
+
+
+def _insertar_ventas(filas):
+    with connection() as conn:
+        conn.executemany(
+            "INSERT INTO ventas (producto_id, cantidad, total, fecha, cliente) VALUES (1, ?, ?, ?, 'Ana')",
+            filas,
+        )
+
+
+def test_resumen_incluye_fechas_dd_mm_aaaa(base):
+    _insertar_ventas([(1, 10.0, "15/03/2024"), (2, 20.0, "2024-03-15 12:00:00"), (1, 5.0, "01/04/2024 09:30")])
+    assert ventas_por_dia("2024-03-15", "2024-03-15") == [("2024-03-15", 3, 30.0, 2)]
+    assert ventas_por_mes("2024-03", "2024-04") == [("2024-03", 3, 30.0, 2), ("2024-04", 1, 5.0, 1)]
+    # Misma respuesta que el rango sobre fecha_ts
+    assert len(ventas_por_periodo("2024-03-01", "2024-03-31")) == 2
+    assert verificar_resumenes() == []
+
+
+def test_resumen_sigue_ediciones_y_borrados(base):
+    _insertar_ventas([(1, 10.0, "15/03/2024"), (2, 20.0, "16/03/2024")])
+    with connection() as conn:
+        conn.execute("UPDATE ventas SET fecha = '20/04/2024' WHERE id = 1")
+        conn.execute("DELETE FROM ventas WHERE id = 2")
+    assert ventas_por_mes() == [("2024-04", 1, 10.0, 1)]
+    assert verificar_resumenes() == []
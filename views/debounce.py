@@ -0,0 +1,66 @@
+"""
+Debounce para eventos de Tk
+---------------------------
+Debouncer agrupa llamadas seguidas (p. ej. una por tecla): la función corre una
+sola vez, `delay_ms` después de la última llamada y con sus argumentos. Las
+anteriores se descartan sin ejecutarse.
+
+Junto con run_async(..., key=...) la búsqueda mientras se escribe queda así:
+el debounce evita lanzar una consulta por tecla y la clave cancela la consulta
+que todavía esté corriendo cuando llega la siguiente.
+"""
+from __future__ import annotations
+
+import tkinter as tk
+from typing import Any, Callable, Optional
+
+
+class Debouncer:
+    def __init__(self, widget: tk.Misc, fn: Callable[..., Any], delay_ms: int = 250):
+        self._widget = widget
+        self._fn = fn
+        self.delay_ms = max(0, int(delay_ms))
+        self._job: Optional[str] = None
+        self._pending: Optional[tuple] = None
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        """Programa fn(*args, **kwargs) reemplazando lo que estuviera pendiente."""
+        self.cancel()
+        self._pending = (args, kwargs)
+        self._job = self._widget.after(self.delay_ms, self._run)
+
+    def cancel(self) -> None:
+        if self._job is not None:
+            try:
+                self._widget.after_cancel(self._job)
+            except tk.TclError:
+                pass
+        self._job = None
+        self._pending = None
+
+    def flush(self) -> None:
+        """Ejecuta ya lo pendiente (p. ej. al presionar Enter)."""
+        if self._pending is not None:
+            if self._job is not None:
+                try:
+                    self._widget.after_cancel(self._job)
+                except tk.TclError:
+                    pass
+            self._run()
+
+    @property
+    def pending(self) -> bool:
+        return self._pending is not None
+
+    def _run(self) -> None:
+        self._job = None
+        pendiente, self._pending = self._pending, None
+        if pendiente is None:
+            return
+        try:
+            if not self._widget.winfo_exists():
+                return  # la ventana se cerró mientras esperaba
+        except tk.TclError:
+            return
+        args, kwargs = pendiente
+        self._fn(*args, **kwargs)
@@ -0,0 +1,111 @@
+"""
+Exportación con progreso
+------------------------
+exportar_con_progreso() corre una función de models/exportar.py en el hilo de
+exportaciones (get_export_executor) y muestra una ventana con barra de progreso
+y botón Cancelar. La interfaz sigue respondiendo mientras se escribe el archivo.
+
+El hilo de trabajo solo actualiza un dict; la ventana lo lee cada POLL_MS con
+after (Tk no es thread-safe).
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from typing import Any, Callable, Optional
+
+from database.executor import get_export_executor
+from models.exportar import ExportacionCancelada
+
+POLL_MS = 100
+
+TIPOS_ARCHIVO = [("CSV", "*.csv"), ("CSV comprimido (gzip)", "*.csv.gz"), ("Todos", "*.*")]
+
+
+def pedir_ruta_csv(parent: tk.Misc, titulo: str = "Guardar como CSV") -> Optional[str]:
+    """Diálogo de guardado; terminar el nombre en .gz exporta comprimido."""
+    ruta = filedialog.asksaveasfilename(
+        parent=parent, title=titulo, defaultextension=".csv", filetypes=TIPOS_ARCHIVO,
+    )
+    return ruta or None
+
+
+def exportar_con_progreso(
+    parent: tk.Misc, titulo: str, fn: Callable[..., int], ruta: str, *args: Any,
+    on_done: Optional[Callable[[int], None]] = None, **kwargs: Any,
+) -> None:
+    """
+    Ejecuta fn(ruta, *args, progreso=..., cancelar=..., **kwargs) en segundo plano.
+    Al terminar avisa con un messagebox (o llama on_done con las filas escritas).
+    """
+    cancelar = threading.Event()
+    estado = {"escritas": 0, "total": None}
+
+    def progreso(escritas: int, total: Optional[int]) -> None:
+        # Hilo de exportación: solo datos
+        estado["escritas"], estado["total"] = escritas, total
+
+    win = tk.Toplevel(parent)
+    win.title(titulo)
+    win.resizable(False, False)
+    win.transient(parent.winfo_toplevel())
+    frm = ttk.Frame(win, padding=12)
+    frm.pack(fill="both", expand=True)
+    ttk.Label(frm, text=ruta, wraplength=380).pack(anchor="w")
+    barra = ttk.Progressbar(frm, length=380, mode="determinate", maximum=1.0)
+    barra.pack(fill="x", pady=8)
+    lbl = ttk.Label(frm, text="Preparando…")
+    lbl.pack(anchor="w")
+    btn = ttk.Button(frm, text="Cancelar")
+    btn.pack(anchor="e", pady=(8, 0))
+
+    job = None
+
+    def actualizar() -> None:
+        nonlocal job
+        escritas, total = estado["escritas"], estado["total"]
+        if total:
+            barra["value"] = min(1.0, escritas / total)
+            lbl.config(text=f"{escritas:,} de {total:,} filas")
+        else:
+            lbl.config(text=f"{escritas:,} filas")
+        job = win.after(POLL_MS, actualizar)
+
+    def cerrar() -> None:
+        if job is not None:
+            try:
+                win.after_cancel(job)
+            except tk.TclError:
+                pass
+        if win.winfo_exists():
+            win.destroy()
+
+    def on_cancelar() -> None:
+        cancelar.set()
+        btn.state(["disabled"])
+        lbl.config(text="Cancelando…")
+        get_export_executor().cancel(futuro)  # interrumpe la consulta si está en curso
+
+    def terminado(filas: int) -> None:
+        cerrar()
+        if on_done:
+            on_done(filas)
+        else:
+            messagebox.showinfo("Exportar", f"{filas:,} filas exportadas a:\n{ruta}", parent=parent)
+
+    def fallo(e: BaseException) -> None:
+        cerrar()
+        if cancelar.is_set() and isinstance(e, (ExportacionCancelada, sqlite3.OperationalError)):
+            messagebox.showinfo("Exportar", "Exportación cancelada.", parent=parent)
+        else:
+            messagebox.showerror("Exportar", f"No se pudo exportar:\n{e}", parent=parent)
+
+    btn.config(command=on_cancelar)
+    win.protocol("WM_DELETE_WINDOW", on_cancelar)
+    futuro = get_export_executor().run_async(
+        parent, fn, ruta, *args, progreso=progreso, cancelar=cancelar,
+        on_done=terminado, on_error=fallo, **kwargs,
+    )
+    actualizar()
@@ -4,7 +4,7 @@ from __future__ import annotations
 import csv
 import sys
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, filedialog
+from tkinter import ttk, messagebox, simpledialog
 from typing import Any, Optional, Iterable, Sequence
 import tkinter.font as tkfont
 
@@ -13,10 +13,11 @@ import tkinter.font as tkfont
 # ============================
 from models.producto import (
     agregar_producto,
-    obtener_productos,
+    filtrar_productos,
+    contar_productos,
     eliminar_producto,
     editar_producto,
-    buscar_productos,          # si tu modelo no lo tiene, el código hace fallback
+    buscar_productos,
     aumentar_stock,
     reducir_stock,
     obtener_producto_por_id,
@@ -26,6 +27,13 @@ from models.categoria import (
     agregar_categoria,
     eliminar_categoria
 )
+from models.exportar import exportar_productos
+from models import precarga
+from database.executor import run_async
+from views.debounce import Debouncer
+from views.exportar_dialogo import exportar_con_progreso, pedir_ruta_csv
+from views.virtual_tree import PagedSource, VirtualTreeview
+from views.window_manager import EVENTO_MOSTRADA
 
 
 # ============================
@@ -48,6 +56,15 @@ COLUMNS: tuple[str, ...] = (
 
 PLACEHOLDER_BUSCAR: str = "Buscar por código o nombre…"
 
+# Máximo de resultados (por relevancia) al buscar mientras se escribe
+LIMITE_BUSQUEDA: int = 500
+
+# Espera tras la última tecla antes de buscar (ms)
+DEMORA_BUSQUEDA_MS: int = 250
+
+# Filas que se leen junto con el COUNT al recargar la tabla (dos páginas)
+FILAS_INICIALES: int = 400
+
 # ============================
 # === UTILIDADES GENERALES ===
 # ============================
@@ -138,7 +155,7 @@ def _parse_producto(prod: Any) -> dict[str, Any]:
 
         "stock": _get_key(prod, "stock", 5, default=0),
 
-        "seccion": _get_key(prod, "seccion", 6, default="Ninguno"),
+        "seccion": _get_key(prod, "seccion", 11, default="Ninguno"),
 
         "categoria_id": _get_key(prod, "categoria_id", 7),
         "categoria_nombre": _get_key(prod, "categoria_nombre", "categoria", 8),
@@ -166,33 +183,33 @@ def _row_values_from_parsed(p: dict[str, Any]) -> tuple[Any, ...]:
 # ============================
 # === TABLA (Treeview)     ===
 # ============================
-def _value_for_sort(val: Any, col: str) -> Any:
-    try:
-        if col in ("Precio Venta", "Precio Costo"):
-            s = _safe_str(val).replace("$", "").replace(",", "").strip()
-            return float(s) if s else 0.0
-        if col in ("ID", "Stock"):
-            return int(val or 0)
-    except Exception:
-        pass
-    return _safe_str(val).lower()
-
-def sort_treeview(tabla: ttk.Treeview, col: str, reverse: bool) -> None:
-    data: list[tuple[Any, str]] = []
-    for item in tabla.get_children(""):
-        val = tabla.set(item, col)
-        data.append((_value_for_sort(val, col), item))
-    data.sort(reverse=reverse, key=lambda t: t[0])
-    for index, (_, item) in enumerate(data):
-        tabla.move(item, "", index)
-        try:
-            tabla.item(item, tags=("even" if index % 2 == 0 else "odd",))
-        except Exception:
-            pass
-    tabla.heading(col, command=lambda: sort_treeview(tabla, col, not reverse))
-
-def _crear_tabla(parent: tk.Widget) -> ttk.Treeview:
-    tabla = ttk.Treeview(parent, columns=COLUMNS, show="headings", selectmode="browse")
+# Columna de la tabla -> (clave de orden de filtrar_productos, índice en la fila).
+# El catálogo completo se ordena en la base (ORDER BY con índice); los
+# resultados de una búsqueda, en memoria con el valor tipado de la fila.
+ORDEN_COLUMNAS: dict[str, tuple[str, int]] = {
+    "ID": ("id", 0),
+    "Codigo": ("sku", 1),
+    "Nombre": ("nombre", 2),
+    "Precio Venta": ("precio_venta", 3),
+    "Precio Costo": ("precio_costo", 4),
+    "Stock": ("stock", 5),
+    "Seccion": ("seccion", 11),
+    "Categoria": ("categoria", 8),
+}
+
+def _campo_orden(indice: int) -> Any:
+    return lambda prod: _get_key(prod, indice)
+
+def _valores_fila(prod: Any) -> tuple[Any, ...]:
+    return _row_values_from_parsed(_parse_producto(prod))
+
+def _crear_tabla(parent: tk.Widget) -> VirtualTreeview:
+    # Tabla virtual: solo existen items para las filas visibles (catálogos de 100k+)
+    tabla = VirtualTreeview(
+        parent, columns=COLUMNS, show="headings", selectmode="browse",
+        formatter=_valores_fila,
+        sort_fields={col: _campo_orden(i) for col, (_, i) in ORDEN_COLUMNAS.items()},
+    )
     for col in COLUMNS:
         if col in ("Precio Venta", "Precio Costo"):
             anchor, width = "e", 130
@@ -203,7 +220,7 @@ def _crear_tabla(parent: tk.Widget) -> ttk.Treeview:
         else:
             anchor, width = "center", 170
 
-        tabla.heading(col, text=col, anchor=anchor, command=lambda c=col: sort_treeview(tabla, c, False))
+        tabla.heading(col, text=col, anchor=anchor, command=lambda c=col: tabla.sort_by(c))
         tabla.column(col, width=width, anchor=anchor, stretch=(col in ("Nombre", "Seccion", "Categoria")))
     try:
         tabla.tag_configure("odd", background="#ffffff")
@@ -212,68 +229,152 @@ def _crear_tabla(parent: tk.Widget) -> ttk.Treeview:
         pass
     return tabla
 
-def _set_rows(tabla: ttk.Treeview, productos: Sequence[Iterable[Any]]) -> None:
-    for i in tabla.get_children():
-        tabla.delete(i)
-    for idx, prod in enumerate(productos):
-        p = _parse_producto(prod)
-        tag = "even" if (idx % 2 == 0) else "odd"
-        tabla.insert("", tk.END, values=_row_values_from_parsed(p), tags=(tag,))
+def _set_rows(tabla: VirtualTreeview, productos: Sequence[Iterable[Any]], keep_position: bool = False) -> None:
+    tabla.set_rows(productos, key=lambda prod: _get_key(prod, "id", 0), keep_position=keep_position)
 
-def cargar_datos(tabla: ttk.Treeview) -> None:
-    try:
-        productos = obtener_productos()
-    except Exception as e:
-        messagebox.showerror("Error", f"No se pudieron cargar productos: {e}")
-        productos = []
-    _set_rows(tabla, productos)
+def _cargar_async(
+    tabla: ttk.Treeview, consulta: Any, *args: Any,
+    error_msg: str = "No se pudieron cargar productos", keep_position: bool = False,
+) -> None:
+    """
+    Ejecuta la consulta en el hilo de BD y pinta la tabla al terminar.
+    Todas las cargas de una tabla comparten clave: solo se pinta la más reciente.
+    keep_position: conservar el desplazamiento (recarga tras editar, no una búsqueda nueva).
+    """
+    def on_error(e: BaseException) -> None:
+        messagebox.showerror("Error", f"{error_msg}: {e}")
+        _set_rows(tabla, [])
+
+    run_async(
+        tabla, consulta, *args,
+        key=("productos_view", str(tabla)),
+        on_done=lambda productos: _set_rows(tabla, productos or [], keep_position),
+        on_error=on_error,
+    )
+
+def _leer_pagina(filtros: dict[str, Any], offset: int, limit: int, order: Optional[tuple]) -> list[Any]:
+    columna, descendente = order or ("Nombre", False)
+    return filtrar_productos(
+        **filtros, orden=ORDEN_COLUMNAS[columna][0], descendente=descendente,
+        limite=limit, offset=offset,
+    )
+
+def _fuente_paginada(
+    filtros: dict[str, Any], total: int, iniciales: Sequence[Any] = (), orden: Optional[tuple] = None,
+) -> PagedSource:
+    """
+    Productos leídos por páginas en el orden de la tabla (por nombre si no eligió otro).
+    iniciales: primeras filas ya leídas en ese orden.
+    """
+    def fetch(offset: int, limit: int, order: Optional[tuple]) -> list[Any]:
+        return _leer_pagina(filtros, offset, limit, order)
+    return PagedSource(fetch, total, key=lambda prod: prod[0], initial=iniciales, order=orden, filters=filtros)
+
+def _contar_y_leer_inicio(filtros: dict[str, Any], orden: Optional[tuple]) -> tuple[int, list[Any]]:
+    # Hilo de BD: el total y las primeras páginas en una sola ida, así la tabla
+    # pasa de los datos anteriores a los nuevos sin quedar en blanco
+    total = contar_productos(**filtros)
+    return total, _leer_pagina(filtros, 0, FILAS_INICIALES, orden)
+
+def _cargar_paginado(
+    tabla: VirtualTreeview, error_msg: str = "No se pudieron cargar productos",
+    keep_position: bool = False, **filtros: Any,
+) -> None:
+    """
+    Como _cargar_async, pero solo cuenta las filas: la tabla pide a la base las
+    páginas visibles, y ordenar por columna es un ORDER BY, no un sort en Python.
+    """
+    def on_error(e: BaseException) -> None:
+        messagebox.showerror("Error", f"{error_msg}: {e}")
+        _set_rows(tabla, [])
+
+    orden = tabla.sort_order
+
+    def on_done(resultado: tuple[int, list[Any]]) -> None:
+        total, iniciales = resultado
+        if tabla.sort_order != orden:
+            iniciales = []  # se reordenó mientras tanto: esas filas ya no sirven
+        tabla.set_source(_fuente_paginada(filtros, total, iniciales, orden), keep_position=keep_position)
+
+    run_async(
+        tabla, _contar_y_leer_inicio, filtros, orden,
+        key=("productos_view", str(tabla)),
+        on_done=on_done,
+        on_error=on_error,
+    )
+
+def cargar_datos(tabla: ttk.Treeview, keep_position: bool = False) -> None:
+    _cargar_paginado(tabla, keep_position=keep_position)
 
 # ============================
 # === BÚSQUEDA / FILTROS    ==
 # ============================
-def _producto_match_term(prod: Iterable[Any], term_low: str) -> bool:
-    p = _parse_producto(prod)
-    return (
-        term_low in (p["nombre"] or "").lower()
-        or term_low in _safe_str(p["codigo"]).lower()
-        or term_low in _safe_str(p["id"])
-    )
-
-def filtrar_en_tabla_por_termino(term: str, tabla: ttk.Treeview) -> None:
+def _buscar_por_termino(term: str) -> list[Any]:
+    # Sin coincidencias la tabla queda vacía: nada de traer todo y filtrar en Python
+    resultados = buscar_productos(term, limite=LIMITE_BUSQUEDA)
+    if term.isdigit():
+        # El índice de búsqueda no incluye el ID: se agrega por búsqueda exacta
+        prod = obtener_producto_por_id(int(term))
+        if prod is not None and all(_get_key(r, "id", 0) != prod[0] for r in resultados):
+            resultados = [prod] + list(resultados)
+    return resultados
+
+def filtrar_en_tabla_por_termino(term: str, tabla: ttk.Treeview, keep_position: bool = False) -> None:
     term = (term or "").strip()
     if term == "":
-        cargar_datos(tabla)
+        cargar_datos(tabla, keep_position=keep_position)
         return
-    term_low = term.lower()
-    try:
-        base = buscar_productos(term)  # si existe en el modelo
-        if not base:
-            raise Exception("fallback")
-        filtrados = base
-    except Exception:
-        try:
-            allp = obtener_productos()
-        except Exception:
-            allp = []
-        filtrados = [prod for prod in allp if _producto_match_term(prod, term_low)]
-    _set_rows(tabla, filtrados)
+    _cargar_async(tabla, _buscar_por_termino, term, keep_position=keep_position)
 
-def cargar_categorias_combobox(combo: ttk.Combobox, include_all: bool = True) -> None:
+def _llenar_combo_categorias(combo: ttk.Combobox, categorias: Iterable[Any], include_all: bool = True) -> None:
+    """Opciones "id - nombre"; conserva la elegida si sigue existiendo."""
     opciones: list[str] = (["Todas"] if include_all else [])
-    try:
-        for c in obtener_categorias():
-            cid = _get_key(c, 0, "id")
-            cnombre = _get_key(c, 1, "nombre")
-            opciones.append(f"{cid} - {cnombre}")
-    except Exception as e:
-        messagebox.showerror("Error", f"No se pudieron cargar categorías: {e}")
+    for c in categorias:
+        cid = _get_key(c, 0, "id")
+        cnombre = _get_key(c, 1, "nombre")
+        opciones.append(f"{cid} - {cnombre}")
+    actual = combo.get()
     combo["values"] = opciones
-    if opciones:
+    if actual in opciones:
+        combo.set(actual)
+    elif opciones:
         try:
             combo.current(0)
         except Exception:
             pass
 
+def cargar_categorias_combobox(combo: ttk.Combobox, include_all: bool = True) -> None:
+    try:
+        categorias = obtener_categorias()
+        precarga.guardar(categorias=categorias)
+    except Exception as e:
+        messagebox.showerror("Error", f"No se pudieron cargar categorías: {e}")
+        categorias = []
+    _llenar_combo_categorias(combo, categorias, include_all)
+
+def _cargar_categorias_async(combo: ttk.Combobox) -> None:
+    def on_done(categorias: list[Any]) -> None:
+        _llenar_combo_categorias(combo, categorias)
+        precarga.guardar(categorias=categorias)
+
+    run_async(
+        combo, obtener_categorias,
+        key=("productos_view_categorias", str(combo)),
+        on_done=on_done,
+        on_error=lambda e: messagebox.showerror("Error", f"No se pudieron cargar categorías: {e}"),
+    )
+
+def _pintar_precarga(tabla: VirtualTreeview, combo_categoria: ttk.Combobox) -> None:
+    """
+    Dibuja el catálogo y las categorías precargados por la ventana principal
+    (si ya están); los datos frescos que se piden a continuación los reemplazan.
+    """
+    datos = precarga.datos()
+    if datos is None:
+        return
+    tabla.set_source(_fuente_paginada({}, datos["total"], datos["productos"]))
+    _llenar_combo_categorias(combo_categoria, datos["categorias"])
+
 
 
 def parse_id_from_combo_value(val: str) -> Optional[int]:
@@ -284,42 +385,41 @@ def parse_id_from_combo_value(val: str) -> Optional[int]:
     except Exception:
         return None
 
-def filtrar_por_categoria(combo_categoria: ttk.Combobox, tabla: ttk.Treeview) -> None:
+def filtrar_por_categoria(combo_categoria: ttk.Combobox, tabla: ttk.Treeview, keep_position: bool = False) -> None:
     cat_id = parse_id_from_combo_value(combo_categoria.get())
     if cat_id is None:
-        cargar_datos(tabla)
+        cargar_datos(tabla, keep_position=keep_position)
         return
-    filtrados: list[Iterable[Any]] = []
-    try:
-        for prod in obtener_productos():
-            p = _parse_producto(prod)
-            if p["categoria_id"] == cat_id:
-                filtrados.append(prod)
-    except Exception as e:
-        messagebox.showerror("Error", f"No se pudo filtrar: {e}")
-    _set_rows(tabla, filtrados)
+    # Filtra la base (índice idx_productos_categoria), no la lista completa en Python
+    _cargar_paginado(tabla, categoria_id=cat_id, error_msg="No se pudo filtrar", keep_position=keep_position)
 
 # ============================
 # === CSV EXPORT            ==
 # ============================
-def export_tabla_csv(tabla: ttk.Treeview, parent: tk.Misc) -> None:
-    if not tabla.get_children():
+def export_tabla_csv(tabla: VirtualTreeview, parent: tk.Misc) -> None:
+    if not tabla.row_count():
         messagebox.showwarning("Exportar", "No hay datos para exportar.")
         return
-    fpath = filedialog.asksaveasfilename(
-        parent=parent,
-        defaultextension=".csv",
-        filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-    )
+    fpath = pedir_ruta_csv(parent)
     if not fpath:
         return
+    fuente = tabla.source
+    if isinstance(fuente, PagedSource):
+        # Catálogo o filtro por categoría: se exporta desde la base, en segundo
+        # plano y por lotes, con los mismos filtros y el orden de la tabla
+        columna, descendente = tabla.sort_order or ("Nombre", False)
+        exportar_con_progreso(
+            parent, "Exportar productos", exportar_productos, fpath,
+            orden=ORDEN_COLUMNAS[columna][0], descendente=descendente, **(fuente.filters or {}),
+        )
+        return
+    # Resultados de una búsqueda (a lo sumo LIMITE_BUSQUEDA filas, ya en memoria)
     cols = tabla["columns"]
     try:
         with open(fpath, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(cols)
-            for item in tabla.get_children():
-                values = tabla.item(item, "values")
+            for values in tabla.iter_values():
                 writer.writerow([_safe_str(v) for v in values])
         messagebox.showinfo("Exportar", f"Tabla exportada a:\n{fpath}")
     except Exception as e:
@@ -328,14 +428,12 @@ def export_tabla_csv(tabla: ttk.Treeview, parent: tk.Misc) -> None:
 # ============================
 # === HANDLERS CRUD         ==
 # ============================
-def _get_selected_row_id(tabla: ttk.Treeview) -> Optional[int]:
-    seleccionado = tabla.selection()
-    if not seleccionado:
+def _get_selected_row_id(tabla: VirtualTreeview) -> Optional[int]:
+    prod = tabla.selected_row()
+    if prod is None:
         return None
-    item_id = seleccionado[0]
-    item = tabla.item(item_id)
     try:
-        return int(item["values"][0])
+        return int(_get_key(prod, "id", 0))
     except Exception:
         return None
 
@@ -348,7 +446,7 @@ def borrar_handler(tabla: ttk.Treeview) -> None:
         return
     try:
         eliminar_producto(id_producto)
-        cargar_datos(tabla)
+        cargar_datos(tabla, keep_position=True)
         messagebox.showinfo("OK", "Producto eliminado.")
     except Exception as e:
         messagebox.showerror("Error", str(e))
@@ -367,12 +465,7 @@ def _agregar_producto_flexible(**kwargs: Any) -> None:
     categoria_id = kwargs.get("categoria_id")
 
 
-    # 1) firma completa posicional
-    try:
-        return agregar_producto(nombre, precio_venta, stock, sku, precio_costo, seccion, categoria_id)  # type: ignore[misc]
-    except TypeError:
-        pass
-    # 2) con keywords
+    # 1) con keywords (la posicional pondría la sección en minimo_stock)
     try:
         return agregar_producto(
             nombre=nombre, precio_venta=precio_venta, stock=stock,
@@ -381,12 +474,12 @@ def _agregar_producto_flexible(**kwargs: Any) -> None:
         )  # type: ignore[misc]
     except TypeError:
         pass
-    # 3) versión reducida (como en algunos ejemplos)
+    # 2) versión reducida (como en algunos ejemplos)
     try:
         return agregar_producto(nombre, precio_venta, stock, sku=sku, categoria_id=categoria_id)  # type: ignore[misc]
     except TypeError:
         pass
-    # 4) mínima
+    # 3) mínima
     return agregar_producto(nombre, precio_venta, stock)  # type: ignore[misc]
 
 def _editar_producto_flexible(producto_id: int, **kwargs: Any) -> None:
@@ -402,26 +495,22 @@ def _editar_producto_flexible(producto_id: int, **kwargs: Any) -> None:
     categoria_id = kwargs.get("categoria_id")
 
 
-    # 1) firma completa posicional
-    try:
-        return editar_producto(producto_id, nombre, precio_venta, stock, sku, precio_costo, seccion, categoria_id)  # type: ignore[misc]
-    except TypeError:
-        pass
-    # 2) con keywords
+    # 1) con keywords (la posicional pondría la sección en minimo_stock)
     try:
         return editar_producto(
             producto_id,
             nombre=nombre, precio_venta=precio_venta, stock=stock,
-            sku=sku, precio_costo=precio_costo, seccion=seccion
+            sku=sku, precio_costo=precio_costo, seccion=seccion,
+            categoria_id=categoria_id
         )  # type: ignore[misc]
     except TypeError:
         pass
-    # 3) reducida
+    # 2) reducida
     try:
         return editar_producto(producto_id, nombre, precio_venta, stock, sku=sku, categoria_id=categoria_id)  # type: ignore[misc]
     except TypeError:
         pass
-    # 4) mínima
+    # 3) mínima
     return editar_producto(producto_id, nombre, precio_venta, stock)  # type: ignore[misc]
 
 def _ajuste_stock_flexible(producto_id: int, cantidad: int, motivo: str, tipo: str) -> None:
@@ -476,7 +565,7 @@ def ajustar_stock_handler(root: tk.Misc, tabla: ttk.Treeview, tipo: str) -> None
 
             _ajuste_stock_flexible(id_producto, cantidad, motivo, tipo)
             top.destroy()
-            cargar_datos(tabla)
+            cargar_datos(tabla, keep_position=True)
         except ValueError:
             messagebox.showerror("Error", "Cantidad inválida")
         except Exception as e:
@@ -694,7 +783,7 @@ def abrir_modal_producto(
             if fil_sel and fil_sel != "Todas":
                 filtrar_por_categoria(combo_categoria_filter, tabla)
             else:
-                cargar_datos(tabla)
+                cargar_datos(tabla, keep_position=True)
             if entry_buscar and entry_buscar.value():
                 filtrar_en_tabla_por_termino(entry_buscar.value(), tabla)
 
@@ -767,7 +856,7 @@ def _build_right_panel(root: tk.Widget) -> dict[str, Any]:
     tk.Label(top_filters, text="Categoría (filtro):").grid(row=0, column=0, padx=6, pady=6, sticky="w")
     combo_categoria = ttk.Combobox(top_filters, state="readonly", width=32)
     combo_categoria.grid(row=0, column=1, padx=6, pady=6, sticky="w")
-    cargar_categorias_combobox(combo_categoria, include_all=True)
+    _llenar_combo_categorias(combo_categoria, [])  # las categorías llegan al abrir la ventana
 
     btn_aplicar = ttk.Button(top_filters, text="Aplicar filtro")
     btn_agregar_cat = ttk.Button(top_filters, text="Agregar categoría")
@@ -882,10 +971,11 @@ def _bind_shortcuts(root: tk.Misc, search_entry: PlaceholderEntry, tabla: ttk.Tr
 # ============================
 # === ENTRADA PRINCIPAL     ==
 # ============================
-def ventana_productos(parent: tk.Misc | None = None) -> None:
+def ventana_productos(parent: tk.Misc | None = None) -> Optional[tk.Toplevel]:
     """
     Si parent es None, crea una ventana raíz (Tk) y ejecuta mainloop.
-    Si parent no es None, crea un Toplevel (no llama mainloop).
+    Si parent no es None, crea un Toplevel (no llama mainloop) y lo devuelve;
+    WindowManager lo oculta al cerrar y lo vuelve a mostrar (<<VentanaMostrada>>).
     """
     stand_alone = parent is None
     root_window: tk.Misc
@@ -929,10 +1019,23 @@ def ventana_productos(parent: tk.Misc | None = None) -> None:
     right = _build_right_panel(container) # type: ignore[arg-type]
 
     # Bindings
-    left["entry_buscar"].bind(  # type: ignore
-        "<KeyRelease>",
-        lambda e: filtrar_en_tabla_por_termino(left["entry_buscar"].value(), right["tabla"])  # type: ignore
+    # Búsqueda mientras se escribe: una consulta por pausa (no por tecla), en el
+    # hilo de BD; si llega otra antes de terminar, la anterior se cancela.
+    buscar = Debouncer(
+        container,
+        lambda term: filtrar_en_tabla_por_termino(term, right["tabla"]),  # type: ignore
+        DEMORA_BUSQUEDA_MS,
     )
+    ultimo_termino: list[Optional[str]] = [None]
+
+    def _on_buscar_key(_: Any = None) -> None:
+        term = left["entry_buscar"].value()  # type: ignore
+        if term == ultimo_termino[0]:
+            return  # flechas, Shift, etc.: el texto no cambió
+        ultimo_termino[0] = term
+        buscar(term)
+
+    left["entry_buscar"].bind("<KeyRelease>", _on_buscar_key)  # type: ignore
     right["combo_categoria"].bind(  # type: ignore
         "<<ComboboxSelected>>",
         lambda e: filtrar_por_categoria(right["combo_categoria"], right["tabla"])  # type: ignore
@@ -984,13 +1087,29 @@ def ventana_productos(parent: tk.Misc | None = None) -> None:
 
     _bind_shortcuts(container, left["entry_buscar"], right["tabla"])  # type: ignore
 
-    cargar_datos(right["tabla"])  # type: ignore
+    # Primero lo precargado (inmediato), luego lo fresco sin perder la posición
+    _pintar_precarga(right["tabla"], right["combo_categoria"])  # type: ignore
+    cargar_datos(right["tabla"], keep_position=True)  # type: ignore
+    _cargar_categorias_async(right["combo_categoria"])  # type: ignore
+
+    def _al_mostrar(_: Any = None) -> None:
+        # Reabierta: releer con los mismos filtros, conservando posición y selección
+        term = left["entry_buscar"].value().strip()  # type: ignore
+        if term:
+            filtrar_en_tabla_por_termino(term, right["tabla"], keep_position=True)  # type: ignore
+        else:
+            filtrar_por_categoria(right["combo_categoria"], right["tabla"], keep_position=True)  # type: ignore
+        _cargar_categorias_async(right["combo_categoria"])  # type: ignore
+
+    container.bind(EVENTO_MOSTRADA, _al_mostrar)
 
     if stand_alone:
         try:
             root_window.mainloop()
         except KeyboardInterrupt:
             sys.exit(0)
+        return None
+    return container  # type: ignore[return-value]
 
 if __name__ == "__main__":
     ventana_productos()
@@ -1,19 +1,43 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from datetime import datetime, date
-from collections import defaultdict
 
 # Modelos existentes
-from models.reportes import ventas_totales, ventas_por_producto, productos_bajo_stock, movimientos_recientes
-from models.ventas import obtener_ventas
-
-# Intentar habilitar gráficos (matplotlib). Si no está, degradar con aviso.
-try:
-    from matplotlib.figure import Figure
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    MATPLOTLIB_OK = True
-except Exception:
-    MATPLOTLIB_OK = False
+from models.reportes import (
+    ventas_totales, ventas_por_producto, productos_bajo_stock, movimientos_recientes,
+    marca_reportes, cambios_reportes, kpis_ventas,
+    anios_con_ventas, ventas_mensuales,
+)
+from models.ventas import obtener_ventas_pagina
+from models.movimientos import kardex_producto
+from models.producto import obtener_producto_por_id
+from models.exportar import exportar_ventas, exportar_movimientos
+from database.db import connection
+from database.executor import run_async
+from views.exportar_dialogo import exportar_con_progreso, pedir_ruta_csv
+from views.tree_sync import sync_treeview
+from views.virtual_tree import VirtualTreeview, valor_orden
+from views.window_manager import EVENTO_MOSTRADA, EVENTO_OCULTA, close_window
+
+# matplotlib (con su backend Tk) es la importación más lenta de la aplicación:
+# se carga recién la primera vez que se muestra la pestaña del gráfico mensual.
+_matplotlib = None  # (Figure, FigureCanvasTkAgg); False si no está instalado
+
+# Filas de "Movimientos recientes" (pantalla, refresco y exportación)
+MAX_MOVIMIENTOS = 200
+
+
+def cargar_matplotlib():
+    """Devuelve (Figure, FigureCanvasTkAgg), o None si matplotlib no está disponible."""
+    global _matplotlib
+    if _matplotlib is None:
+        try:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            _matplotlib = (Figure, FigureCanvasTkAgg)
+        except Exception:
+            _matplotlib = False
+    return _matplotlib or None
 
 
 def ventana_reportes(master=None):
@@ -36,11 +60,15 @@ def ventana_reportes(master=None):
     estilo.configure("Treeview", rowheight=24)
 
     # ------------- UTILIDADES UI -------------
-    def build_tree(parent, columns, height=12, stretch=True):
+    def build_tree(parent, columns, height=12, stretch=True, virtual=False):
+        # virtual=True para tablas que pueden tener tantas filas como productos
         container = ttk.Frame(parent)
         container.pack(fill="both", expand=True)
 
-        tv = ttk.Treeview(container, columns=columns, show="headings", height=height)
+        if virtual:
+            tv = VirtualTreeview(container, columns=columns, show="headings", height=height)
+        else:
+            tv = ttk.Treeview(container, columns=columns, show="headings", height=height)
         vsb = ttk.Scrollbar(container, orient="vertical", command=tv.yview)
         hsb = ttk.Scrollbar(container, orient="horizontal", command=tv.xview)
         tv.configure(yscroll=vsb.set, xscroll=hsb.set)
@@ -84,47 +112,36 @@ def ventana_reportes(master=None):
         return tv
 
     def fill_treeview(tv, rows, tag_func=None):
-        tv.delete(*tv.get_children())
-        for i, r in enumerate(rows):
-            base_tag = "even" if i % 2 == 0 else "odd"
-            tags = [base_tag]
-            if tag_func:
-                t = tag_func(r)
-                if t:
-                    tags.append(t)
-            tv.insert("", tk.END, values=r, tags=tuple(tags))
-
-    def sort_by_column(tv, col, reverse=None):
+        # Filas identificadas por la primera columna (ID): se actualiza por diferencias
+        if isinstance(tv, VirtualTreeview):
+            tv.tag_func = tag_func
+            tv.set_rows(rows, keep_position=True)
+            return
+        # Se guardan las filas tipadas: ordenar por columna no relee ni re-parsea la tabla
+        tv._filas = list(rows)
+        tv._tag_func = tag_func
+        orden = getattr(tv, "_orden", None)
+        if orden is not None:
+            ordenar_filas(tv, *orden)
+        sync_treeview(tv, tv._filas, tag_func=tag_func)
+
+    def ordenar_filas(tv, col, reverse):
         idx = tv["columns"].index(col)
+        tv._filas.sort(key=lambda fila: valor_orden(col, fila[idx]), reverse=reverse)
 
-        def parse_val(x):
-            s = str(x).strip()
-            # número
-            try:
-                return float(s.replace(",", ""))
-            except ValueError:
-                pass
-            # fechas comunes
-            for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"):
-                try:
-                    return datetime.strptime(s, fmt)
-                except ValueError:
-                    continue
-            return s.lower()
-
-        pairs = []
-        for iid in tv.get_children(""):
-            vals = tv.item(iid, "values")
-            pairs.append((parse_val(vals[idx]), iid))
-
-        key = f"_sort_{col}"
+    def sort_by_column(tv, col, reverse=None):
+        if isinstance(tv, VirtualTreeview):
+            tv.sort_by(col, reverse)
+            return
         if reverse is None:
-            reverse = not getattr(tv, key, False)
-            setattr(tv, key, reverse)
-
-        pairs.sort(key=lambda t: t[0], reverse=reverse)
-        for pos, (_, iid) in enumerate(pairs):
-            tv.move(iid, "", pos)
+            previo = getattr(tv, "_orden", None)
+            reverse = bool(previo and previo[0] == col and not previo[1])
+        tv._orden = (col, reverse)
+        if getattr(tv, "_filas", None) is None:
+            return
+        # Valores tal como vinieron del modelo (números, fechas ISO): sin strptime
+        ordenar_filas(tv, col, reverse)
+        sync_treeview(tv, tv._filas, tag_func=tv._tag_func)
 
     def copy_selected_row(tv):
         sel = tv.focus()
@@ -148,8 +165,11 @@ def ventana_reportes(master=None):
             with open(path, "w", newline="", encoding="utf-8") as f:
                 w = csv.writer(f)
                 w.writerow(tv["columns"])
-                for iid in tv.get_children(""):
-                    w.writerow(tv.item(iid, "values"))
+                if isinstance(tv, VirtualTreeview):
+                    w.writerows(tv.iter_values())
+                else:
+                    for iid in tv.get_children(""):
+                        w.writerow(tv.item(iid, "values"))
             messagebox.showinfo("Exportar", f"Exportado a:\n{path}")
         except Exception as e:
             messagebox.showerror("Exportar", f"No se pudo exportar:\n{e}")
@@ -182,7 +202,7 @@ def ventana_reportes(master=None):
     lbl_last = ttk.Label(toolbar, text="Última actualización: --")
     lbl_last.pack(side="right", padx=4)
 
-    btn_exportar_tabla = ttk.Button(toolbar, text="Exportar tabla visible (CSV)")
+    btn_exportar_tabla = ttk.Button(toolbar, text="Exportar pestaña (CSV)")
     btn_exportar_tabla.pack(side="right", padx=4)
 
     # ------------- NOTEBOOK -------------
@@ -216,7 +236,7 @@ def ventana_reportes(master=None):
     lbl_total.pack(pady=6, anchor="w")
 
     cols_resumen = ("ID", "Nombre", "Unidades Vendidas", "Total Vendido")
-    tv_ventas = build_tree(tab_resumen, cols_resumen, height=12)
+    tv_ventas = build_tree(tab_resumen, cols_resumen, height=12, virtual=True)
 
     # ----- TAB HISTORIAL CON FILTROS -----
     tab_hist = ttk.Frame(notebook)
@@ -251,6 +271,10 @@ def ventana_reportes(master=None):
 
     cols_hist = ("ID", "Producto ID", "Nombre", "Cantidad", "Total", "Fecha", "Cliente")
     tv_hist = build_tree(tab_hist, cols_hist, height=18)
+    # Por fecha (o ID, que sigue el mismo orden) ordena la base: el índice del
+    # historial se recorre al revés y se vuelve a la primera página.
+    for c in ("ID", "Fecha"):
+        tv_hist.heading(c, text=c, command=lambda: invertir_orden_hist())
 
     pag_bar = ttk.Frame(tab_hist)
     pag_bar.pack(fill="x", pady=4)
@@ -277,20 +301,19 @@ def ventana_reportes(master=None):
     entry_meta_mensual.insert(0, "1000")
     entry_meta_mensual.pack(side="left", padx=4)
 
+    ttk.Label(controls_m, text="Comparar con años anteriores:").pack(side="left", padx=8)
+    spin_comparar = ttk.Spinbox(controls_m, from_=0, to=5, width=3)
+    spin_comparar.set("0")
+    spin_comparar.pack(side="left", padx=4)
+
     ttk.Button(controls_m, text="Aplicar", command=lambda: dibujar_grafico_mensual()).pack(side="left", padx=8)
+    combo_anio.bind("<<ComboboxSelected>>", lambda e: dibujar_grafico_mensual())
 
     graf_container = ttk.Frame(tab_mensual)
     graf_container.pack(fill="both", expand=True, padx=6, pady=6)
 
-    if MATPLOTLIB_OK:
-        fig = Figure(figsize=(8, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        canvas = FigureCanvasTkAgg(fig, master=graf_container)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.pack(fill="both", expand=True)
-    else:
-        lbl_no_mpl = ttk.Label(graf_container, text="Instala matplotlib para ver el gráfico mensual.")
-        lbl_no_mpl.pack(pady=20)
+    # La figura se crea al mostrar la pestaña por primera vez (ver preparar_grafico)
+    grafico = {"fig": None, "canvas": None, "pendiente": False}
 
     # ----- TAB MOVIMIENTOS / STOCK -----
     tab_mov = ttk.Frame(notebook)
@@ -309,13 +332,52 @@ def ventana_reportes(master=None):
     ttk.Button(frame_stock, text="Mostrar", command=lambda: cargar_bajo_stock()).pack(side="left", padx=6)
 
     cols2 = ("ID", "Nombre", "Stock")
-    tv_stock = build_tree(tab_mov, cols2, height=10)
+    tv_stock = build_tree(tab_mov, cols2, height=10, virtual=True)
+
+    # ----- TAB KARDEX -----
+    tab_kardex = ttk.Frame(notebook)
+    notebook.add(tab_kardex, text="Kardex")
+
+    filtros_k = ttk.LabelFrame(tab_kardex, text="Producto")
+    filtros_k.pack(fill="x", padx=4, pady=4)
+    ttk.Label(filtros_k, text="ID producto:").grid(row=0, column=0, padx=4, pady=4, sticky="w")
+    entry_kardex_id = ttk.Entry(filtros_k, width=8)
+    entry_kardex_id.grid(row=0, column=1, padx=4, pady=4)
+    ttk.Label(filtros_k, text="Desde (YYYY-MM-DD):").grid(row=0, column=2, padx=4, pady=4, sticky="w")
+    entry_kardex_desde = ttk.Entry(filtros_k, width=12)
+    entry_kardex_desde.grid(row=0, column=3, padx=4, pady=4)
+    ttk.Label(filtros_k, text="Hasta (YYYY-MM-DD):").grid(row=0, column=4, padx=4, pady=4, sticky="w")
+    entry_kardex_hasta = ttk.Entry(filtros_k, width=12)
+    entry_kardex_hasta.grid(row=0, column=5, padx=4, pady=4)
+    ttk.Button(filtros_k, text="Ver kardex", command=lambda: cargar_kardex(reset_page=True)).grid(row=0, column=6, padx=4, pady=4)
+    entry_kardex_id.bind("<Return>", lambda e: cargar_kardex(reset_page=True))
+
+    lbl_kardex = ttk.Label(tab_kardex, text="Ingrese el ID de un producto.")
+    lbl_kardex.pack(anchor="w", padx=4)
+
+    cols_kardex = ("ID", "Fecha", "Tipo", "Motivo", "Entrada", "Salida", "Saldo")
+    tv_kardex = build_tree(tab_kardex, cols_kardex, height=16)
+
+    pag_kardex = ttk.Frame(tab_kardex)
+    pag_kardex.pack(fill="x", pady=4)
+    btn_kardex_prev = ttk.Button(pag_kardex, text="⟨ Anterior", command=lambda: cambiar_pagina_kardex(-1), state="disabled")
+    btn_kardex_prev.pack(side="left", padx=4)
+    lbl_kardex_pagina = ttk.Label(pag_kardex, text="Página 1")
+    lbl_kardex_pagina.pack(side="left", padx=8)
+    btn_kardex_next = ttk.Button(pag_kardex, text="Siguiente ⟩", command=lambda: cambiar_pagina_kardex(1), state="disabled")
+    btn_kardex_next.pack(side="left", padx=4)
 
     # ------------- ESTADO -------------
-    ventas_hist_todas = []
     pagina_actual = 1
-    total_paginas = 1
+    hist_cursores = [None]   # cursor de inicio de cada página visitada
+    hist_siguiente = None
+    hist_ascendente = False  # historial de la venta más antigua a la más reciente
     job_auto = None
+    marca = None             # marca de agua de la última carga (refresco incremental)
+    movimientos = []         # filas de tv_mov, más nuevas primero
+    kpis_dia = None          # día de los KPIs mostrados
+    kardex_cursores = [None]  # cursor de inicio de cada página del kardex
+    kardex_siguiente = None
 
     # ------------- LÓGICA -------------
     def parse_date_safe(s):
@@ -329,67 +391,91 @@ def ventana_reportes(master=None):
                 continue
         return None
 
-    def recargar_todo():
-        nonlocal ventas_hist_todas, pagina_actual
-        # KPI + Totales + Resumen
-        try:
-            total = ventas_totales()
-            lbl_total.config(text=f"Ventas Totales: {total}")
-        except Exception as e:
-            lbl_total.config(text="Ventas Totales: --")
-            messagebox.showwarning("Resumen", f"No se pudo obtener ventas totales:\n{e}")
+    def consultar_reportes(umbral):
+        # Corre en el hilo de BD: solo consultas, nada de widgets.
+        datos, errores = {}, {}
+        consultas = (
+            ("total", ventas_totales, ()),
+            ("resumen", ventas_por_producto, ()),
+            ("anios", anios_con_ventas, ()),
+            ("movimientos", movimientos_recientes, (MAX_MOVIMIENTOS,)),
+            ("bajo_stock", productos_bajo_stock, (umbral,)),
+            ("kpis", kpis_ventas, ()),
+        )
+        # Una transacción de lectura: la marca de agua corresponde exactamente
+        # a lo cargado, y el refresco incremental parte de ahí.
+        with connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            datos["marca"] = marca_reportes(conn)
+            for clave, fn, args in consultas:
+                try:
+                    datos[clave] = fn(*args)
+                except Exception as e:
+                    errores[clave] = e
+        return datos, errores
 
+    def leer_umbral():
         try:
-            filas_resumen = ventas_por_producto()
-            fill_treeview(tv_ventas, filas_resumen)
-        except Exception as e:
-            fill_treeview(tv_ventas, [])
-            messagebox.showwarning("Resumen", f"No se pudieron cargar ventas por producto:\n{e}")
+            return int(entry_umbral.get())
+        except ValueError:
+            entry_umbral.delete(0, tk.END)
+            entry_umbral.insert(0, "5")
+            return 5
 
-        # Historial base
-        try:
-            ventas_hist_todas = obtener_ventas() or []
-        except Exception as e:
-            ventas_hist_todas = []
-            messagebox.showwarning("Historial", f"No se pudo cargar el historial de ventas:\n{e}")
+    def recargar_todo():
+        umbral = leer_umbral()
+        run_async(
+            root, consultar_reportes, umbral,
+            key=("reportes", str(root)),
+            on_done=lambda res: aplicar_reportes(res[0], res[1], umbral),
+            on_error=lambda e: messagebox.showwarning("Reportes", f"No se pudieron cargar los reportes:\n{e}"),
+        )
+
+    def pintar_kpis(kpis):
+        nonlocal kpis_dia
+        kpis_dia = date.today()
+        kpi_hoy_val.config(text=f"{kpis['hoy']:,.2f}")
+        kpi_mes_val.config(text=f"{kpis['mes']:,.2f}")
+        # Variación mes a mes
+        if kpis["variacion"] is not None:
+            delta = kpis["variacion"]
+            signo = "▲" if delta >= 0 else "▼"
+            kpi_vs_val.config(text=f"{signo} {delta:+.1f}% vs. mes ant.")
+            # ttk no aplica bg directo a LabelFrame; mantenemos solo el texto
+        else:
+            kpi_vs_val.config(text="N/D")
 
-        # KPIs derivados del historial
+    def tag_mov(row):
         try:
-            hoy = date.today()
-            ventas_hoy = 0.0
-            ventas_mes = 0.0
-            ventas_mes_ant = 0.0
-            for r in ventas_hist_todas:
-                # r = ("ID","Producto ID","Nombre","Cantidad","Total","Fecha","Cliente")
-                total_r = float(str(r[4]).replace(",", "")) if r[4] is not None else 0.0
-                f = parse_date_safe(r[5])
-                if not f:
-                    continue
-                if f.date() == hoy:
-                    ventas_hoy += total_r
-                if f.year == hoy.year and f.month == hoy.month:
-                    ventas_mes += total_r
-                # mes anterior
-                ant_year = hoy.year if hoy.month > 1 else hoy.year - 1
-                ant_month = hoy.month - 1 if hoy.month > 1 else 12
-                if f.year == ant_year and f.month == ant_month:
-                    ventas_mes_ant += total_r
-
-            kpi_hoy_val.config(text=f"{ventas_hoy:,.2f}")
-            kpi_mes_val.config(text=f"{ventas_mes:,.2f}")
-
-            # Variación mes a mes
-            if ventas_mes_ant > 0:
-                delta = (ventas_mes - ventas_mes_ant) / ventas_mes_ant * 100.0
-                signo = "▲" if delta >= 0 else "▼"
-                color_tag = "good" if delta >= 0 else "bad"
-                kpi_vs_val.config(text=f"{signo} {delta:+.1f}% vs. mes ant.")
-                # colorear el fondo del label según resultado
-                kpi_vs_f.configure(style="")
-                # ttk no aplica bg directo a LabelFrame; mantenemos solo el texto
-            else:
-                kpi_vs_val.config(text="N/D")
+            cantidad = float(str(row[3]).replace(",", ""))
         except Exception:
+            cantidad = 0
+        tipo = str(row[4]).strip().lower() if len(row) > 4 else ""
+        if cantidad < 0 or tipo in ("salida", "egreso"):
+            return "bad"
+        return None
+
+    def aplicar_reportes(datos, errores, umbral):
+        nonlocal pagina_actual, marca, movimientos
+        marca = datos["marca"]
+        # KPI + Totales + Resumen
+        if "total" in errores:
+            lbl_total.config(text="Ventas Totales: --")
+            messagebox.showwarning("Resumen", f"No se pudo obtener ventas totales:\n{errores['total']}")
+        else:
+            lbl_total.config(text=f"Ventas Totales: {datos['total']}")
+
+        if "resumen" in errores:
+            fill_treeview(tv_ventas, [])
+            messagebox.showwarning("Resumen", f"No se pudieron cargar ventas por producto:\n{errores['resumen']}")
+        else:
+            fill_treeview(tv_ventas, datos["resumen"])
+
+        # KPIs (calculados en SQL)
+        if "kpis" not in errores:
+            pintar_kpis(datos["kpis"])
+        else:
             kpi_hoy_val.config(text="--")
             kpi_mes_val.config(text="--")
             kpi_vs_val.config(text="--")
@@ -399,32 +485,108 @@ def ventana_reportes(master=None):
         aplicar_filtros_hist(reset_page=True)
 
         # Movimientos (colorear salidas)
-        try:
-            filas_mov = movimientos_recientes(200)
-            def tag_mov(row):
-                try:
-                    cantidad = float(str(row[3]).replace(",", ""))
-                except Exception:
-                    cantidad = 0
-                tipo = str(row[4]).strip().lower() if len(row) > 4 else ""
-                if cantidad < 0 or tipo in ("salida", "egreso"):
-                    return "bad"
-                return None
-            fill_treeview(tv_mov, filas_mov, tag_func=tag_mov)
-        except Exception as e:
-            fill_treeview(tv_mov, [])
-            messagebox.showwarning("Movimientos", f"No se pudieron cargar los movimientos:\n{e}")
+        if "movimientos" not in errores:
+            movimientos = list(datos["movimientos"])
+        else:
+            movimientos = []
+        fill_treeview(tv_mov, movimientos, tag_func=tag_mov)
+        if "movimientos" in errores:
+            messagebox.showwarning("Movimientos", f"No se pudieron cargar los movimientos:\n{errores['movimientos']}")
 
         # Stock crítico coloreado
-        cargar_bajo_stock()
+        if "bajo_stock" in errores:
+            fill_treeview(tv_stock, [])
+            messagebox.showwarning("Stock", f"No se pudo cargar el stock crítico:\n{errores['bajo_stock']}")
+        else:
+            pintar_bajo_stock(datos["bajo_stock"], umbral)
 
         # Gráfico mensual (siempre recalcular opciones de año)
-        actualizar_anios_disponibles()
+        actualizar_anios_disponibles(datos.get("anios") or [])
         dibujar_grafico_mensual()
 
         # Marcar hora
         lbl_last.config(text=f"Última actualización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
+    # --------- Refresco incremental ---------
+    def consultar_cambios(marca, umbral, dia_kpis):
+        # Hilo de BD. Los KPIs se releen si hubo ventas nuevas o cambió el día.
+        cambios = cambios_reportes(marca, umbral)
+        if cambios is None and dia_kpis == date.today():
+            return None
+        if cambios is None:
+            cambios = {"completo": False, "marca": marca, "total": None, "ventas": [],
+                       "movimientos": [], "resumen": [], "resumen_borrados": [],
+                       "bajo_stock": None}
+        if not cambios["completo"] and (cambios["ventas"] or dia_kpis != date.today()):
+            cambios["kpis"] = kpis_ventas()
+        return cambios
+
+    def refrescar_incremental():
+        if marca is None:
+            recargar_todo()
+            return
+        umbral = leer_umbral()
+        run_async(
+            root, consultar_cambios, marca, umbral, kpis_dia,
+            key=("reportes", str(root)),
+            on_done=lambda cambios: aplicar_cambios(cambios, umbral),
+            # Sin ventanas emergentes cada N segundos: el error queda en la barra
+            on_error=lambda e: lbl_last.config(text=f"Error al actualizar: {e}"),
+        )
+
+    def aplicar_cambios(cambios, umbral):
+        nonlocal marca, movimientos
+        if cambios is None:
+            return  # nada nuevo desde la última carga
+        if cambios["completo"]:
+            recargar_todo()
+            return
+        marca = cambios["marca"]
+        if cambios["total"] is not None:
+            lbl_total.config(text=f"Ventas Totales: {cambios['total']}")
+        if "kpis" in cambios:
+            pintar_kpis(cambios["kpis"])
+
+        # Resumen: solo las filas de los productos tocados, reordenando después
+        if cambios["resumen"] or cambios["resumen_borrados"]:
+            fuente = tv_ventas.source
+            fuente.upsert(cambios["resumen"])
+            fuente.remove(cambios["resumen_borrados"])
+            if tv_ventas.sort_order is not None:
+                tv_ventas.sort_by(*tv_ventas.sort_order)
+            else:
+                # Mismo orden que ventas_por_producto: total desc, nombre asc
+                fuente.sort(None, False, key=lambda f: (-float(f[3] or 0), str(f[1] or "")))
+                tv_ventas.refresh()
+
+        nuevas = cambios["ventas"]
+        if nuevas:
+            anios = {f.year for f in (parse_date_safe(v[5]) for v in nuevas) if f}
+            conocidos = {int(a) for a in combo_anio["values"] or ()}
+            if anios - conocidos:
+                actualizar_anios_disponibles(sorted(anios | conocidos))
+            try:
+                anio_sel = int(combo_anio.get())
+                comparados = int(spin_comparar.get() or 0)
+            except ValueError:
+                anio_sel, comparados = None, 0
+            # Redibujar solo si las ventas nuevas caen en algún año del gráfico
+            if anio_sel is not None and any(anio_sel - comparados <= a <= anio_sel for a in anios):
+                dibujar_grafico_mensual()
+            # Solo la primera página cambia con ventas nuevas
+            if pagina_actual == 1:
+                cargar_pagina_hist()
+
+        # Movimientos nuevos arriba, conservando MAX_MOVIMIENTOS filas
+        if cambios["movimientos"]:
+            movimientos = (list(cambios["movimientos"]) + movimientos)[:MAX_MOVIMIENTOS]
+            fill_treeview(tv_mov, movimientos, tag_func=tag_mov)
+
+        if cambios["bajo_stock"] is not None:
+            pintar_bajo_stock(cambios["bajo_stock"], umbral)
+
+        lbl_last.config(text=f"Última actualización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
     def limpiar_filtros_hist():
         entry_desde.delete(0, tk.END)
         entry_hasta.delete(0, tk.END)
@@ -433,107 +595,185 @@ def ventana_reportes(master=None):
         aplicar_filtros_hist(reset_page=True)
 
     def aplicar_filtros_hist(reset_page=False):
-        nonlocal pagina_actual, total_paginas
+        nonlocal pagina_actual, hist_cursores
         if reset_page:
             pagina_actual = 1
+            hist_cursores = [None]
+        cargar_pagina_hist()
 
+    def cargar_pagina_hist():
         desde = parse_date_safe(entry_desde.get())
         hasta = parse_date_safe(entry_hasta.get())
-        cliente_q = entry_cliente.get().strip().lower()
-        texto_q = entry_buscar.get().strip().lower()
-
-        def pasa(row):
-            nombre = str(row[2]).lower()
-            cliente = str(row[6]).lower() if len(row) > 6 and row[6] else ""
-            if texto_q and texto_q not in nombre:
-                return False
-            if cliente_q and cliente_q not in cliente:
-                return False
-            if desde or hasta:
-                f = parse_date_safe(row[5])
-                if not f:
-                    return False
-                if desde and f < desde:
-                    return False
-                if hasta and f > hasta:
-                    return False
-            return True
-
-        filtradas = [r for r in ventas_hist_todas if pasa(r)]
-
         try:
             pagsize = max(1, int(spin_pagsize.get()))
         except ValueError:
             pagsize = 50
             spin_pagsize.set("50")
 
-        total_paginas = max(1, (len(filtradas) + pagsize - 1) // pagsize)
-        pagina_actual = min(max(1, pagina_actual), total_paginas)
-        ini = (pagina_actual - 1) * pagsize
-        fin = ini + pagsize
-        fill_treeview(tv_hist, filtradas[ini:fin])
-        lbl_pagina.config(text=f"Página {pagina_actual}/{total_paginas}")
+        filtros = {
+            "after": hist_cursores[-1],
+            "limit": pagsize,
+            "cliente": entry_cliente.get().strip() or None,
+            "texto": entry_buscar.get().strip() or None,
+            "desde": desde.strftime("%Y-%m-%d") if desde else None,
+            "hasta": hasta.strftime("%Y-%m-%d") if hasta else None,
+            "ascendente": hist_ascendente,
+        }
+
+        def on_error(e):
+            fill_treeview(tv_hist, [])
+            messagebox.showwarning("Historial", f"No se pudo cargar el historial de ventas:\n{e}")
+
+        run_async(
+            root, lambda: obtener_ventas_pagina(**filtros),
+            key=("reportes_hist", str(root)),
+            on_done=lambda pagina: pintar_pagina_hist(pagina, pagsize),
+            on_error=on_error,
+        )
+
+    def pintar_pagina_hist(pagina, pagsize):
+        nonlocal hist_siguiente
+        hist_siguiente = pagina["siguiente"]
+        filas = [
+            (v["id"], v["producto_id"], v["nombre_producto"], v["cantidad"], v["total"], v["fecha"], v["cliente"])
+            for v in pagina["filas"]
+        ]
+        fill_treeview(tv_hist, filas)
+        total_paginas = max(pagina_actual, (pagina["total"] + pagsize - 1) // pagsize)
+        aprox = "" if pagina["total_exacto"] else "~"
+        lbl_pagina.config(text=f"Página {pagina_actual}/{aprox}{total_paginas}")
         btn_prev.configure(state=("disabled" if pagina_actual <= 1 else "normal"))
-        btn_next.configure(state=("disabled" if pagina_actual >= total_paginas else "normal"))
+        btn_next.configure(state=("disabled" if hist_siguiente is None else "normal"))
+
+    def invertir_orden_hist():
+        nonlocal hist_ascendente
+        hist_ascendente = not hist_ascendente
+        tv_hist._orden = None  # deja de ordenar la página por otra columna
+        aplicar_filtros_hist(reset_page=True)
 
     def cambiar_pagina(delta):
         nonlocal pagina_actual
-        pagina_actual = max(1, min(pagina_actual + delta, total_paginas))
-        aplicar_filtros_hist(reset_page=False)
+        if delta > 0 and hist_siguiente is not None:
+            hist_cursores.append(hist_siguiente)
+            pagina_actual += 1
+        elif delta < 0 and len(hist_cursores) > 1:
+            hist_cursores.pop()
+            pagina_actual -= 1
+        else:
+            return
+        cargar_pagina_hist()
 
-    def cargar_bajo_stock():
+    def cargar_kardex(reset_page=False):
+        nonlocal kardex_cursores
         try:
+            producto_id = int(entry_kardex_id.get().strip())
+        except ValueError:
+            messagebox.showwarning("Kardex", "Ingrese un ID de producto válido.")
+            return
+        if reset_page:
+            kardex_cursores = [None]
+        desde = parse_date_safe(entry_kardex_desde.get())
+        hasta = parse_date_safe(entry_kardex_hasta.get())
+        filtros = {
+            "after": kardex_cursores[-1],
+            "desde": desde.strftime("%Y-%m-%d") if desde else None,
+            "hasta": hasta.strftime("%Y-%m-%d") if hasta else None,
+        }
+        run_async(
+            root, lambda: (obtener_producto_por_id(producto_id), kardex_producto(producto_id, **filtros)),
+            key=("reportes_kardex", str(root)),
+            on_done=lambda res: pintar_kardex(*res),
+            on_error=lambda e: messagebox.showwarning("Kardex", f"No se pudo cargar el kardex:\n{e}"),
+        )
+
+    def pintar_kardex(producto, kardex):
+        nonlocal kardex_siguiente
+        if kardex is None:
+            kardex_siguiente = None
+            fill_treeview(tv_kardex, [])
+            lbl_kardex.config(text="No existe un producto con ese ID.")
+        else:
+            kardex_siguiente = kardex["siguiente"]
+            fill_treeview(tv_kardex, kardex["filas"], tag_func=lambda fila: "bad" if fila[6] < 0 else None)
+            lbl_kardex.config(
+                text=f"{producto[2] if producto else ''} — stock actual {producto[5] if producto else '?'}"
+                     f" — saldo sin movimientos registrados: {kardex['saldo_inicial']}"
+            )
+        lbl_kardex_pagina.config(text=f"Página {len(kardex_cursores)}")
+        btn_kardex_prev.configure(state=("disabled" if len(kardex_cursores) <= 1 else "normal"))
+        btn_kardex_next.configure(state=("disabled" if kardex_siguiente is None else "normal"))
+
+    def cambiar_pagina_kardex(delta):
+        if delta > 0 and kardex_siguiente is not None:
+            kardex_cursores.append(kardex_siguiente)
+        elif delta < 0 and len(kardex_cursores) > 1:
+            kardex_cursores.pop()
+        else:
+            return
+        cargar_kardex()
+
+    def pintar_bajo_stock(filas, umbral):
+        def tag_stock(row):
             try:
-                umbral = int(entry_umbral.get())
-            except ValueError:
-                umbral = 5
-                entry_umbral.delete(0, tk.END)
-                entry_umbral.insert(0, "5")
-            filas = productos_bajo_stock(umbral) or []
+                stock = float(str(row[2]).replace(",", ""))
+            except Exception:
+                stock = 0
+            return "bad" if stock <= umbral else "good"
 
-            def tag_stock(row):
-                try:
-                    stock = float(str(row[2]).replace(",", ""))
-                except Exception:
-                    stock = 0
-                return "bad" if stock <= umbral else "good"
+        fill_treeview(tv_stock, filas or [], tag_func=tag_stock)
 
-            fill_treeview(tv_stock, filas, tag_func=tag_stock)
-        except Exception as e:
+    def cargar_bajo_stock():
+        umbral = leer_umbral()
+
+        def on_error(e):
             fill_treeview(tv_stock, [])
             messagebox.showwarning("Stock", f"No se pudo cargar el stock crítico:\n{e}")
 
+        run_async(
+            root, productos_bajo_stock, umbral,
+            key=("reportes_stock", str(root)),
+            on_done=lambda filas: pintar_bajo_stock(filas, umbral),
+            on_error=on_error,
+        )
+
     # --------- Reporte mensual (gráfico) ---------
-    def actualizar_anios_disponibles():
-        # Derivar años de ventas_hist_todas; fallback: año actual
-        anios = set()
-        for r in ventas_hist_todas:
-            f = parse_date_safe(r[5])
-            if f:
-                anios.add(f.year)
-        if not anios:
-            anios = {datetime.now().year}
-        valores = sorted(list(anios))
+    def actualizar_anios_disponibles(anios):
+        # Años con ventas (anios_con_ventas); fallback: año actual
+        valores = sorted(set(anios)) or [datetime.now().year]
         combo_anio["values"] = valores
         if combo_anio.get() == "" or int(combo_anio.get() or 0) not in valores:
             combo_anio.set(str(valores[-1]))
 
-    def ventas_mensuales_por_anio(anio):
-        # Retorna lista de 12 totales por mes (1..12)
-        totales = [0.0] * 12
-        for r in ventas_hist_todas:
-            f = parse_date_safe(r[5])
-            if not f or f.year != anio:
-                continue
-            try:
-                total_r = float(str(r[4]).replace(",", "")) if r[4] is not None else 0.0
-            except Exception:
-                total_r = 0.0
-            totales[f.month - 1] += total_r
-        return totales
+    def preparar_grafico():
+        # True si la figura existe (creándola la primera vez)
+        if grafico["fig"] is not None:
+            return True
+        if grafico["canvas"] is False:
+            return False
+        mpl = cargar_matplotlib()
+        if mpl is None:
+            grafico["canvas"] = False
+            ttk.Label(graf_container, text="Instala matplotlib para ver el gráfico mensual.").pack(pady=20)
+            return False
+        Figure, FigureCanvasTkAgg = mpl
+        grafico["fig"] = Figure(figsize=(8, 4), dpi=100)
+        grafico["canvas"] = FigureCanvasTkAgg(grafico["fig"], master=graf_container)
+        grafico["canvas"].get_tk_widget().pack(fill="both", expand=True)
+        return True
+
+    def on_tab_changed(_event=None):
+        if grafico["pendiente"] and notebook.select() == str(tab_mensual):
+            dibujar_grafico_mensual()
+
+    notebook.bind("<<NotebookTabChanged>>", on_tab_changed, add="+")
 
     def dibujar_grafico_mensual():
-        if not MATPLOTLIB_OK:
+        # Con la pestaña oculta solo se anota: se dibuja al mostrarla
+        if notebook.select() != str(tab_mensual):
+            grafico["pendiente"] = True
+            return
+        grafico["pendiente"] = False
+        if not preparar_grafico():
             return
         try:
             anio = int(combo_anio.get() or datetime.now().year)
@@ -546,16 +786,40 @@ def ventana_reportes(master=None):
             meta = 1000.0
             entry_meta_mensual.delete(0, tk.END)
             entry_meta_mensual.insert(0, "1000")
+        try:
+            comparar = min(5, max(0, int(spin_comparar.get())))
+        except ValueError:
+            comparar = 0
+            spin_comparar.set("0")
+
+        anios = [anio - i for i in range(comparar + 1)]
+        run_async(
+            root, ventas_mensuales, anios,
+            key=("reportes_grafico", str(root)),
+            on_done=lambda datos: pintar_grafico_mensual(anio, anios[1:], meta, datos),
+            on_error=lambda e: messagebox.showwarning("Gráfico", f"No se pudieron cargar las ventas mensuales:\n{e}"),
+        )
 
-        datos = ventas_mensuales_por_anio(anio)
+    def pintar_grafico_mensual(anio, anteriores, meta, por_anio):
+        datos = por_anio.get(anio, [0.0] * 12)
         meses = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
         colores = ["#5cb85c" if v >= meta else "#d9534f" for v in datos]
 
+        fig = grafico["fig"]
         fig.clf()
         ax = fig.add_subplot(111)
-        ax.bar(meses, datos, color=colores)
+        ax.bar(meses, datos, color=colores, label=str(anio))
         ax.axhline(meta, color="#f0ad4e", linestyle="--", linewidth=2, label=f"Umbral {meta:,.0f}")
-        ax.set_title(f"Ventas mensuales {anio}")
+        # Comparación interanual: una línea por cada año anterior
+        for i, a in enumerate(anteriores):
+            ax.plot(
+                meses, por_anio.get(a, [0.0] * 12),
+                marker="o", linewidth=1.8, alpha=max(0.35, 0.9 - 0.15 * i), label=str(a),
+            )
+        titulo = f"Ventas mensuales {anio}"
+        if anteriores:
+            titulo += " vs " + ", ".join(str(a) for a in anteriores)
+        ax.set_title(titulo)
         ax.set_ylabel("Total vendido")
         ax.legend(loc="upper left")
         ax.grid(axis="y", alpha=0.25)
@@ -563,21 +827,25 @@ def ventana_reportes(master=None):
         for i, v in enumerate(datos):
             ax.text(i, v, f"{v:,.0f}", ha="center", va="bottom", fontsize=9)
         fig.tight_layout()
-        canvas.draw_idle()
+        grafico["canvas"].draw_idle()
 
     # ------------- AUTO-REFRESH -------------
-    def tick_auto():
+    # Cada tick solo compara la marca de agua; si hubo cambios trae lo nuevo.
+    def programar_auto():
         nonlocal job_auto
-        if auto_var.get():
-            recargar_todo()
-            try:
-                intervalo = max(5, int(spin_intervalo.get()))
-            except ValueError:
-                intervalo = 30
-                spin_intervalo.set("30")
-            job_auto = root.after(intervalo * 1000, tick_auto)
-        else:
+        if not auto_var.get():
             job_auto = None
+            return
+        try:
+            intervalo = max(5, int(spin_intervalo.get()))
+        except ValueError:
+            intervalo = 30
+            spin_intervalo.set("30")
+        job_auto = root.after(intervalo * 1000, tick_auto)
+
+    def tick_auto():
+        refrescar_incremental()
+        programar_auto()
 
     def toggle_auto(*_):
         nonlocal job_auto
@@ -599,6 +867,44 @@ def ventana_reportes(master=None):
         if not curr:
             return
         tab = root.nametowidget(curr)
+        # Historial, movimientos y kardex se exportan desde la base, por lotes y en
+        # segundo plano, con los mismos filtros que la pantalla (que solo tiene una página)
+        if tab is tab_hist:
+            desde = parse_date_safe(entry_desde.get())
+            hasta = parse_date_safe(entry_hasta.get())
+            ruta = pedir_ruta_csv(root, "Exportar ventas")
+            if ruta:
+                exportar_con_progreso(
+                    root, "Exportar ventas", exportar_ventas, ruta,
+                    desde=desde.strftime("%Y-%m-%d") if desde else None,
+                    hasta=hasta.strftime("%Y-%m-%d") if hasta else None,
+                    cliente=entry_cliente.get().strip() or None,
+                    texto=entry_buscar.get().strip() or None,
+                )
+            return
+        if tab is tab_mov:
+            ruta = pedir_ruta_csv(root, "Exportar movimientos")
+            if ruta:
+                exportar_con_progreso(root, "Exportar movimientos", exportar_movimientos, ruta,
+                                      limite=MAX_MOVIMIENTOS)
+            return
+        if tab is tab_kardex:
+            try:
+                producto_id = int(entry_kardex_id.get().strip())
+            except ValueError:
+                messagebox.showwarning("Kardex", "Ingrese un ID de producto válido.")
+                return
+            desde = parse_date_safe(entry_kardex_desde.get())
+            hasta = parse_date_safe(entry_kardex_hasta.get())
+            ruta = pedir_ruta_csv(root, "Exportar kardex")
+            if ruta:
+                exportar_con_progreso(
+                    root, "Exportar kardex", exportar_movimientos, ruta,
+                    producto_id=producto_id,
+                    desde=desde.strftime("%Y-%m-%d") if desde else None,
+                    hasta=hasta.strftime("%Y-%m-%d") if hasta else None,
+                )
+            return
         tv = get_first_tree_in(tab)
         if tv:
             ask_save_csv_for_tree(tv)
@@ -607,19 +913,35 @@ def ventana_reportes(master=None):
 
     # ------------- INICIO -------------
     recargar_todo()
-    tick_auto()  # inicia auto si está activo
+    programar_auto()  # inicia auto si está activo
 
     # ------------- CIERRE -------------
     ttk.Button(root, text="Cerrar", command=lambda: on_close()).pack(pady=8)
 
-    def on_close():
+    def detener_auto(_event=None):
         nonlocal job_auto
         try:
             if job_auto is not None:
                 root.after_cancel(job_auto)
         except Exception:
             pass
-        root.destroy()
+        job_auto = None
+
+    def on_close():
+        detener_auto()
+        close_window(root)  # oculta si la administra WindowManager
+
+    def al_mostrar(_event=None):
+        # Reabierta: traer solo lo nuevo desde la última marca y reanudar el auto-refresco
+        refrescar_incremental()
+        if job_auto is None:
+            programar_auto()
+
+    # Oculta no consulta nada; el auto-refresco se pausa hasta volver a mostrarla
+    root.bind(EVENTO_OCULTA, detener_auto)
+    root.bind(EVENTO_MOSTRADA, al_mostrar)
 
     if root_created:
         root.mainloop()
+    else:
+        return root
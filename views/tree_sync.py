@@ -0,0 +1,110 @@
+"""
+Actualización por diferencias de un ttk.Treeview
+------------------------------------------------
+sync_treeview() deja la tabla mostrando `rows` en ese orden sin borrar y volver
+a insertar todo: cada fila se identifica por su clave (iid = str(clave)) y solo
+se tocan los items que cambiaron. Lo último que se pintó en cada item se guarda
+en el propio Treeview, así comparar no requiere leer de Tk.
+
+- Filas nuevas: insert. Filas que ya no están: delete.
+- Filas iguales (valores y tags, incluido el zebra): ninguna llamada a Tk.
+- Orden distinto: un solo `children` con el orden nuevo.
+
+Como los items que siguen existiendo no se recrean, se conservan la selección,
+el foco y el desplazamiento. Para cambiar un solo item de una tabla sincronizada
+usar sync_row() (no tv.item), así lo guardado sigue coincidiendo con Tk.
+"""
+from __future__ import annotations
+
+from tkinter import ttk
+from typing import Any, Callable, Hashable, Iterable, Optional, Sequence
+
+_CACHE = "_sync_pintado"
+
+
+def _cache(tv: ttk.Treeview) -> dict:
+    cache = getattr(tv, _CACHE, None)
+    if cache is None:
+        cache = {}
+        setattr(tv, _CACHE, cache)
+    return cache
+
+
+def _primera_columna(fila: Any) -> Any:
+    return fila[0]
+
+
+def sync_row(tv: ttk.Treeview, iid: str, values: Sequence[Any], tags: Optional[Sequence[str]] = None) -> bool:
+    """Actualiza un solo item si cambió. Devuelve True si hubo que tocar Tk."""
+    cache = _cache(tv)
+    previo = cache.get(iid)
+    values = tuple(values)
+    tags = tuple(tags) if tags is not None else (previo[1] if previo else ())
+    if previo == (values, tags):
+        return False
+    tv.item(iid, values=values, tags=tags)
+    cache[iid] = (values, tags)
+    return True
+
+
+def sync_treeview(
+    tv: ttk.Treeview,
+    rows: Iterable[Any],
+    key: Callable[[Any], Hashable] = _primera_columna,
+    values: Callable[[Any], Sequence[Any]] = tuple,
+    tag_func: Optional[Callable[[Any], Optional[str]]] = None,
+    zebra: bool = True,
+    parent: str = "",
+) -> dict:
+    """
+    Reconcilia los hijos de `parent` con `rows`.
+    Devuelve {"insertadas", "actualizadas", "borradas", "reordenada"} (útil para medir).
+    """
+    cache = _cache(tv)
+    actuales = tv.get_children(parent)
+    existentes = set(actuales)
+
+    orden: list[str] = []
+    insertados: list[str] = []
+    actualizadas = 0
+    for pos, fila in enumerate(rows):
+        iid = str(key(fila))
+        vals = tuple(values(fila))
+        tags = []
+        if zebra:
+            tags.append("even" if pos % 2 == 0 else "odd")
+        if tag_func:
+            extra = tag_func(fila)
+            if extra:
+                tags.append(extra)
+        tags = tuple(tags)
+
+        if iid in existentes:
+            if cache.get(iid) != (vals, tags):
+                tv.item(iid, values=vals, tags=tags)
+                actualizadas += 1
+        else:
+            tv.insert(parent, "end", iid=iid, values=vals, tags=tags)
+            existentes.add(iid)
+            insertados.append(iid)
+        cache[iid] = (vals, tags)
+        orden.append(iid)
+
+    nuevos = set(orden)
+    sobran = [iid for iid in actuales if iid not in nuevos]
+    if sobran:
+        tv.delete(*sobran)
+        for iid in sobran:
+            cache.pop(iid, None)
+
+    # Los insertados quedaron al final: si el orden no coincide, reordenar de una vez
+    reordenada = [iid for iid in actuales if iid in nuevos] + insertados != orden
+    if reordenada:
+        tv.set_children(parent, *orden)
+
+    return {
+        "insertadas": len(insertados),
+        "actualizadas": actualizadas,
+        "borradas": len(sobran),
+        "reordenada": reordenada,
+    }
@@ -27,9 +27,17 @@ import sqlite3
 # BD
 # ==========================
 try:
-    from database.db import get_connection
+    from database.executor import run_async
 except Exception as e:
-    raise RuntimeError("No se pudo importar database.db.get_connection. Verifica rutas del proyecto.") from e
+    raise RuntimeError("No se pudo importar database.executor.run_async. Verifica rutas del proyecto.") from e
+
+from models import precarga
+from models.categoria import obtener_categorias
+from models.producto import filtrar_productos, secciones_disponibles
+from models.catalogo import producto_por_id
+from models.ventas import registrar_venta_carrito
+from views.tree_sync import sync_row, sync_treeview
+from views.window_manager import EVENTO_MOSTRADA, close_window
 
 
 # ==========================
@@ -87,6 +95,55 @@ def now_iso() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+SIN_SECCION = "Sin sección"
+
+
+def consultar_productos(filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Productos para la grilla según los filtros de la barra superior.
+    Se ejecuta en el hilo de BD (no toca widgets). El filtrado y el orden los
+    hace filtrar_productos en SQL, sobre los índices de categoría y sección.
+    """
+    sec = filtros.get("seccion")
+    if not sec or sec == "Todas":
+        sec = None
+    elif sec == SIN_SECCION:
+        sec = ""  # seccion_norm vacía = sin sección
+
+    texto = filtros.get("texto") or None
+    categoria_id = filtros.get("categoria_id")
+    solo_stock = bool(filtros.get("solo_stock"))
+    rows = filtrar_productos(
+        texto=texto,
+        categoria_id=categoria_id,
+        seccion=sec,
+        solo_con_stock=solo_stock,
+        orden="nombre",
+    )
+    if texto is None and categoria_id is None and sec is None and not solo_stock:
+        # Catálogo completo: queda como precarga para la próxima apertura
+        precarga.guardar(productos=rows[:precarga.MAX_PRODUCTOS], total=len(rows))
+    return [fila_a_dict(r) for r in rows]
+
+
+def fila_a_dict(r) -> Dict[str, Any]:
+    """Fila de filtrar_productos -> dict de la grilla."""
+    return {
+        "id": int(r[0]),
+        "nombre": r[2] or "",
+        "sku": r[1] or "",
+        "stock": int(r[5] or 0),
+        "precio_venta": float(r[3] or 0.0),
+        "seccion": r[11] or SIN_SECCION,
+        "categoria": r[8] or "Sin categoría",
+    }
+
+
+def consultar_fuentes_filtros() -> tuple:
+    """(categorías, secciones) para los combos de filtros (hilo de BD)."""
+    return obtener_categorias(), secciones_disponibles()
+
+
 # ==========================
 # Vista
 # ==========================
@@ -133,6 +190,9 @@ class SalesView:
 
         self._init_style()
         self._build_ui()
+        # Con precarga la grilla y los combos se llenan al instante; los datos
+        # frescos llegan después y se aplican por diferencias
+        self._pintar_precarga()
         self._load_filters_sources()
         self.aplicar_filtro()
 
@@ -142,6 +202,8 @@ class SalesView:
         # Cierre controlado
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.root.bind("<Destroy>", self._on_destroy)
+        # Reabierta por WindowManager: carrito intacto, stocks y filtros al día
+        self.root.bind(EVENTO_MOSTRADA, self._on_shown)
 
     # ----------------------
     # Estilos
@@ -373,106 +435,70 @@ class SalesView:
     # ==========================
     # Datos
     # ==========================
+    def _pintar_precarga(self):
+        datos = precarga.datos()
+        if datos is None:
+            return
+        self._aplicar_fuentes_filtros((datos["categorias"], datos["secciones"]))
+        self._set_rows([fila_a_dict(r) for r in datos["productos"]])
+
     def _load_filters_sources(self):
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
-
-            # Secciones
-            cur.execute("SELECT DISTINCT COALESCE(NULLIF(TRIM(seccion), ''), 'Sin sección') as s FROM productos ORDER BY 1")
-            secciones = [r[0] for r in cur.fetchall()] or ["Sin sección"]
-            secciones = ["Todas"] + secciones
-            self.cbo_seccion["values"] = secciones
-            if self.filtro_seccion_var.get() not in secciones:
-                self.filtro_seccion_var.set("Todas")
-
-            # Categorías
-            cur.execute("SELECT id, nombre FROM categorias ORDER BY nombre")
-            cats = cur.fetchall()
-            self._categorias_idx: Dict[str, Optional[int]] = {"Todas": None}
-            for cid, nom in cats:
-                self._categorias_idx[str(nom)] = int(cid)
-            self.cbo_categoria["values"] = list(self._categorias_idx.keys())
-            if self.filtro_categoria_var.get() not in self._categorias_idx:
-                self.filtro_categoria_var.set("Todas")
-        except Exception as e:
-            messagebox.showerror("Filtros", f"No se pudo cargar filtros:\n{e}")
-        finally:
-            try:
-                conn.close()
-            except Exception:
-                pass
+        run_async(
+            self.root, consultar_fuentes_filtros,
+            key=(id(self), "filtros"),
+            on_done=self._aplicar_fuentes_filtros,
+            on_error=lambda e: messagebox.showerror("Filtros", f"No se pudo cargar filtros:\n{e}"),
+        )
+
+    def _aplicar_fuentes_filtros(self, fuentes):
+        categorias, secciones_bd = fuentes
+        precarga.guardar(categorias=categorias, secciones=secciones_bd)
+
+        # Secciones (recorrido solo del índice de secciones)
+        secciones = [sec or SIN_SECCION for sec in secciones_bd] or [SIN_SECCION]
+        secciones = ["Todas"] + list(dict.fromkeys(secciones))
+        self.cbo_seccion["values"] = secciones
+        if self.filtro_seccion_var.get() not in secciones:
+            self.filtro_seccion_var.set("Todas")
+
+        # Categorías
+        self._categorias_idx: Dict[str, Optional[int]] = {"Todas": None}
+        for cid, nom in categorias:
+            self._categorias_idx[str(nom)] = int(cid)
+        self.cbo_categoria["values"] = list(self._categorias_idx.keys())
+        if self.filtro_categoria_var.get() not in self._categorias_idx:
+            self.filtro_categoria_var.set("Todas")
 
     def aplicar_filtro(self):
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
-
-            q = [
-                "SELECT p.id, p.nombre, p.sku, p.stock, p.precio_venta,",
-                "       COALESCE(NULLIF(TRIM(p.seccion), ''), 'Sin sección') as seccion,",
-                "       COALESCE(c.nombre, 'Sin categoría') as categoria",
-                "FROM productos p",
-                "LEFT JOIN categorias c ON p.categoria_id = c.id",
-                "WHERE 1=1",
-            ]
-            params: List[Any] = []
-
-            txt = self.filtro_texto_var.get().strip()
-            if txt:
-                q.append("AND (p.nombre LIKE ? OR p.sku LIKE ?)")
-                like = f"%{txt}%"
-                params.extend([like, like])
-
-            sec = self.filtro_seccion_var.get()
-            if sec and sec not in ("Todas",):
-                if sec == "Sin sección":
-                    q.append("AND (p.seccion IS NULL OR TRIM(p.seccion) = '')")
-                else:
-                    q.append("AND p.seccion = ?")
-                    params.append(sec)
-
-            cat_nom = self.filtro_categoria_var.get()
-            if cat_nom and cat_nom != "Todas":
-                cat_id = self._categorias_idx.get(cat_nom)
-                if cat_id is not None:
-                    q.append("AND p.categoria_id = ?")
-                    params.append(cat_id)
-
-            if self.filtro_existencia_var.get():
-                q.append("AND p.stock > 0")
-
-            q.append("ORDER BY p.nombre COLLATE NOCASE")
-            sql = "\n".join(q)
-            cur.execute(sql, params)
-            rows = cur.fetchall()
-
-            self._rows.clear()
-            self._by_id.clear()
-            self._selected_ids.clear()
-
-            for r in rows:
-                d = {
-                    "id": int(r[0]),
-                    "nombre": r[1] or "",
-                    "sku": r[2] or "",
-                    "stock": int(r[3] or 0),
-                    "precio_venta": float(r[4] or 0.0),
-                    "seccion": r[5] or "Sin sección",
-                    "categoria": r[6] or "Sin categoría",
-                }
-                self._rows.append(d)
-                self._by_id[d["id"]] = d
-
-            self._refresh_tree()
-            self._update_detail_from_selection()
-        except Exception as e:
-            messagebox.showerror("Productos", f"No se pudieron cargar los productos:\n{e}")
-        finally:
-            try:
-                conn.close()
-            except Exception:
-                pass
+        # Los Tk vars se leen aquí (hilo de la UI); la consulta corre en segundo plano
+        cat_id = None
+        cat_nom = self.filtro_categoria_var.get()
+        if cat_nom and cat_nom != "Todas":
+            cat_id = getattr(self, "_categorias_idx", {}).get(cat_nom)
+        filtros = {
+            "texto": self.filtro_texto_var.get().strip(),
+            "seccion": self.filtro_seccion_var.get(),
+            "categoria_id": cat_id,
+            "solo_stock": bool(self.filtro_existencia_var.get()),
+        }
+        run_async(
+            self.root, consultar_productos, filtros,
+            key=(id(self), "productos"),
+            on_done=self._set_rows,
+            on_error=lambda e: messagebox.showerror("Productos", f"No se pudieron cargar los productos:\n{e}"),
+        )
+
+    def _set_rows(self, rows: List[Dict[str, Any]]):
+        self._rows.clear()
+        self._by_id.clear()
+        self._selected_ids.clear()
+
+        for d in rows:
+            self._rows.append(d)
+            self._by_id[d["id"]] = d
+
+        self._refresh_tree()
+        self._update_detail_from_selection()
 
     def _clear_filters(self):
         self.filtro_texto_var.set("")
@@ -484,21 +510,21 @@ class SalesView:
     # ==========================
     # Grilla
     # ==========================
+    def _tree_values(self, d: Dict[str, Any]) -> tuple:
+        return (
+            "✓" if self._selected_ids.get(d["id"]) else "",
+            d["id"],
+            d["nombre"],
+            d["sku"],
+            d["stock"],
+            money(d["precio_venta"]),
+            d["seccion"],
+            d["categoria"],
+        )
+
     def _refresh_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        for d in self._rows:
-            sel = "✓" if self._selected_ids.get(d["id"]) else ""
-            values = [
-                sel,
-                d["id"],
-                d["nombre"],
-                d["sku"],
-                d["stock"],
-                money(d["precio_venta"]),
-                d["seccion"],
-                d["categoria"],
-            ]
-            self.tree.insert("", "end", iid=str(d["id"]), values=values)
+        # Por diferencias: solo se tocan las filas que cambiaron (iid = id de producto)
+        sync_treeview(self.tree, self._rows, key=lambda d: d["id"], values=self._tree_values, zebra=False)
 
     def _on_tree_select(self, _=None):
         self._update_detail_from_selection()
@@ -515,7 +541,9 @@ class SalesView:
             return
         pid = int(row_id)
         self._selected_ids[pid] = not self._selected_ids.get(pid, False)
-        self._refresh_tree()
+        d = self._by_id.get(pid)
+        if d is not None:
+            sync_row(self.tree, row_id, self._tree_values(d))
 
     def _on_tree_double_click(self, _):
         sel = self.tree.selection()
@@ -559,6 +587,15 @@ class SalesView:
         d = self._by_id.get(producto_id)
         if not d:
             return
+        # Stock y precio al día desde la caché del catálogo (sin disco si no hubo cambios)
+        actual = producto_por_id(producto_id)
+        if actual is None:
+            messagebox.showwarning("Producto", "El producto ya no existe.")
+            return
+        d.update(nombre=actual[2], precio_venta=actual[3], stock=int(actual[5] or 0))
+        # La grilla y el detalle muestran lo mismo que validó el carrito
+        if sync_row(self.tree, str(producto_id), self._tree_values(d)):
+            self._update_detail_from_selection()
         if d["stock"] <= 0 and cantidad > 0:
             messagebox.showwarning("Stock", f"El producto '{d['nombre']}' no tiene stock disponible.")
             return
@@ -609,16 +646,18 @@ class SalesView:
         self._cart_add(pid, delta)
 
     def _cart_refresh(self):
-        self.cart.delete(*self.cart.get_children())
-        for item in self._cart.values():
-            subtotal = item["cantidad"] * item["precio"]
-            self.cart.insert("", "end", values=[
+        # +/- en una línea cambia solo ese item del Treeview
+        sync_treeview(
+            self.cart, self._cart.values(), key=lambda item: item["id"],
+            values=lambda item: (
                 item["id"],
                 item["nombre"],
                 item["cantidad"],
                 money(item["precio"]),
-                money(subtotal),
-            ])
+                money(item["cantidad"] * item["precio"]),
+            ),
+            zebra=False,
+        )
         self._recalc_totals()
 
     # ==========================
@@ -663,7 +702,6 @@ class SalesView:
             return
 
         cliente = self.cliente_var.get().strip() or "Consumidor Final"
-        fecha = now_date()
 
         # Calcular totales finales por si no están frescos
         self._recalc_totals()
@@ -673,51 +711,11 @@ class SalesView:
             total_final = 0.0
 
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-
-            # Validación de stock en BD
-            for pid, item in self._cart.items():
-                cur.execute("SELECT stock, nombre FROM productos WHERE id=?", (pid,))
-                row = cur.fetchone()
-                if not row:
-                    raise RuntimeError(f"Producto id={pid} no existe.")
-                stock_actual = int(row[0] or 0)
-                nombre = row[1]
-                if item["cantidad"] > stock_actual:
-                    raise RuntimeError(f"Stock insuficiente para '{nombre}'. Disponible: {stock_actual}")
-
-            # Registrar cada ítem como una línea de venta (manteniendo tu esquema)
-            for pid, item in self._cart.items():
-                line_total = item["cantidad"] * item["precio"]
-                # Proporción del total_final (por si hubo desc/IVA) —
-                # guardamos el total de la línea sin prorratear para mantenerlo simple y
-                # el total_final queda como referencia en la última línea (o podríamos ignorarlo).
-                cur.execute(
-                    "INSERT INTO ventas (producto_id, cantidad, total, fecha, cliente) VALUES (?,?,?,?,?)",
-                    (pid, item["cantidad"], line_total, fecha, cliente),
-                )
-                # Movimiento de stock (salida)
-                cur.execute(
-                    "INSERT INTO movimientos_stock (producto_id, cantidad, tipo, motivo, fecha) VALUES (?,?,?,?,?)",
-                    (pid, item["cantidad"], "salida", "venta", fecha),
-                )
-                # Descontar stock
-                cur.execute("UPDATE productos SET stock = stock - ? WHERE id = ?", (item["cantidad"], pid))
-
-            conn.commit()
+            # Una sola transacción: valida y descuenta stock de todo el carrito
+            registrar_venta_carrito(self._cart, cliente=cliente)
         except Exception as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
             messagebox.showerror("Venta", f"No se pudo registrar la venta:\n{e}")
             return
-        finally:
-            try:
-                conn.close()
-            except Exception:
-                pass
 
         messagebox.showinfo("Venta", f"Venta registrada. Total: ${money(total_final)}")
         self._cart.clear()
@@ -734,10 +732,14 @@ class SalesView:
                     self.root.grab_release()
                 except Exception:
                     pass
-            self.root.destroy()
+            close_window(self.root)  # oculta si la administra WindowManager
         except Exception:
             pass
 
+    def _on_shown(self, _=None):
+        self._load_filters_sources()
+        self.aplicar_filtro()
+
     def _on_destroy(self, event):
         # cuando la ventana principal de la vista muere, liberar singleton
         if event.widget is self.root:
@@ -767,6 +769,7 @@ def set_instance(v: Optional[SalesView]):
 
 
 def ventana_ventas(owner: Optional[tk.Misc] = None):
+    """Abre (o trae al frente) la ventana de ventas y devuelve su Toplevel."""
     inst = get_instance()
     if inst is not None:
         try:
@@ -774,11 +777,12 @@ def ventana_ventas(owner: Optional[tk.Misc] = None):
                 inst.root.deiconify()
                 inst.root.lift()
                 inst.root.focus_force()
-                return
+                return inst.root
         except Exception:
             pass
     inst = SalesView(owner)
     set_instance(inst)
+    return inst.root
 
 
 if __name__ == "__main__":
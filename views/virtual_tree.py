@@ -0,0 +1,541 @@
+"""
+Treeview virtual
+----------------
+ttk.Treeview que solo crea items para las filas visibles. Las filas viven en
+una fuente de datos y, al desplazarse, se reescriben los valores de esos mismos
+items: una tabla de 100.000 filas cuesta lo mismo de pintar que una de 30.
+
+- ListSource: filas ya consultadas, en memoria (ordenar = list.sort).
+- PagedSource: páginas leídas bajo demanda en el hilo de BD (run_async); solo
+  guarda las páginas alrededor de la ventana visible.
+
+La barra de desplazamiento, la rueda del mouse y las flechas / RePág / AvPág /
+Inicio / Fin mueven un desplazamiento virtual. La selección se recuerda por
+clave de fila (p. ej. el id del producto), así sobrevive al desplazamiento y
+al reordenar.
+"""
+from __future__ import annotations
+
+import logging
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+from typing import Any, Callable, Hashable, Iterable, Iterator, Optional, Sequence
+
+from database.executor import run_async
+from views.tree_sync import sync_row
+
+logger = logging.getLogger(__name__)
+
+_SIN_SELECCION = object()
+
+
+def _primera_columna(fila: Any) -> Any:
+    return fila[0]
+
+
+def valor_orden(columna: str, valor: Any) -> tuple:
+    """
+    Clave de orden genérica para valores ya tipados (los de la fila, no el texto
+    mostrado): números antes que textos y vacíos al final, siempre comparables.
+    No interpreta textos: las fechas ISO ya ordenan bien como texto.
+    """
+    if valor is None:
+        return (2, 0.0, "")
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (0, float(valor), "")
+    return (1, 0.0, str(valor).casefold())
+
+
+# ============================
+# === FUENTES DE DATOS      ==
+# ============================
+class ListSource:
+    """Filas en memoria. `key(fila)` identifica cada fila (por defecto, la primera columna)."""
+
+    def __init__(self, rows: Iterable[Any] = (), key: Optional[Callable[[Any], Hashable]] = None):
+        self._rows = list(rows)
+        self._key = key or _primera_columna
+        self._posiciones: Optional[dict] = None  # clave -> índice, se arma al primer uso
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._rows)
+
+    def key(self, row: Any) -> Hashable:
+        return self._key(row)
+
+    def rows(self, start: int, stop: int) -> list:
+        return self._rows[start:stop]
+
+    def index_of(self, key: Hashable) -> Optional[int]:
+        if self._posiciones is None:
+            self._posiciones = {self._key(r): i for i, r in enumerate(self._rows)}
+        return self._posiciones.get(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        i = self.index_of(key)
+        return None if i is None else self._rows[i]
+
+    def sort(self, column: str, descending: bool, key: Callable[[Any], Any]) -> None:
+        self._rows.sort(key=key, reverse=descending)
+        self._posiciones = None
+
+    def upsert(self, rows: Iterable[Any]) -> None:
+        """Reemplaza las filas con la misma clave y agrega al final las nuevas."""
+        for fila in rows:
+            i = self.index_of(self._key(fila))
+            if i is None:
+                self._posiciones[self._key(fila)] = len(self._rows)
+                self._rows.append(fila)
+            else:
+                self._rows[i] = fila
+
+    def remove(self, keys: Iterable[Hashable]) -> None:
+        quitar = set(keys)
+        if quitar:
+            self._rows = [r for r in self._rows if self._key(r) not in quitar]
+            self._posiciones = None
+
+
+class PagedSource:
+    """
+    Filas leídas por páginas: fetch(offset, limit, order) -> filas, en el hilo
+    de BD. `order` es None o (columna, descendente) y lo interpreta fetch (ORDER BY).
+    `total` es la cantidad de filas (normalmente un COUNT hecho junto con la
+    primera consulta). Mientras una página no llega, sus filas valen None.
+    `initial`: primeras filas ya conocidas en el orden `order` (None = el orden
+    por defecto de fetch), p. ej. leídas junto con el COUNT o precargadas;
+    llenan las primeras páginas sin ir a la base.
+    `filters`: los filtros con los que consulta fetch, para quien necesite
+    repetir la misma consulta (p. ej. exportar desde la base).
+    Si una página llega corta (se borraron filas después del COUNT), el total
+    se recorta: esas filas no quedan en blanco esperando una lectura.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[int, int, Optional[tuple]], Sequence[Any]],
+        total: int,
+        key: Optional[Callable[[Any], Hashable]] = None,
+        page_size: int = 200,
+        max_pages: int = 8,
+        initial: Sequence[Any] = (),
+        order: Optional[tuple] = None,
+        filters: Optional[dict] = None,
+    ):
+        self._fetch = fetch
+        self.filters = filters
+        self._total = max(0, int(total))
+        self._key = key or _primera_columna
+        self.page_size = max(1, int(page_size))
+        self.max_pages = max(2, int(max_pages))
+        self._pages: "OrderedDict[int, list]" = OrderedDict()  # LRU de páginas
+        self._order: Optional[tuple] = order
+        self._pedido: Optional[tuple] = None  # (orden, primera, última) en curso
+        self._widget: Optional[tk.Misc] = None
+        self._on_loaded: Optional[Callable[[], None]] = None
+        for p in range(min(self.max_pages, -(-min(len(initial), self._total) // self.page_size))):
+            pagina = list(initial[p * self.page_size:(p + 1) * self.page_size])
+            # Una página incompleta solo sirve si es la última
+            if len(pagina) == self.page_size or p * self.page_size + len(pagina) >= self._total:
+                self._pages[p] = pagina
+
+    def attach(self, widget: tk.Misc, on_loaded: Callable[[], None]) -> None:
+        """Lo llama VirtualTreeview: a quién avisar cuando llega una página."""
+        self._widget = widget
+        self._on_loaded = on_loaded
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __iter__(self) -> Iterator[Any]:
+        # Recorrido completo (exportar): lectura síncrona, página por página
+        for offset in range(0, self._total, self.page_size):
+            yield from self._fetch(offset, self.page_size, self._order)
+
+    def key(self, row: Any) -> Hashable:
+        return self._key(row)
+
+    def _completa(self, p: int) -> bool:
+        # Una página corta que no es la última tiene huecos: hay que releerla
+        pagina = self._pages.get(p)
+        return pagina is not None and (
+            len(pagina) == self.page_size or p * self.page_size + len(pagina) >= self._total
+        )
+
+    def rows(self, start: int, stop: int) -> list:
+        stop = min(stop, self._total)
+        if start >= stop:
+            return []
+        primera, ultima = start // self.page_size, (stop - 1) // self.page_size
+        faltan = [p for p in range(primera, ultima + 1) if not self._completa(p)]
+        if faltan:
+            self._pedir(faltan[0], faltan[-1])
+        filas = []
+        for p in range(primera, ultima + 1):
+            pagina = self._pages.get(p)
+            if pagina is not None:
+                self._pages.move_to_end(p)
+            base = p * self.page_size
+            for i in range(max(start, base), min(stop, base + self.page_size)):
+                j = i - base
+                filas.append(pagina[j] if pagina is not None and j < len(pagina) else None)
+        return filas
+
+    def _pedir(self, primera: int, ultima: int) -> None:
+        pedido = (self._order, primera, ultima)
+        if self._widget is None or pedido == self._pedido:
+            return
+        self._pedido = pedido
+        orden = self._order
+        offset = primera * self.page_size
+        limite = (ultima - primera + 1) * self.page_size
+
+        def on_done(filas):
+            if orden != self._order:
+                return  # llegó tarde: ya se reordenó
+            self._pedido = None
+            filas = list(filas)
+            if len(filas) < limite and offset + len(filas) < self._total:
+                # Menos filas que las contadas: la tabla se achicó desde el COUNT
+                self._total = offset + len(filas)
+                for p in [p for p in self._pages if p * self.page_size >= self._total]:
+                    del self._pages[p]
+            for n, p in enumerate(range(primera, ultima + 1)):
+                if n and p * self.page_size >= self._total:
+                    break
+                self._pages[p] = filas[n * self.page_size:(n + 1) * self.page_size]
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+            if self._on_loaded:
+                self._on_loaded()
+
+        def on_error(e):
+            self._pedido = None
+            logger.warning("No se pudieron leer las filas %d-%d: %s", offset, offset + limite, e)
+
+        # Una sola clave por fuente: al desplazarse rápido solo se lee la última ventana
+        run_async(
+            self._widget, self._fetch, offset, limite, orden,
+            key=("virtual_tree", id(self)), on_done=on_done, on_error=on_error,
+        )
+
+    def index_of(self, key: Hashable) -> Optional[int]:
+        for p, pagina in self._pages.items():
+            for j, fila in enumerate(pagina):
+                if self._key(fila) == key:
+                    return p * self.page_size + j
+        return None
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        i = self.index_of(key)
+        return None if i is None else self.rows(i, i + 1)[0]
+
+    def sort(self, column: str, descending: bool, key: Callable[[Any], Any]) -> None:
+        # El orden lo aplica fetch en la base; `key` (orden en Python) no se usa
+        if (column, descending) == self._order:
+            return  # las páginas ya están en este orden
+        self._order = (column, descending)
+        self._pages.clear()
+        self._pedido = None
+
+
+# ============================
+# === WIDGET                ==
+# ============================
+class VirtualTreeview(ttk.Treeview):
+    """
+    ttk.Treeview con filas virtuales. Se usa como un Treeview normal para
+    columnas, encabezados, tags y bindings; las filas se cargan con
+    set_rows() / set_source() y no con insert().
+
+    formatter(fila) -> valores de las columnas; tag_func(fila) -> tag extra o None.
+    Al ordenar una ListSource se usa el valor tipado de la fila, no el texto:
+    sort_fields[columna](fila) si está, la columna de la fila si no hay
+    formatter, y recién si no el valor formateado. sort_value(columna, valor)
+    convierte ese valor en clave (por defecto valor_orden). Una PagedSource
+    ordena en la base.
+    """
+
+    def __init__(
+        self,
+        master: Optional[tk.Misc] = None,
+        source: Any = None,
+        formatter: Optional[Callable[[Any], Sequence[Any]]] = None,
+        tag_func: Optional[Callable[[Any], Optional[str]]] = None,
+        sort_value: Optional[Callable[[str, Any], Any]] = None,
+        sort_fields: Optional[dict] = None,
+        **kw: Any,
+    ):
+        self._yscroll = kw.pop("yscrollcommand", None) or kw.pop("yscroll", None)
+        super().__init__(master, **kw)
+        self.formatter = formatter or tuple
+        self.sort_fields = dict(sort_fields or {})
+        self.tag_func = tag_func
+        self.sort_value = sort_value or valor_orden
+        self._source: Any = ListSource()
+        self._top = 0                       # índice de la primera fila visible
+        self._items: list[str] = []         # items reutilizados, uno por fila visible
+        self._selected = _SIN_SELECCION     # clave de la fila seleccionada
+        self._sort: Optional[tuple] = None  # (columna, descendente)
+        self._header: Optional[int] = None  # alto del encabezado, medido al pintar
+        try:
+            self._visible = max(1, int(self.cget("height")))
+        except (tk.TclError, ValueError):
+            self._visible = 10
+
+        self.bind("<Configure>", self._on_configure, add="+")
+        self.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.bind("<MouseWheel>", self._on_wheel)
+        self.bind("<Button-4>", lambda e: self._scroll(-3))
+        self.bind("<Button-5>", lambda e: self._scroll(3))
+        for secuencia in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.bind(secuencia, self._on_key)
+        if source is not None:
+            self.set_source(source)
+
+    # ----------------------
+    # Datos
+    # ----------------------
+    @property
+    def source(self) -> Any:
+        return self._source
+
+    def set_source(self, source: Any, keep_position: bool = False) -> None:
+        """Cambia la fuente de filas; aplica el orden vigente si lo hay."""
+        self._source = source
+        if hasattr(source, "attach"):
+            source.attach(self, self.refresh)
+        if self._sort is not None:
+            self._ordenar_fuente()
+        if not keep_position:
+            self._top = 0
+        self.refresh()
+
+    def set_rows(self, rows: Iterable[Any], key: Optional[Callable[[Any], Hashable]] = None,
+                 keep_position: bool = False) -> None:
+        """Atajo: set_source(ListSource(rows)) conservando la función de clave actual."""
+        if key is None and isinstance(self._source, ListSource):
+            key = self._source._key
+        self.set_source(ListSource(rows, key), keep_position=keep_position)
+
+    def row_count(self) -> int:
+        return len(self._source)
+
+    def iter_rows(self) -> Iterator[Any]:
+        """Todas las filas en el orden mostrado (no solo las visibles)."""
+        return iter(self._source)
+
+    def iter_values(self) -> Iterator[Sequence[Any]]:
+        """Valores formateados de todas las filas, p. ej. para exportar."""
+        for fila in self._source:
+            yield self.formatter(fila)
+
+    # ----------------------
+    # Orden
+    # ----------------------
+    @property
+    def sort_order(self) -> Optional[tuple]:
+        """(columna, descendente) vigente, o None si no se ordenó por columna."""
+        return self._sort
+
+    def sort_by(self, column: str, descending: Optional[bool] = None) -> None:
+        """Ordena por `column`; sin `descending`, alterna con cada llamada."""
+        if descending is None:
+            descending = bool(self._sort and self._sort[0] == column and not self._sort[1])
+        self._sort = (column, descending)
+        self._ordenar_fuente()
+        self.refresh()
+
+    def _ordenar_fuente(self) -> None:
+        column, descending = self._sort
+        sort_value = self.sort_value
+        campo = self.sort_fields.get(column)
+        if campo is None:
+            i = list(self["columns"]).index(column)
+            formatter = None if self.formatter is tuple else self.formatter
+
+            def campo(fila: Any) -> Any:
+                return (formatter(fila) if formatter else fila)[i]
+        self._source.sort(column, descending, key=lambda fila: sort_value(column, campo(fila)))
+
+    # ----------------------
+    # Selección
+    # ----------------------
+    def selected_key(self) -> Optional[Hashable]:
+        return None if self._selected is _SIN_SELECCION else self._selected
+
+    def selected_row(self) -> Optional[Any]:
+        """Fila seleccionada aunque esté fuera de la ventana visible."""
+        if self._selected is _SIN_SELECCION:
+            return None
+        for fila in self._source.rows(self._top, self._top + len(self._items)):
+            if fila is not None and self._source.key(fila) == self._selected:
+                return fila
+        return self._source.get(self._selected)
+
+    def select_index(self, index: int) -> None:
+        """Selecciona la fila `index` (de la fuente completa) y la hace visible."""
+        total = len(self._source)
+        if not total:
+            return
+        index = max(0, min(index, total - 1))
+        self.see_index(index)
+        fila = self._source.rows(index, index + 1)[0]
+        if fila is not None:
+            self._selected = self._source.key(fila)
+        iid = self._items[index - self._top]
+        self.selection_set(iid)
+        self.focus(iid)
+
+    def see_index(self, index: int) -> None:
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + self._visible:
+            self._top = index - self._visible + 1
+        else:
+            return
+        self.refresh()
+
+    def _on_select(self, _event: Any = None) -> None:
+        seleccion = self.selection()
+        if not seleccion or seleccion[0] not in self._items:
+            return  # deseleccionado al pintar: se conserva la clave
+        i = self._top + self._items.index(seleccion[0])
+        fila = self._source.rows(i, i + 1)
+        if fila and fila[0] is not None:
+            self._selected = self._source.key(fila[0])
+
+    def _indice_seleccionado(self) -> Optional[int]:
+        seleccion = self.selection()
+        if seleccion and seleccion[0] in self._items:
+            return self._top + self._items.index(seleccion[0])
+        if self._selected is not _SIN_SELECCION:
+            return self._source.index_of(self._selected)
+        return None
+
+    # ----------------------
+    # Pintado
+    # ----------------------
+    def refresh(self) -> None:
+        """Vuelve a pintar la ventana visible (tras cambiar la fuente)."""
+        total = len(self._source)
+        self._top = max(0, min(self._top, total - self._visible))
+        filas = self._source.rows(self._top, self._top + self._visible)
+
+        while len(self._items) < len(filas):
+            self._items.append(super().insert("", tk.END))
+        if len(self._items) > len(filas):
+            super().delete(*self._items[len(filas):])
+            del self._items[len(filas):]
+
+        elegido = None
+        for n, (iid, fila) in enumerate(zip(self._items, filas)):
+            if fila is None:
+                sync_row(self, iid, (), ())  # página aún en camino
+                continue
+            tags = ["even" if (self._top + n) % 2 == 0 else "odd"]
+            if self.tag_func:
+                extra = self.tag_func(fila)
+                if extra:
+                    tags.append(extra)
+            # Solo se escribe en Tk si la fila de ese item cambió
+            sync_row(self, iid, self.formatter(fila), tags)
+            if elegido is None and self._selected is not _SIN_SELECCION and self._source.key(fila) == self._selected:
+                elegido = iid
+
+        actual = self.selection()
+        if elegido is not None:
+            if actual != (elegido,):
+                self.selection_set(elegido)
+            self.focus(elegido)
+        elif actual:
+            self.selection_remove(*actual)
+
+        # El Treeview real nunca se desplaza: todas sus filas caben
+        ttk.Treeview.yview(self, "moveto", 0)
+        if self._header is None and self._items:
+            caja = self.bbox(self._items[0])
+            if caja:
+                # Primera medición real del encabezado: recalcular cuántas filas caben
+                self._header = caja[1]
+                self.after_idle(self._on_configure)
+        if self._yscroll:
+            self._yscroll(*self.yview())
+
+    def _row_height(self) -> int:
+        try:
+            return int(ttk.Style(self).lookup(self.cget("style") or "Treeview", "rowheight")) or 20
+        except (tk.TclError, TypeError, ValueError):
+            return 20
+
+    def _on_configure(self, _event: Any = None) -> None:
+        alto_fila = self._row_height()
+        encabezado = self._header if self._header is not None else alto_fila
+        visibles = max(1, (self.winfo_height() - encabezado) // alto_fila)
+        if visibles != self._visible:
+            self._visible = visibles
+            self.refresh()
+
+    # ----------------------
+    # Desplazamiento
+    # ----------------------
+    def yview(self, *args: Any) -> Any:
+        """Misma interfaz que Treeview.yview, sobre las filas virtuales."""
+        total = len(self._source)
+        if not args:
+            if not total:
+                return (0.0, 1.0)
+            return (self._top / total, min(1.0, (self._top + self._visible) / total))
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            paso = self._visible if len(args) > 2 and str(args[2]).startswith("page") else 1
+            self._top += int(args[1]) * paso
+        self.refresh()
+        return None
+
+    def configure(self, cnf: Any = None, **kw: Any) -> Any:
+        # yscrollcommand lo maneja el widget: Tk solo conoce el Treeview real
+        if isinstance(cnf, dict):
+            kw = {**cnf, **kw}
+            cnf = None
+        if cnf is None:
+            for opcion in ("yscrollcommand", "yscroll"):
+                if opcion in kw:
+                    self._yscroll = kw.pop(opcion)
+                    if not kw:
+                        self.refresh()
+                        return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def _scroll(self, filas: int) -> str:
+        self.yview("scroll", filas, "units")
+        return "break"
+
+    def _on_wheel(self, event: Any) -> str:
+        # Windows: múltiplos de 120; macOS: valores chicos
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll(-3 * delta if delta else 0)
+
+    def _on_key(self, event: Any) -> str:
+        total = len(self._source)
+        if not total:
+            return "break"
+        actual = self._indice_seleccionado()
+        if event.keysym == "Home":
+            nuevo = 0
+        elif event.keysym == "End":
+            nuevo = total - 1
+        elif actual is None:
+            nuevo = self._top
+        else:
+            paso = {"Up": -1, "Down": 1, "Prior": -self._visible, "Next": self._visible}[event.keysym]
+            nuevo = actual + paso
+        self.select_index(nuevo)
+        return "break"
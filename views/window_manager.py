@@ -0,0 +1,103 @@
+"""
+Ventanas reutilizables
+----------------------
+WindowManager construye cada ventana de módulo (Productos, Ventas, Reportes)
+una sola vez. Cerrarla la oculta (withdraw) y volver a abrirla la muestra tal
+como quedó: sin reconstruir cientos de widgets, estilos ni la figura de
+matplotlib.
+
+Al volver a mostrarla se genera <<VentanaMostrada>> sobre la ventana, y al
+ocultarla <<VentanaOculta>>. Cada vista los enlaza para refrescar solo lo que
+cambió (consultas incrementales) y para pausar trabajo periódico mientras no
+se ve.
+
+Las vistas cierran con close_window(win), no con win.destroy(): si la ventana
+está administrada se oculta, si no (p. ej. abierta sola) se destruye.
+"""
+from __future__ import annotations
+
+import logging
+import tkinter as tk
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EVENTO_MOSTRADA = "<<VentanaMostrada>>"
+EVENTO_OCULTA = "<<VentanaOculta>>"
+
+
+def _existe(win: tk.Misc) -> bool:
+    try:
+        return bool(win.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+def close_window(win: tk.Misc) -> None:
+    """Cierra una ventana de vista: la oculta si la administra un WindowManager."""
+    gestor: Optional[WindowManager] = getattr(win, "_window_manager", None)
+    if gestor is not None and _existe(win):
+        gestor.hide(win)
+    elif _existe(win):
+        win.destroy()
+
+
+class WindowManager:
+    def __init__(self, master: tk.Misc):
+        self._master = master
+        self._ventanas: Dict[str, tk.Toplevel] = {}
+
+    def open(self, name: str, factory: Callable[[tk.Misc], Optional[tk.Toplevel]]) -> Optional[tk.Toplevel]:
+        """
+        Muestra la ventana `name`; la primera vez (o si se destruyó) la crea
+        con factory(master), que debe devolver el Toplevel de la vista.
+        """
+        win = self._ventanas.get(name)
+        if win is not None and _existe(win):
+            self.show(win)
+            return win
+
+        win = factory(self._master)
+        if win is None:
+            return None  # la vista no devolvió su ventana: queda sin administrar
+        self._ventanas[name] = win
+        win._window_manager = self
+        # Las vistas que toman el foco exclusivo al abrirse lo vuelven a tomar al mostrarse
+        win._window_modal = win.grab_status() is not None
+        win.protocol("WM_DELETE_WINDOW", lambda: self.hide(win))
+        logger.info("Ventana %s creada.", name)
+        return win
+
+    def show(self, win: tk.Toplevel) -> None:
+        win.deiconify()
+        win.lift()
+        try:
+            win.focus_force()
+            if getattr(win, "_window_modal", False):
+                win.grab_set()
+        except tk.TclError:
+            pass
+        win.event_generate(EVENTO_MOSTRADA, when="tail")
+
+    def hide(self, win: tk.Toplevel) -> None:
+        try:
+            win.grab_release()
+        except tk.TclError:
+            pass
+        win.event_generate(EVENTO_OCULTA)
+        win.withdraw()
+        try:
+            self._master.focus_force()
+        except tk.TclError:
+            pass
+
+    def is_open(self, name: str) -> bool:
+        """True si la ventana existe y está visible."""
+        win = self._ventanas.get(name)
+        return win is not None and _existe(win) and win.state() != "withdrawn"
+
+    def destroy_all(self) -> None:
+        for win in self._ventanas.values():
+            if _existe(win):
+                win.destroy()
+        self._ventanas.clear()